@@ -0,0 +1,6 @@
+"""
+P3D publish helpers shared by the config hooks.
+
+The package is added to the PYTHONPATH by the
+tk-multi-launchapp before_app_launch hook, next to the pipelineFramework.
+"""
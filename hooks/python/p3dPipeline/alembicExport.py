@@ -0,0 +1,395 @@
+"""
+Single pass Alembic export of all the jobs of a publish run.
+
+Each LOD plugin and each shot asset instance used to run its own AbcExport,
+and every AbcExport evaluates the whole frame range again. The coordinator
+gathers the jobs of the run and writes them all with one AbcExport call
+holding one -j flag per job, so the timeline is evaluated once.
+
+The export of the pipelineFramework publish hooks is captured: AbcExport is
+replaced by a recorder while the hook runs, the recorded jobs are exported
+together when the first plugin of the run reaches finalize. With the
+background export enabled, the jobs are sent to the mayapy workers of
+p3dPipeline.exportWorkers instead.
+
+With the chunked export enabled, the long jobs whose template has the chunk
+key are split in frame chunks across the workers by p3dPipeline.chunkedExport.
+
+The written files are checked with the Ogawa reader of
+p3dPipeline.alembicReader, a job whose file is invalid fails. The metadata of
+the valid files is written in their sidecar by p3dPipeline.cacheMetadata.
+
+The version reserved by an item is released once the result of its export is
+known: when the item finalizes for the jobs exported in the session, when the
+worker is over for the background jobs.
+
+The static jobs get a geometry fingerprint, stored in the sidecar of the
+output once it is validated. When the fingerprint of a job matches the one of the previous
+version, the previous file is linked or copied instead of exported again.
+"""
+
+import contextlib
+import os
+import re
+import shutil
+
+import maya.cmds as cmds
+
+from p3dPipeline.alembicReader import validateAlembic
+from p3dPipeline.cacheMetadata import writeAlembicSidecar
+from p3dPipeline.chunkedExport import canChunk
+from p3dPipeline.chunkedExport import isChunkedExportEnabled
+from p3dPipeline.chunkedExport import jobFrameRange
+from p3dPipeline.chunkedExport import submitChunkedExport
+from p3dPipeline.exportWorkers import GEOMETRY_HASH_KEY
+from p3dPipeline.exportWorkers import getExportWorkerPool
+from p3dPipeline.exportWorkers import isBackgroundExportEnabled
+from p3dPipeline.exportWorkers import submitBackgroundExport
+from p3dPipeline.frameRange import resolveJobFrameRange
+from p3dPipeline.frameRange import sceneFps
+from p3dPipeline.geometryHash import jobFingerprint
+from p3dPipeline.publishRegistry import getRegistrationQueue
+from p3dPipeline.publishSidecar import readSidecar
+from p3dPipeline.publishSidecar import updateSidecar
+from p3dPipeline.timing import account
+from p3dPipeline.versioning import previousVersionPaths
+from p3dPipeline.versioning import releaseItemVersion
+
+
+# Output file of an AbcExport job string.
+FILE_REGEX = re.compile(r"""-f(?:ile)?\s+(?:"([^"]+)"|'([^']+)'|(\S+))""")
+
+# Number of previous versions looked at for a file to reuse.
+PREVIOUS_VERSIONS_CHECKED = 3
+
+
+class AlembicExportError(Exception):
+    """ The single pass export of the run failed.
+    """
+
+
+class AlembicJob(object):
+    """ An AbcExport job waiting for the export of the run.
+
+    Args:
+        jobArgs     (str)           : The job string given to -j.
+        flags       (dict)          : The AbcExport flags other than -j.
+        item        (PublishItem)   : The item publishing the output.
+        template    (TemplatePath)  : The versioned template of the output.
+    """
+
+    def __init__(self, jobArgs, flags=None, item=None, template=None):
+        self.jobArgs    = jobArgs
+        self.flags      = dict(flags or {})
+        self.item       = item
+        self.template   = template
+        self.path       = jobOutputPath(jobArgs)
+        self.error      = None
+        self.fingerprint = None
+        self.reusedFrom = None
+        self.background = False
+
+    @property
+    def flagsKey(self):
+        return tuple(sorted(self.flags.items()))
+
+
+class AlembicExportCoordinator(object):
+    """ Gather the AbcExport jobs of a publish run and export them together.
+    """
+
+    def __init__(self):
+        self._pending   = []
+        self._done      = {}
+        self._runRoot   = None
+
+    @property
+    def pendingJobs(self):
+        return list(self._pending)
+
+    def addJob(self, jobArgs, item=None, template=None, **flags):
+        """ Register an export job.
+
+        Args:
+            jobArgs     (str)           : The job string, as given to
+                                          AbcExport -j.
+            item        (PublishItem)   : The item publishing the output.
+            template    (TemplatePath)  : The versioned template of the output.
+                                          If given, the file of the previous
+                                          version is reused when the geometry
+                                          did not change, and a long job can
+                                          be exported in frame chunks.
+            flags       (dict)          : The AbcExport flags other than -j.
+
+        Returns:
+            str : The output path of the job.
+        """
+        if item is not None:
+            runRoot = _rootItem(item)
+            if runRoot is not self._runRoot:
+                # A new publish tree means the previous run did not finalize.
+                self.clear()
+                self._runRoot = runRoot
+
+        job = AlembicJob(jobArgs, flags, item, template)
+        if template is not None and job.path and self._reusePreviousVersion(job, template):
+            self._done.setdefault(_itemKey(item), []).append(job)
+            return job.path
+
+        self._pending.append(job)
+        return job.path
+
+    def _reusePreviousVersion(self, job, template):
+        """ Link or copy the latest of the previous versions of the output
+        whose geometry fingerprint matches the one of the job.
+
+        Returns:
+            bool : True if the previous version was reused.
+        """
+        job.fingerprint = jobFingerprint(job.jobArgs)
+        if job.fingerprint is None:
+            return False
+
+        for previousPath in previousVersionPaths(template, job.path, PREVIOUS_VERSIONS_CHECKED):
+            # A LOD reverted to an older version reuses that version.
+            sidecar = readSidecar(previousPath)
+            if sidecar.get(GEOMETRY_HASH_KEY) != job.fingerprint:
+                continue
+
+            # The metadata of the previous file describes the reused one.
+            linkOrCopy(previousPath, job.path)
+            sidecar.update({GEOMETRY_HASH_KEY: job.fingerprint, "reusedFrom": previousPath})
+            updateSidecar(job.path, sidecar)
+            job.reusedFrom = previousPath
+            return True
+
+        return False
+
+    @contextlib.contextmanager
+    def capture(self, item=None, template=None, resolveFrameRange=False):
+        """ Record the AbcExport calls instead of running them.
+
+        Args:
+            item                (PublishItem)   : The item publishing the
+                                                  recorded jobs.
+            template            (TemplatePath)  : The versioned template of
+                                                  the outputs, to reuse the
+                                                  unchanged previous versions.
+            resolveFrameRange   (bool)          : Export the jobs of static
+                                                  roots as a single frame.
+
+        Yields:
+            list : The output paths of the recorded jobs, filled when the
+                   context exits.
+        """
+        paths       = []
+        original    = cmds.AbcExport
+
+        def recordAbcExport(*args, **kwargs):
+            jobs = kwargs.pop("jobArg", None) or kwargs.pop("j", None) or []
+            if not isinstance(jobs, (list, tuple)):
+                jobs = [jobs]
+            for jobArgs in jobs:
+                if resolveFrameRange:
+                    jobArgs = resolveJobFrameRange(jobArgs)
+                paths.append(self.addJob(jobArgs, item, template, **kwargs))
+
+        cmds.AbcExport = recordAbcExport
+        try:
+            yield paths
+        finally:
+            cmds.AbcExport = original
+
+    def exportAll(self, logger=None):
+        """ Export all the pending jobs, one AbcExport call per set of flags.
+
+        The publishes queued for the items of a failed job are dropped from
+        the registration of the run.
+
+        Args:
+            logger (Logger) : Logger reporting the background jobs.
+
+        Returns:
+            list : The output paths exported, or sent to the background
+                   workers.
+        """
+        pending = list(self._pending)
+        del self._pending[:]
+
+        exported = []
+        groups = {}
+        chunkCount = getExportWorkerPool().maxWorkers if isChunkedExportEnabled() else 1
+        for job in pending:
+            if chunkCount > 1 and canChunk(job, job.template, chunkCount):
+                submitChunkedExport(job, job.template, logger)
+                job.background = True
+                exported.append(job.path)
+                self._done.setdefault(_itemKey(job.item), []).append(job)
+                continue
+            groups.setdefault(job.flagsKey, []).append(job)
+
+        for flagsKey, jobs in groups.items():
+            if isBackgroundExportEnabled():
+                submitBackgroundExport(jobs, logger)
+                for job in jobs:
+                    job.background = True
+                exported.extend(job.path for job in jobs)
+                continue
+
+            for job in jobs:
+                if job.path:
+                    directory = os.path.dirname(job.path)
+                    if directory and not os.path.isdir(directory):
+                        os.makedirs(directory)
+
+            try:
+                with account("maya"):
+                    cmds.AbcExport(j=[job.jobArgs for job in jobs], **dict(flagsKey))
+            except Exception as e:
+                for job in jobs:
+                    job.error = str(e)
+                getRegistrationQueue().detach([job.item for job in jobs if job.item is not None])
+            else:
+                invalid = [job for job in jobs if not self._validateOutput(job)]
+                getRegistrationQueue().detach([job.item for job in invalid if job.item is not None])
+                valid = [job for job in jobs if not job.error]
+                exported.extend(job.path for job in valid)
+                self._writeFingerprints(valid)
+                for job in valid:
+                    if job.path:
+                        writeAlembicSidecar(job.path, sceneFps())
+
+            for job in jobs:
+                self._done.setdefault(_itemKey(job.item), []).append(job)
+
+        return exported
+
+    def finishItem(self, item, logger=None):
+        """ Export the pending jobs, then check the jobs of an item.
+
+        The version reserved by the item is released, unless its jobs were
+        sent to the background workers. The workers release it once over.
+
+        Args:
+            item    (PublishItem)   : The item to check.
+            logger  (Logger)        : Logger reporting the background jobs.
+
+        Raises:
+            AlembicExportError : The export of a job of the item failed.
+        """
+        jobs = []
+        try:
+            if self._pending:
+                self.exportAll(logger)
+
+            jobs = self._done.pop(_itemKey(item), [])
+            for job in jobs:
+                if job.reusedFrom and logger:
+                    logger.info(
+                        "The geometry of %s did not change, reused %s."
+                        % (job.path, job.reusedFrom)
+                    )
+                if job.error:
+                    raise AlembicExportError(
+                        "Failed to export %s: %s" % (job.path, job.error)
+                    )
+        finally:
+            if not any(job.background for job in jobs):
+                releaseItemVersion(item)
+
+    def discardItem(self, item):
+        """ Drop the jobs of an item whose publish failed, and release the
+        version reserved by the item.
+
+        Args:
+            item (PublishItem) : The failed item.
+        """
+        self._pending[:] = [job for job in self._pending if job.item is not item]
+        self._done.pop(_itemKey(item), None)
+        releaseItemVersion(item)
+
+    def _validateOutput(self, job):
+        """ Check the file written by a job, the problems found are stored as
+        the error of the job.
+
+        Returns:
+            bool : True if the file is valid.
+        """
+        if not job.path:
+            return True
+        problems = validateAlembic(job.path, jobFrameRange(job.jobArgs), sceneFps())
+        if problems:
+            job.error = " ".join(problems)
+        return not problems
+
+    def _writeFingerprints(self, jobs):
+        for job in jobs:
+            if job.fingerprint and job.path:
+                updateSidecar(job.path, {GEOMETRY_HASH_KEY: job.fingerprint})
+
+    def clear(self):
+        # The jobs of a run that did not finalize are never exported.
+        for job in self._pending + [job for jobs in self._done.values() for job in jobs]:
+            if job.item is not None and not job.background:
+                releaseItemVersion(job.item)
+        del self._pending[:]
+        self._done.clear()
+        self._runRoot = None
+
+
+def jobOutputPath(jobArgs):
+    """ Find the output file of an AbcExport job string.
+
+    Args:
+        jobArgs (str) : The job string.
+
+    Returns:
+        str : The output path, None if the job has no -file flag.
+    """
+    match = FILE_REGEX.search(jobArgs)
+    if not match:
+        return None
+    return next(group for group in match.groups() if group)
+
+
+def linkOrCopy(source, target):
+    """ Hardlink a file, or copy it when the filesystem can not link it.
+
+    Args:
+        source (str) : The file to reuse.
+        target (str) : The new path of the file.
+    """
+    directory = os.path.dirname(target)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    if os.path.lexists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _itemKey(item):
+    return id(item) if item is not None else None
+
+
+def _rootItem(item):
+    while item.parent is not None:
+        item = item.parent
+    return item
+
+
+_coordinator = None
+
+
+def getExportCoordinator():
+    """ Return the shared Alembic export coordinator.
+
+    Returns:
+        AlembicExportCoordinator : The coordinator shared by the publish plugins.
+    """
+    global _coordinator
+    if _coordinator is None:
+        _coordinator = AlembicExportCoordinator()
+    return _coordinator
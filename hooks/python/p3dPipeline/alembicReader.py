@@ -0,0 +1,643 @@
+"""
+Pure Python reader of the Alembic Ogawa archive headers.
+
+Nothing checked the Alembic files written by the publishes, and the tools
+needing the time range or the objects of a cache had to open it in Maya. The
+reader maps the file in memory and only reads the headers: the archive
+metadata, the time samplings, the object hierarchy and the bounds
+properties. The mesh samples are never read.
+
+An Ogawa file is made of groups and data blocks. A group is a list of
+children positions, the high bit of a position telling a data block from a
+group. The Alembic layout on top of it is:
+
+    root group  : version, library version, top object, archive metadata,
+                  time samplings, indexed metadata
+    object      : properties, child objects, child object headers
+    compound    : child properties, property headers
+    property    : one data block per stored sample
+
+    with AlembicArchive(path) as archive:
+        start, end = archive.timeRange()
+        paths = [header.fullName for header in archive.objects()]
+
+The archive stores times in seconds. The frames are found with the frame
+rate of the scene, the rate of the time samplings is only the frame rate of
+the exports without subframe step.
+"""
+
+import math
+import mmap
+import os
+import struct
+
+
+MAGIC = b"Ogawa"
+
+# Frozen flag of the header, set once the archive is closed by the writer.
+FROZEN = 0xff
+
+# High bit of a child position marking a data block.
+DATA_FLAG = 0x8000000000000000
+
+# Bytes of the hash ending the object headers and starting each sample.
+HEADERS_HASH_SIZE = 32
+SAMPLE_HASH_SIZE = 16
+
+# Children of the root group of an Alembic archive.
+ROOT_VERSION            = 0
+ROOT_LIBRARY_VERSION    = 1
+ROOT_TOP_OBJECT         = 2
+ROOT_METADATA           = 3
+ROOT_TIME_SAMPLINGS     = 4
+ROOT_INDEXED_METADATA   = 5
+
+# Property types.
+COMPOUND_PROPERTY   = 0
+SCALAR_PROPERTY     = 1
+ARRAY_PROPERTY      = 2
+
+# Fields of the info word of a property header.
+PROPERTY_TYPE_MASK      = 0x0003
+SIZE_HINT_MASK          = 0x000c
+POD_MASK                = 0x00f0
+TIME_SAMPLING_FLAG      = 0x0100
+FIRST_LAST_CHANGED_FLAG = 0x0200
+HOMOGENOUS_FLAG         = 0x0400
+CONSTANT_FLAG           = 0x0800
+EXTENT_MASK             = 0xff000
+METADATA_INDEX_MASK     = 0xff00000
+
+# Plain old data types, with their struct format.
+POD_FORMATS = {
+    0   : "?",
+    1   : "B",
+    2   : "b",
+    3   : "H",
+    4   : "h",
+    5   : "I",
+    6   : "i",
+    7   : "Q",
+    8   : "q",
+    9   : "e",
+    10  : "f",
+    11  : "d",
+}
+
+# Time per cycle of the acyclic time samplings.
+ACYCLIC_TIME_PER_CYCLE = 1.7976931348623157e308 / 32.0
+
+# Bounds properties of the archive and of the geometry schemas.
+ARCHIVE_BOUNDS_PROPERTY = ".childBnds"
+GEOMETRY_PROPERTY       = ".geom"
+SELF_BOUNDS_PROPERTY    = ".selfBnds"
+
+# Face counts of the mesh schemas, one int32 per face.
+FACE_COUNTS_PROPERTY    = ".faceCounts"
+FACE_COUNT_SIZE         = 4
+
+_UINT8  = struct.Struct("<B")
+_UINT16 = struct.Struct("<H")
+_UINT32 = struct.Struct("<I")
+_UINT64 = struct.Struct("<Q")
+_DOUBLE = struct.Struct("<d")
+_SIZE_HINTS = (_UINT8, _UINT16, _UINT32)
+
+
+class OgawaError(Exception):
+    """ The file is not a readable Ogawa archive.
+    """
+
+
+class TimeSampling(object):
+    """ A time sampling of the archive.
+
+    Args:
+        timePerCycle    (float) : The duration of a cycle, in seconds.
+        times           (list)  : The sample times of a cycle.
+        maxSamples      (int)   : The highest number of samples using it.
+    """
+
+    def __init__(self, timePerCycle, times, maxSamples):
+        self.timePerCycle   = timePerCycle
+        self.times          = list(times)
+        self.maxSamples     = maxSamples
+
+    @property
+    def isAcyclic(self):
+        return self.timePerCycle >= ACYCLIC_TIME_PER_CYCLE
+
+    @property
+    def isUniform(self):
+        return not self.isAcyclic and len(self.times) == 1
+
+    def sampleTime(self, index):
+        """ The time of a sample, in seconds.
+        """
+        if self.isAcyclic:
+            return self.times[min(index, len(self.times) - 1)]
+        cycle, position = divmod(index, len(self.times))
+        return self.times[position] + cycle * self.timePerCycle
+
+    def timeRange(self):
+        """ The time of the first and last samples, in seconds.
+
+        Returns:
+            tuple : (start, end), None if no property uses the sampling.
+        """
+        if not self.times or self.maxSamples < 1:
+            return None
+        return self.sampleTime(0), self.sampleTime(self.maxSamples - 1)
+
+
+class ObjectHeader(object):
+    """ An object of the archive hierarchy.
+    """
+
+    def __init__(self, name, fullName, metadata, position):
+        self.name       = name
+        self.fullName   = fullName
+        self.metadata   = metadata
+        self.position   = position
+
+    @property
+    def schema(self):
+        return self.metadata.get("schema")
+
+
+class PropertyHeader(object):
+    """ A property of an object.
+    """
+
+    def __init__(self, name, propertyType, metadata, position):
+        self.name               = name
+        self.propertyType       = propertyType
+        self.metadata           = metadata
+        self.position           = position
+        self.pod                = None
+        self.extent             = 0
+        self.isHomogenous       = False
+        self.numSamples         = 0
+        self.firstChanged       = 0
+        self.lastChanged        = 0
+        self.timeSamplingIndex  = 0
+
+
+class AlembicArchive(object):
+    """ Read the headers of an Alembic Ogawa archive.
+
+    Args:
+        path (str) : The Alembic file.
+
+    Raises:
+        OgawaError : The file is not an Ogawa archive.
+    """
+
+    def __init__(self, path):
+        self.path       = path
+        self._file      = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise OgawaError("%s is empty." % path)
+
+        if len(self._map) < 16 or self._map[:5] != MAGIC:
+            self.close()
+            raise OgawaError("%s is not an Ogawa archive." % path)
+
+        self.frozen     = self._map[5] == FROZEN
+        # The two version bytes are written most significant first.
+        self.ogawaVersion = struct.unpack_from(">H", self._map, 6)[0]
+        self._root      = self._children(_UINT64.unpack_from(self._map, 8)[0])
+        self._indexedMetadata = None
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def version(self):
+        """ The Alembic format version of the archive.
+        """
+        return self._int32(self._root, ROOT_VERSION)
+
+    @property
+    def libraryVersion(self):
+        """ The version of the Alembic library which wrote the archive.
+        """
+        return self._int32(self._root, ROOT_LIBRARY_VERSION)
+
+    @property
+    def metadata(self):
+        """ The archive metadata: application, date written, description.
+        """
+        return _parseMetadata(self._string(self._child(self._root, ROOT_METADATA)))
+
+    @property
+    def timeSamplings(self):
+        """ The time samplings of the archive, the default one first.
+        """
+        buffer = self._data(self._child(self._root, ROOT_TIME_SAMPLINGS))
+        samplings = []
+        position = 0
+        while position + 16 <= len(buffer):
+            maxSamples = _UINT32.unpack_from(buffer, position)[0]
+            timePerCycle = _DOUBLE.unpack_from(buffer, position + 4)[0]
+            numTimes = _UINT32.unpack_from(buffer, position + 12)[0]
+            position += 16
+            times = struct.unpack_from("<%dd" % numTimes, buffer, position)
+            position += 8 * numTimes
+            samplings.append(TimeSampling(timePerCycle, times, maxSamples))
+        return samplings
+
+    def timeRange(self):
+        """ The time range covered by the samples of the archive.
+
+        Returns:
+            tuple : (start, end) in seconds, None if the archive is empty.
+        """
+        samplings = self.timeSamplings
+        ranges = [sampling.timeRange() for sampling in samplings[1:]]
+        if not any(ranges):
+            # Everything is sampled with the default time sampling.
+            ranges = [sampling.timeRange() for sampling in samplings[:1]]
+        ranges = [timeRange for timeRange in ranges if timeRange]
+        if not ranges:
+            return None
+        return min(start for start, end in ranges), max(end for start, end in ranges)
+
+    def frameRange(self, fps=None):
+        """ The frame range covered by the samples of the archive.
+
+        Args:
+            fps (float) : The frame rate of the scene. Default to the rate of
+                          the uniform time sampling, which is the frame rate
+                          only if the archive was exported with one sample
+                          per frame.
+
+        Returns:
+            tuple : (start, end) frames, None if the archive is empty, or has
+                    no uniform time sampling when fps is not given. The
+                    subframe samples belong to their nearest frame, the half
+                    frame samples at the ends to the frame inside the range.
+        """
+        timeRange = self.timeRange()
+        if timeRange is None:
+            return None
+        if fps is None:
+            uniform = [sampling for sampling in self.timeSamplings[1:] if sampling.isUniform]
+            if not uniform:
+                return None
+            fps = 1.0 / uniform[0].timePerCycle
+        # The times are rounded first, a half frame can be stored a bit
+        # after or before it.
+        start = round(timeRange[0] * fps, 6)
+        end = round(timeRange[1] * fps, 6)
+        return int(math.floor(start + 0.5)), int(math.ceil(end - 0.5))
+
+    def objects(self):
+        """ Walk the object hierarchy, depth first.
+
+        Yields:
+            ObjectHeader : The header of each object below the top object.
+        """
+        stack = [("", self._child(self._root, ROOT_TOP_OBJECT))]
+        while stack:
+            parentName, position = stack.pop()
+            children = self._children(position)
+            headers = self._objectHeaders(children, parentName)
+            for header in headers:
+                yield header
+            # The children are stacked in reverse to be walked in order.
+            for header in reversed(headers):
+                stack.append((header.fullName, header.position))
+
+    def properties(self, objectPosition=None):
+        """ The top level properties of an object.
+
+        Args:
+            objectPosition (int) : The position of the object, default to the
+                                   top object.
+
+        Returns:
+            list : The PropertyHeader of the properties.
+        """
+        if objectPosition is None:
+            objectPosition = self._child(self._root, ROOT_TOP_OBJECT)
+        children = self._children(objectPosition)
+        if not children or _isData(children[0]):
+            return []
+        return self._propertyHeaders(children[0])
+
+    def compoundProperties(self, header):
+        """ The properties of a compound property.
+        """
+        return self._propertyHeaders(header.position)
+
+    def scalarSamples(self, header):
+        """ The stored samples of a scalar property of numbers.
+
+        Args:
+            header (PropertyHeader) : The scalar property.
+
+        Returns:
+            list : One tuple of values per stored sample.
+        """
+        podFormat = POD_FORMATS.get(header.pod)
+        if header.propertyType != SCALAR_PROPERTY or podFormat is None:
+            return []
+        sampleFormat = struct.Struct("<%d%s" % (header.extent, podFormat))
+
+        samples = []
+        for child in self._children(header.position):
+            buffer = self._data(child)
+            if len(buffer) >= SAMPLE_HASH_SIZE + sampleFormat.size:
+                samples.append(sampleFormat.unpack_from(buffer, SAMPLE_HASH_SIZE))
+        return samples
+
+    def bounds(self):
+        """ The bounding box of the archive over all its samples.
+
+        The archive bounds written by AbcExport are used, otherwise the union
+        of the self bounds of the geometry, in the space of each object.
+
+        Returns:
+            tuple : (minX, minY, minZ, maxX, maxY, maxZ), None if the archive
+                    has no bounds property.
+        """
+        boxes = []
+        for header in self.properties():
+            if header.name == ARCHIVE_BOUNDS_PROPERTY:
+                boxes.extend(_validBoxes(self.scalarSamples(header)))
+
+        # Some writers leave the archive bounds empty.
+        if not boxes:
+            for objectHeader in self.objects():
+                for header in self._geometryProperties(objectHeader):
+                    if header.name == SELF_BOUNDS_PROPERTY:
+                        boxes.extend(_validBoxes(self.scalarSamples(header)))
+
+        if not boxes:
+            return None
+        return tuple(
+            [min(box[axis] for box in boxes) for axis in range(3)]
+            + [max(box[axis] for box in boxes) for axis in range(3, 6)]
+        )
+
+    def polyCount(self):
+        """ The number of faces of the meshes, at their first sample.
+
+        Only the size of the face counts sample is read, not its values.
+
+        Returns:
+            int : The number of faces.
+        """
+        faces = 0
+        for objectHeader in self.objects():
+            for header in self._geometryProperties(objectHeader):
+                if header.name != FACE_COUNTS_PROPERTY or header.propertyType != ARRAY_PROPERTY:
+                    continue
+                # The samples of an array property are stored as pairs of
+                # values and dimensions data.
+                samples = self._children(header.position)
+                if samples:
+                    size = self._dataSize(samples[0])
+                    faces += max(0, size - SAMPLE_HASH_SIZE) // FACE_COUNT_SIZE
+        return faces
+
+    def summary(self, fps=None):
+        """ The archive description used by the validation and the loader.
+
+        Args:
+            fps (float) : The frame rate of the frame range, see frameRange.
+
+        Returns:
+            dict : The frame range, time range, objects, bounds, polycount
+                   and writer.
+        """
+        objects = list(self.objects())
+        metadata = self.metadata
+        return {
+            "frameRange"    : self.frameRange(fps),
+            "timeRange"     : self.timeRange(),
+            "objects"       : [header.fullName for header in objects],
+            "bounds"        : self.bounds(),
+            "polyCount"     : self.polyCount(),
+            "application"   : metadata.get("_ai_Application"),
+            "dateWritten"   : metadata.get("_ai_DateWritten"),
+        }
+
+    def _geometryProperties(self, objectHeader):
+        for header in self.properties(objectHeader.position):
+            if header.name == GEOMETRY_PROPERTY and header.propertyType == COMPOUND_PROPERTY:
+                return self.compoundProperties(header)
+        return []
+
+    def _objectHeaders(self, children, parentName):
+        # The last child of an object holds the headers of its children,
+        # followed by the hashes of the object.
+        if len(children) < 2 or not _isData(children[-1]):
+            return []
+        buffer = self._data(children[-1])
+        end = len(buffer) - HEADERS_HASH_SIZE
+
+        headers = []
+        position = 0
+        while position < end:
+            nameSize = _UINT32.unpack_from(buffer, position)[0]
+            position += 4
+            name = buffer[position:position + nameSize].decode("utf-8")
+            position += nameSize
+            metadataIndex = buffer[position]
+            metadata, position = self._readMetadata(buffer, position + 1, _UINT32, metadataIndex)
+
+            index = len(headers) + 1
+            if index >= len(children) - 1:
+                raise OgawaError("%s: object %s has no data." % (self.path, name))
+            headers.append(ObjectHeader(name, "%s/%s" % (parentName, name), metadata, children[index]))
+        return headers
+
+    def _propertyHeaders(self, position):
+        children = self._children(position)
+        if not children or not _isData(children[-1]):
+            return []
+        buffer = self._data(children[-1])
+
+        headers = []
+        offset = 0
+        while offset < len(buffer):
+            info = _UINT32.unpack_from(buffer, offset)[0]
+            offset += 4
+            propertyType = min(info & PROPERTY_TYPE_MASK, ARRAY_PROPERTY)
+            sizeHint = _SIZE_HINTS[min((info & SIZE_HINT_MASK) >> 2, 2)]
+
+            header = PropertyHeader(None, propertyType, {}, children[len(headers)])
+            if propertyType != COMPOUND_PROPERTY:
+                header.pod          = (info & POD_MASK) >> 4
+                header.extent       = (info & EXTENT_MASK) >> 12
+                header.isHomogenous = bool(info & HOMOGENOUS_FLAG)
+                header.numSamples, offset = _readUint(sizeHint, buffer, offset)
+                if info & FIRST_LAST_CHANGED_FLAG:
+                    header.firstChanged, offset = _readUint(sizeHint, buffer, offset)
+                    header.lastChanged, offset = _readUint(sizeHint, buffer, offset)
+                elif info & CONSTANT_FLAG:
+                    # All the samples are the same as the first one.
+                    header.firstChanged = header.lastChanged = 0
+                else:
+                    header.firstChanged = 1
+                    header.lastChanged = header.numSamples - 1
+                if info & TIME_SAMPLING_FLAG:
+                    header.timeSamplingIndex, offset = _readUint(sizeHint, buffer, offset)
+
+            nameSize, offset = _readUint(sizeHint, buffer, offset)
+            header.name = buffer[offset:offset + nameSize].decode("utf-8")
+            offset += nameSize
+            header.metadata, offset = self._readMetadata(
+                buffer, offset, sizeHint, (info & METADATA_INDEX_MASK) >> 20
+            )
+            headers.append(header)
+        return headers
+
+    def _readMetadata(self, buffer, position, sizeHint, index):
+        # The metadata is indexed, unless its index is 0xff.
+        if index != 0xff:
+            return self._indexedMetadataAt(index), position
+        size, position = _readUint(sizeHint, buffer, position)
+        text = buffer[position:position + size].decode("utf-8")
+        return _parseMetadata(text), position + size
+
+    def _indexedMetadataAt(self, index):
+        if self._indexedMetadata is None:
+            # The first indexed metadata is the empty one.
+            self._indexedMetadata = [{}]
+            if len(self._root) > ROOT_INDEXED_METADATA:
+                buffer = self._data(self._root[ROOT_INDEXED_METADATA])
+                position = 0
+                while position < len(buffer):
+                    size = buffer[position]
+                    text = buffer[position + 1:position + 1 + size].decode("utf-8")
+                    self._indexedMetadata.append(_parseMetadata(text))
+                    position += 1 + size
+        if index >= len(self._indexedMetadata):
+            return {}
+        return self._indexedMetadata[index]
+
+    def _children(self, position):
+        if _isData(position):
+            raise OgawaError("%s: expected a group at %d." % (self.path, position & ~DATA_FLAG))
+        if position == 0:
+            return []
+        self._check(position, 8)
+        count = _UINT64.unpack_from(self._map, position)[0]
+        self._check(position + 8, 8 * count)
+        return list(struct.unpack_from("<%dQ" % count, self._map, position + 8))
+
+    def _data(self, position):
+        # Only the small header blocks are read, they are copied out of the
+        # map so it can be closed at any time.
+        if not _isData(position):
+            raise OgawaError("%s: expected data at %d." % (self.path, position))
+        position &= ~DATA_FLAG
+        if position == 0:
+            return b""
+        self._check(position, 8)
+        size = _UINT64.unpack_from(self._map, position)[0]
+        self._check(position + 8, size)
+        return self._map[position + 8:position + 8 + size]
+
+    def _dataSize(self, position):
+        position &= ~DATA_FLAG
+        if position == 0:
+            return 0
+        self._check(position, 8)
+        return _UINT64.unpack_from(self._map, position)[0]
+
+    def _child(self, children, index):
+        if index >= len(children):
+            raise OgawaError("%s is not an Alembic archive." % self.path)
+        return children[index]
+
+    def _int32(self, children, index):
+        buffer = self._data(self._child(children, index))
+        return struct.unpack_from("<i", buffer)[0] if len(buffer) >= 4 else None
+
+    def _string(self, position):
+        return self._data(position).decode("utf-8")
+
+    def _check(self, position, size):
+        if position + size > len(self._map):
+            raise OgawaError("%s is truncated." % self.path)
+
+
+def validateAlembic(path, expectedFrameRange=None, fps=None):
+    """ Check an Alembic file written by a publish.
+
+    Args:
+        path                (str)   : The Alembic file.
+        expectedFrameRange  (tuple) : The (start, end) frames it should cover.
+        fps                 (float) : The frame rate of the export, see
+                                      AlembicArchive.frameRange.
+
+    Returns:
+        list : The problems found, empty if the file is valid.
+    """
+    if not os.path.isfile(path):
+        return ["%s was not written." % path]
+
+    try:
+        with AlembicArchive(path) as archive:
+            problems = []
+            if not archive.frozen:
+                problems.append("%s was not closed by its writer." % path)
+            if next(archive.objects(), None) is None:
+                problems.append("%s holds no object." % path)
+            if expectedFrameRange and expectedFrameRange[0] != expectedFrameRange[1]:
+                frameRange = archive.frameRange(fps)
+                if frameRange and tuple(frameRange) != tuple(expectedFrameRange):
+                    problems.append(
+                        "%s covers the frames %d-%d instead of %d-%d."
+                        % ((path,) + tuple(frameRange) + tuple(expectedFrameRange))
+                    )
+            return problems
+    except (OgawaError, EnvironmentError, struct.error, UnicodeDecodeError) as e:
+        return [str(e)]
+
+
+def readSummary(path, fps=None):
+    """ The summary of an Alembic file, None if it can not be read.
+    """
+    try:
+        with AlembicArchive(path) as archive:
+            return archive.summary(fps)
+    except (OgawaError, EnvironmentError, struct.error, UnicodeDecodeError):
+        return None
+
+
+def _validBoxes(boxes):
+    return [box for box in boxes if len(box) == 6 and box[0] <= box[3]]
+
+
+def _isData(position):
+    return bool(position & DATA_FLAG)
+
+
+def _readUint(sizeHint, buffer, position):
+    return sizeHint.unpack_from(buffer, position)[0], position + sizeHint.size
+
+
+def _parseMetadata(text):
+    metadata = {}
+    for token in text.split(";"):
+        if "=" in token:
+            key, value = token.split("=", 1)
+            metadata[key] = value
+    return metadata
@@ -0,0 +1,130 @@
+"""
+Asset objects kept between two collections of the publisher.
+
+Each refresh of the publisher runs the collector again. Building the asset
+object of every selected root is the expensive part of the collection, so the
+objects are kept here and only the roots touched since the last collection
+are built again. Maya DAG, rename and connection callbacks record the touched
+roots. Opening, importing or undoing drops the whole cache.
+"""
+
+import maya.api.OpenMaya as om
+
+
+class AssetCollectionCache(object):
+    """ Asset objects of the collected roots, by root name.
+
+    Args:
+        factory (callable) : Build the asset object of a root name.
+    """
+
+    def __init__(self, factory):
+        self.factory    = factory
+        self._assets    = {}
+        self._dirty     = set()
+
+    def getAsset(self, root):
+        """ Return the asset object of a root, built again only if it changed.
+
+        Args:
+            root (str) : The name or path of the asset root transform.
+        """
+        key = _shortName(root)
+        if key in self._dirty or root not in self._assets:
+            self._assets[root] = self.factory(root)
+            self._dirty.discard(key)
+        return self._assets[root]
+
+    def isDirty(self, root):
+        return root not in self._assets or _shortName(root) in self._dirty
+
+    def markDirty(self, path):
+        """ Mark every transform of a DAG path as changed.
+
+        Args:
+            path (str) : Full DAG path of the changed node.
+        """
+        for name in path.split("|"):
+            if name:
+                self._dirty.add(name)
+
+    def clear(self, *args):
+        self._assets.clear()
+        self._dirty.clear()
+
+
+def _shortName(root):
+    return root.split("|")[-1]
+
+
+_cache          = None
+_callbackIds    = []
+
+
+def getAssetCollectionCache(factory):
+    """ Return the asset cache shared by the collections of the session.
+
+    Args:
+        factory (callable) : Build the asset object of a root name.
+    """
+    global _cache
+    if _cache is None:
+        _cache = AssetCollectionCache(factory)
+        _registerCallbacks()
+    _cache.factory = factory
+    return _cache
+
+
+def _dagChanged(messageType, child, parent, *args):
+    if _cache is None:
+        return
+    for dagPath in (child, parent):
+        if dagPath.isValid() and dagPath.length():
+            _cache.markDirty(dagPath.fullPathName())
+
+
+def _nodeChanged(node, *args):
+    if _cache is None or not node.hasFn(om.MFn.kDagNode):
+        return
+    for dagPath in om.MDagPath.getAllPathsTo(node):
+        _cache.markDirty(dagPath.fullPathName())
+
+
+def _connectionChanged(plug, otherPlug, made, *args):
+    for connectedPlug in (plug, otherPlug):
+        _nodeChanged(connectedPlug.node())
+
+
+def _renamed(node, previousName, *args):
+    if _cache is None:
+        return
+    _cache.markDirty(previousName)
+    _nodeChanged(node)
+
+
+def _registerCallbacks():
+    if _callbackIds:
+        return
+
+    for message in (
+        om.MSceneMessage.kAfterNew,
+        om.MSceneMessage.kAfterOpen,
+        om.MSceneMessage.kAfterImport,
+        om.MSceneMessage.kAfterCreateReference,
+        om.MSceneMessage.kAfterRemoveReference,
+    ):
+        _callbackIds.append(om.MSceneMessage.addCallback(message, _clearCache))
+
+    for event in ("Undo", "Redo"):
+        _callbackIds.append(om.MEventMessage.addEventCallback(event, _clearCache))
+
+    _callbackIds.append(om.MDagMessage.addAllDagChangesCallback(_dagChanged))
+    _callbackIds.append(om.MDGMessage.addNodeAddedCallback(_nodeChanged, "dagNode"))
+    _callbackIds.append(om.MDGMessage.addNodeRemovedCallback(_nodeChanged, "dagNode"))
+    _callbackIds.append(om.MNodeMessage.addNameChangedCallback(om.MObject.kNullObj, _renamed))
+    _callbackIds.append(om.MDGMessage.addConnectionCallback(_connectionChanged))
+
+
+def _clearCache(*args):
+    if _cache is not None:
+        _cache.clear()
@@ -0,0 +1,86 @@
+"""
+Bulk resolution of the asset instances of a shot.
+
+The loader names the asset instances <asset>_<instance>, on the namespace of
+the references and on the root of the stand-ins. The instances are grouped
+by asset from these names, and all the asset names are resolved to ShotGrid
+Asset entities with a single query instead of one query per instance.
+"""
+
+import collections
+import re
+
+from p3dPipeline.timing import account
+
+
+INSTANCE_REGEX = re.compile(r"^(?P<asset>.+?)_(?P<instance>\d+)$")
+
+ASSET_FIELDS = ["code", "sg_asset_type"]
+
+
+def parseInstanceName(root):
+    """ Find the asset name and the instance number of an asset root.
+
+    Args:
+        root (str) : The name or path of the asset root transform.
+
+    Returns:
+        tuple : (assetName, instance) or None if the name does not follow
+                the <asset>_<instance> convention.
+    """
+    namespace, _, name = root.split("|")[-1].rpartition(":")
+    candidates = [namespace.split(":")[-1]] if namespace else []
+    candidates.append(name)
+
+    for candidate in candidates:
+        match = INSTANCE_REGEX.match(candidate)
+        if match:
+            return match.group("asset"), int(match.group("instance"))
+    return None
+
+
+def groupAssetInstances(roots):
+    """ Group asset roots by asset name.
+
+    Args:
+        roots (list) : The asset root transforms.
+
+    Returns:
+        tuple : (groups, unresolved). groups is an ordered dict of asset name
+                to the list of (root, instance). unresolved is the list of the
+                roots not following the naming convention.
+    """
+    groups      = collections.OrderedDict()
+    unresolved  = []
+    for root in roots:
+        parsed = parseInstanceName(root)
+        if parsed is None:
+            unresolved.append(root)
+            continue
+        assetName, instance = parsed
+        groups.setdefault(assetName, []).append((root, instance))
+    return groups, unresolved
+
+
+def resolveAssetEntities(shotgun, project, assetNames):
+    """ Find the ShotGrid Asset entities of asset names with a single query.
+
+    Args:
+        shotgun     (Shotgun)   : The ShotGrid connection.
+        project     (dict)      : The project entity.
+        assetNames  (list)      : The asset codes.
+
+    Returns:
+        dict : Asset code to Asset entity. Unknown codes are missing.
+    """
+    assetNames = list(assetNames)
+    if not assetNames:
+        return {}
+
+    filters = [["code", "in", assetNames]]
+    if project:
+        filters.append(["project", "is", project])
+
+    with account("shotgun"):
+        assets = shotgun.find("Asset", filters, ASSET_FIELDS)
+    return dict((asset["code"], asset) for asset in assets)
@@ -0,0 +1,253 @@
+"""
+Metadata sidecars of the Alembic and MaterialX publishes.
+
+The loader and the layout tools need the bounds and the polycount of an
+asset to place it, and had to open the full cache to get them. Each Alembic
+and MaterialX publish now writes them in its sidecar, with the time range,
+the object paths and the content hash:
+
+    {
+        "bounds"        : [minX, minY, minZ, maxX, maxY, maxZ],
+        "polyCount"     : 12000,
+        "frameRange"    : [1001, 1100],
+        "objects"       : ["/asset/geo/body", ...],
+        "contentSize"   : 1048576,
+        "contentMtime"  : 1792310400.0,
+        "contentHash"   : "<sha1 of the file>",
+    }
+
+The Alembic values are read from the headers of the written file, so the
+sidecars of the background and chunked exports are written without Maya.
+Hashing a large cache takes seconds, so it is not done in Maya: the mayapy
+workers hash the files they write, and the sidecars of the other caches
+only hold the size and modification time of the file. contentHash computes
+their hash on first use and stores it in the sidecar.
+The MaterialX values come from the document and from the assigned geometry
+in the scene.
+"""
+
+import hashlib
+import os
+import xml.etree.ElementTree as ElementTree
+
+import maya.cmds as cmds
+
+from p3dPipeline.alembicReader import readSummary
+from p3dPipeline.publishSidecar import readSidecar
+from p3dPipeline.publishSidecar import updateSidecar
+from p3dPipeline.timing import account
+
+
+# Bytes read at once to hash a file.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Sidecar keys of the metadata.
+BOUNDS_KEY          = "bounds"
+POLYCOUNT_KEY       = "polyCount"
+FRAME_RANGE_KEY     = "frameRange"
+OBJECTS_KEY         = "objects"
+CONTENT_HASH_KEY    = "contentHash"
+CONTENT_SIZE_KEY    = "contentSize"
+CONTENT_MTIME_KEY   = "contentMtime"
+
+
+def fileHash(path):
+    """ The SHA-1 of a file, read by blocks.
+
+    Args:
+        path (str) : The file.
+
+    Returns:
+        str : The hexadecimal hash.
+    """
+    hasher = hashlib.sha1()
+    with account("fs"), open(path, "rb") as hashedFile:
+        for block in iter(lambda: hashedFile.read(HASH_BLOCK_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def contentHash(path):
+    """ The SHA-1 of a published file, read from its sidecar.
+
+    The hash is computed and stored in the sidecar when the sidecar has no
+    hash, or when the file changed since it was hashed.
+
+    Args:
+        path (str) : The published file.
+
+    Returns:
+        str : The hexadecimal hash.
+    """
+    sidecar = readSidecar(path)
+    stat = os.stat(path)
+    if (
+        sidecar.get(CONTENT_HASH_KEY)
+        and sidecar.get(CONTENT_SIZE_KEY) == stat.st_size
+        and sidecar.get(CONTENT_MTIME_KEY) == stat.st_mtime
+    ):
+        return sidecar[CONTENT_HASH_KEY]
+
+    digest = fileHash(path)
+    updateSidecar(path, {
+        CONTENT_HASH_KEY    : digest,
+        CONTENT_SIZE_KEY    : stat.st_size,
+        CONTENT_MTIME_KEY   : stat.st_mtime,
+    })
+    return digest
+
+
+def describeAlembic(path, fps=None, digest=None):
+    """ The metadata of an Alembic file, read from its headers.
+
+    Args:
+        path    (str)   : The Alembic file.
+        fps     (float) : The frame rate of the export.
+        digest  (str)   : The SHA-1 of the file, if already known. The file
+                          is not hashed otherwise, see contentHash.
+
+    Returns:
+        dict : The sidecar metadata, empty if the file can not be read.
+    """
+    summary = readSummary(path, fps)
+    if summary is None:
+        return {}
+    stat = os.stat(path)
+    return {
+        BOUNDS_KEY          : list(summary["bounds"]) if summary["bounds"] else None,
+        POLYCOUNT_KEY       : summary["polyCount"],
+        FRAME_RANGE_KEY     : list(summary["frameRange"]) if summary["frameRange"] else None,
+        "timeRange"         : list(summary["timeRange"]) if summary["timeRange"] else None,
+        OBJECTS_KEY         : summary["objects"],
+        CONTENT_SIZE_KEY    : stat.st_size,
+        CONTENT_MTIME_KEY   : stat.st_mtime,
+        CONTENT_HASH_KEY    : digest,
+    }
+
+
+def mergeDescriptions(descriptions):
+    """ The metadata of a cache made of several files.
+
+    Args:
+        descriptions (list) : The metadata of each file, in frame order.
+
+    Returns:
+        dict : The metadata of the whole cache.
+    """
+    descriptions = [description for description in descriptions if description]
+    if not descriptions:
+        return {}
+
+    boxes = [description[BOUNDS_KEY] for description in descriptions if description.get(BOUNDS_KEY)]
+    ranges = [description[FRAME_RANGE_KEY] for description in descriptions if description.get(FRAME_RANGE_KEY)]
+
+    # The hash of the cache is only known if all its files are hashed.
+    digest = None
+    if all(description.get(CONTENT_HASH_KEY) for description in descriptions):
+        hasher = hashlib.sha1()
+        for description in descriptions:
+            hasher.update(description[CONTENT_HASH_KEY].encode("ascii"))
+        digest = hasher.hexdigest()
+
+    return {
+        BOUNDS_KEY          : _unionBounds(boxes),
+        POLYCOUNT_KEY       : descriptions[0].get(POLYCOUNT_KEY),
+        FRAME_RANGE_KEY     : [ranges[0][0], ranges[-1][1]] if ranges else None,
+        OBJECTS_KEY         : descriptions[0].get(OBJECTS_KEY, []),
+        CONTENT_HASH_KEY    : digest,
+    }
+
+
+def describeMaterialX(path):
+    """ The metadata of a MaterialX document and of its assigned geometry.
+
+    Args:
+        path (str) : The MaterialX document.
+
+    Returns:
+        dict : The sidecar metadata, empty if the document can not be read.
+    """
+    try:
+        with account("fs"):
+            root = ElementTree.parse(path).getroot()
+    except (EnvironmentError, ElementTree.ParseError):
+        return {}
+
+    # The geometry of the looks, as written by the assignments.
+    objects = set()
+    for assignment in root.iter("materialassign"):
+        objects.update(geom.strip() for geom in assignment.get("geom", "").split(",") if geom.strip())
+    objects = sorted(objects)
+
+    # The documents are small, they are hashed right away.
+    stat = os.stat(path)
+    description = {
+        "materials"         : sorted(element.get("name") for element in root.iter("surfacematerial")),
+        OBJECTS_KEY         : objects,
+        CONTENT_SIZE_KEY    : stat.st_size,
+        CONTENT_MTIME_KEY   : stat.st_mtime,
+        CONTENT_HASH_KEY    : fileHash(path),
+    }
+    description.update(_sceneGeometryStats(objects))
+    return description
+
+
+def writeAlembicSidecar(path, fps=None, digest=None, **extra):
+    """ Write the metadata of an Alembic publish in its sidecar.
+
+    Args:
+        path    (str)   : The Alembic file.
+        fps     (float) : The frame rate of the export.
+        digest  (str)   : The SHA-1 of the file, if already known.
+        extra   (dict)  : Other values to store in the sidecar.
+
+    Returns:
+        dict : The sidecar data written, None if the file can not be read.
+    """
+    description = describeAlembic(path, fps, digest)
+    if not description:
+        return None
+    description.update(extra)
+    return updateSidecar(path, description)
+
+
+def writeMaterialXSidecar(path, **extra):
+    """ Write the metadata of a MaterialX publish in its sidecar.
+
+    Args:
+        path    (str)   : The MaterialX document.
+        extra   (dict)  : Other values to store in the sidecar.
+
+    Returns:
+        dict : The sidecar data written, None if the document can not be read.
+    """
+    description = describeMaterialX(path)
+    if not description:
+        return None
+    description.update(extra)
+    return updateSidecar(path, description)
+
+
+def _sceneGeometryStats(objects):
+    # The MaterialX geometry paths use "/" where Maya uses "|".
+    with account("maya"):
+        nodes = cmds.ls([name.replace("/", "|") for name in objects], long=True) or []
+        if not nodes:
+            return {}
+        meshes = cmds.listRelatives(nodes, allDescendents=True, type="mesh", fullPath=True) or []
+        meshes = cmds.ls(meshes + cmds.ls(nodes, type="mesh", long=True), noIntermediate=True, long=True) or []
+        bounds = cmds.exactWorldBoundingBox(nodes, ignoreInvisible=False)
+        polyCount = cmds.polyEvaluate(meshes, face=True) if meshes else 0
+    return {
+        BOUNDS_KEY      : list(bounds),
+        POLYCOUNT_KEY   : polyCount if isinstance(polyCount, int) else 0,
+    }
+
+
+def _unionBounds(boxes):
+    if not boxes:
+        return None
+    return (
+        [min(box[axis] for box in boxes) for axis in range(3)]
+        + [max(box[axis] for box in boxes) for axis in range(3, 6)]
+    )
@@ -0,0 +1,345 @@
+"""
+Frame chunked export of the long shot caches.
+
+A shot cache is written by one AbcExport evaluating its frames one after the
+other. In chunked mode, the frame range of a long cache is split across the
+background mayapy workers: each worker opens the same temporary scene and
+writes its frames to the path given by the {chunk} key of the template. Two
+following chunks share a frame, so the samples between the last frame of a
+chunk and the first frame of the next one are written. Once all the chunks
+are written, the manifest listing them is stored in the sidecar of the cache
+path, with the metadata of the whole cache, and in the sidecar of each chunk.
+Each chunk is registered as a PublishedFile of the item. The loader brings in
+all the chunks of a cache, each one visible until the next chunk starts, and
+the downstream hooks read the chunks of a cache with
+p3dPipeline.publishSidecar.readChunks.
+
+The chunked export is recorded in the jobs directory as a parent job holding
+the queued PublishedFiles, the chunks and the ids of their jobs. The exports
+whose chunks finished after their Maya session was closed are registered by
+recoverChunkedExports in the next session.
+
+Set P3D_CHUNKED_EXPORT=1 to enable the chunked export. A cache is split in
+as many chunks as the pool has workers, each chunk holding at least
+MIN_CHUNK_FRAMES frames.
+"""
+
+import os
+import time
+
+from p3dPipeline.alembicReader import validateAlembic
+from p3dPipeline.cacheMetadata import FRAME_RANGE_KEY
+from p3dPipeline.cacheMetadata import mergeDescriptions
+from p3dPipeline.cacheMetadata import writeAlembicSidecar
+from p3dPipeline.exportWorker import DONE
+from p3dPipeline.exportWorker import FAILED
+from p3dPipeline.exportWorker import QUEUED
+from p3dPipeline.exportWorker import RUNNING
+from p3dPipeline.exportWorkers import JOB_PROPERTY
+from p3dPipeline.exportWorkers import getExportWorkerPool
+from p3dPipeline.exportWorkers import newJobId
+from p3dPipeline.exportWorkers import saveWorkerScene
+from p3dPipeline.frameRange import sceneFps
+from p3dPipeline.geometryHash import FILE_REGEX
+from p3dPipeline.geometryHash import FRAME_RANGE_REGEX
+from p3dPipeline.publishRegistry import PublishRegistrationQueue
+from p3dPipeline.publishRegistry import getRegistrationQueue
+from p3dPipeline.publishSidecar import CHUNKS_KEY
+from p3dPipeline.publishSidecar import updateSidecar
+from p3dPipeline.versioning import releasePath
+from p3dPipeline.versioning import reservedPaths
+
+
+ENV_ENABLED = "P3D_CHUNKED_EXPORT"
+
+# Template key of the chunk index.
+CHUNK_KEY = "chunk"
+
+# Key of the parent job listing the ids of the chunk jobs.
+CHUNK_JOBS_KEY = "chunkJobs"
+
+# Minimum number of frames of a chunk. Each worker opens the scene, shorter
+# chunks do not pay for it.
+MIN_CHUNK_FRAMES = 100
+
+
+def isChunkedExportEnabled():
+    """ Check if the long caches are exported in frame chunks.
+    """
+    return os.environ.get(ENV_ENABLED, "0") == "1"
+
+
+def splitFrameRange(start, end, count, minFrames=MIN_CHUNK_FRAMES):
+    """ Split a frame range in chunks of the same length. Each chunk starts
+    on the last frame of the previous one, so the subframe samples between
+    two chunks are not lost.
+
+    Args:
+        start       (int) : The first frame.
+        end         (int) : The last frame.
+        count       (int) : The number of chunks wanted.
+        minFrames   (int) : The minimum number of frames of a chunk.
+
+    Returns:
+        list : The (start, end) ranges of the chunks.
+    """
+    frames = end - start + 1
+    count = max(1, min(count, frames // max(1, minFrames)))
+    size, extra = divmod(end - start, count)
+
+    ranges = []
+    first = start
+    for index in range(count):
+        last = first + size + (1 if index < extra else 0)
+        ranges.append((first, last))
+        first = last
+    return ranges
+
+
+def jobFrameRange(jobArgs):
+    """ The frame range of an AbcExport job string.
+
+    Returns:
+        tuple : (start, end), None if the job has no frame range.
+    """
+    match = FRAME_RANGE_REGEX.search(jobArgs)
+    if not match:
+        return None
+    return int(float(match.group(1))), int(float(match.group(2)))
+
+
+def canChunk(job, template, count):
+    """ Check if an export job can be split in chunks.
+
+    Args:
+        job         (AlembicJob)    : The export job.
+        template    (TemplatePath)  : The template of the job output.
+        count       (int)           : The number of chunks wanted.
+
+    Returns:
+        bool : True if the template has the chunk key and the frame range is
+               long enough for several chunks.
+    """
+    if template is None or not job.path or CHUNK_KEY not in template.keys:
+        return False
+    frameRange = jobFrameRange(job.jobArgs)
+    if frameRange is None:
+        return False
+    if len(splitFrameRange(frameRange[0], frameRange[1], count)) < 2:
+        return False
+    return template.validate(job.path)
+
+
+def chunkJobArgs(jobArgs, start, end, path):
+    """ The job string exporting a chunk of a job.
+
+    Args:
+        jobArgs (str) : The job string of the whole cache.
+        start   (int) : The first frame of the chunk.
+        end     (int) : The last frame of the chunk.
+        path    (str) : The chunk path.
+
+    Returns:
+        str : The job string of the chunk.
+    """
+    jobArgs = FRAME_RANGE_REGEX.sub("-frameRange %d %d" % (start, end), jobArgs, count=1)
+    return FILE_REGEX.sub(
+        lambda match: "-file '%s'" % path.replace("\\", "/"), jobArgs, count=1
+    )
+
+
+def submitChunkedExport(job, template, logger=None):
+    """ Export a cache in frame chunks on the background workers.
+
+    The queued PublishedFile of the job item is split in one PublishedFile
+    per chunk, registered once all the chunks are written and the manifest
+    is stored. The PublishedFiles are saved in the parent job, with the
+    paths whose version the item reserved, so another session can register
+    them.
+
+    Args:
+        job         (AlembicJob)    : The export job of the whole cache.
+        template    (TemplatePath)  : The template of the job output, with
+                                      the chunk key.
+        logger      (Logger)        : Logger reporting the end of the export.
+
+    Returns:
+        list : The chunk dictionaries of the manifest.
+    """
+    pool = getExportWorkerPool()
+    start, end = jobFrameRange(job.jobArgs)
+    fields = template.get_fields(job.path)
+
+    chunks = []
+    for index, (first, last) in enumerate(splitFrameRange(start, end, pool.maxWorkers), 1):
+        fields[CHUNK_KEY] = index
+        chunks.append({"path": template.apply_fields(fields), "start": first, "end": last})
+
+    exportId = newJobId()
+    scenePath = saveWorkerScene(pool.store.scenePath(exportId))
+
+    items = [job.item] if job.item is not None else []
+    registration = getRegistrationQueue().detach(items)
+    if job.item is not None:
+        registration.splitPublish(job.item, [chunk["path"] for chunk in chunks])
+        job.item.properties[JOB_PROPERTY] = exportId
+
+    chunkIds = ["%s_c%03d" % (exportId, index) for index in range(1, len(chunks) + 1)]
+    now = time.time()
+    export = {
+        "id"            : exportId,
+        "state"         : RUNNING,
+        "scene"         : scenePath,
+        "path"          : job.path,
+        "frameRange"    : [start, end],
+        "chunks"        : chunks,
+        CHUNK_JOBS_KEY  : chunkIds,
+        "registration"  : registration.payloads(),
+        "registered"    : False,
+        "reserved"      : reservedPaths(items),
+        "fps"           : sceneFps(),
+        "created"       : now,
+        "updated"       : now,
+        "error"         : None,
+    }
+    pool.store.write(export)
+
+    over = {}
+
+    def onChunkOver(chunkJob):
+        over[chunkJob["id"]] = chunkJob
+        if len(over) == len(chunkIds):
+            finishChunkedExport(export, [over[chunkId] for chunkId in chunkIds], registration, logger)
+
+    directory = os.path.dirname(job.path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    for chunkId, chunk in zip(chunkIds, chunks):
+        pool.submit(
+            scenePath,
+            [chunkJobArgs(job.jobArgs, chunk["start"], chunk["end"], chunk["path"])],
+            job.flags,
+            onChunkOver,
+            [chunk["path"]],
+            jobId=chunkId
+        )
+    return chunks
+
+
+def finishChunkedExport(export, chunkJobs, registration, logger=None):
+    """ Validate the chunks of an export once all their jobs are over, store
+    the manifest and register the publishes.
+
+    Args:
+        export          (dict)                      : The parent job, as
+                                                      recorded in the job
+                                                      file.
+        chunkJobs       (list)                      : The chunk jobs, in the
+                                                      order of the chunks.
+        registration    (PublishRegistrationQueue)  : The publishes of the
+                                                      chunks.
+        logger          (Logger)                    : Logger reporting the
+                                                      end of the export.
+
+    Returns:
+        bool : True if the publishes were registered, False if a chunk
+               failed or the export was claimed by another session.
+    """
+    store = getExportWorkerPool().store
+    chunks = export["chunks"]
+    fps = export.get("fps")
+
+    # The recovery of another session may finish the same export.
+    if not store.claim(export["id"]):
+        return False
+
+    try:
+        os.remove(export["scene"])
+    except OSError:
+        pass
+
+    try:
+        failed = []
+        descriptions = []
+        for chunk, chunkJob in zip(chunks, chunkJobs):
+            if chunkJob.get("state") != DONE:
+                failed.append(chunkJob)
+                continue
+            problems = validateAlembic(chunk["path"], (chunk["start"], chunk["end"]), fps)
+            if problems:
+                failed.append(dict(chunkJob, error=" ".join(problems)))
+                continue
+            descriptions.append(writeAlembicSidecar(
+                chunk["path"], fps, (chunkJob.get("contentHashes") or {}).get(chunk["path"])
+            ))
+
+        if failed:
+            error = "; ".join(str(chunkJob.get("error")) for chunkJob in failed)
+            store.update(export["id"], state=FAILED, error=error)
+            if logger:
+                logger.error("Chunked export %s failed: %s" % (export["id"], error))
+            return False
+
+        try:
+            manifest = mergeDescriptions(descriptions)
+            manifest.update({CHUNKS_KEY: chunks, FRAME_RANGE_KEY: export["frameRange"]})
+            updateSidecar(export["path"], manifest)
+            for chunk in chunks:
+                updateSidecar(chunk["path"], {CHUNKS_KEY: chunks})
+            registration.flush()
+        except Exception:
+            store.unclaim(export["id"])
+            raise
+        store.update(export["id"], state=DONE, registered=True)
+        if logger:
+            logger.info(
+                "Chunked export %s done: %s in %d chunks."
+                % (export["id"], export["path"], len(chunks))
+            )
+        return True
+    finally:
+        # All the chunks are over, the reserved version is free.
+        for path in export.get("reserved", []):
+            releasePath(path)
+
+
+def recoverChunkedExports(logger=None):
+    """ Register the publishes of the chunked exports whose chunks finished
+    after their Maya session was closed.
+
+    The chunks still queued when their session was closed are never
+    exported, their export fails.
+
+    Args:
+        logger (Logger) : Logger reporting the recovered exports.
+
+    Returns:
+        list : The ids of the recovered exports.
+    """
+    pool = getExportWorkerPool()
+    recovered = []
+    for export in pool.store.listJobs(RUNNING):
+        chunkIds = export.get(CHUNK_JOBS_KEY)
+        if not chunkIds or export.get("registered", True) or pool.isSubmitted(chunkIds[0]):
+            continue
+
+        chunkJobs = []
+        for chunkId in chunkIds:
+            try:
+                chunkJob = pool.store.read(chunkId)
+            except (IOError, OSError, ValueError):
+                chunkJob = {"id": chunkId, "state": FAILED, "error": "The job file is missing."}
+            if chunkJob.get("state") == QUEUED:
+                chunkJob = dict(chunkJob, state=FAILED, error="The chunk was never exported.")
+            chunkJobs.append(chunkJob)
+
+        # Wait for the workers still exporting.
+        if any(chunkJob.get("state") == RUNNING for chunkJob in chunkJobs):
+            continue
+
+        registration = PublishRegistrationQueue()
+        registration.load(export.get("registration", []))
+        if finishChunkedExport(export, chunkJobs, registration, logger):
+            recovered.append(export["id"])
+    return recovered
@@ -0,0 +1,133 @@
+"""
+Expansion of the UDIM and frame tokens of the dependency paths.
+
+A texture path like tex.<UDIM>.exr or tex.<f>.exr stands for all the tiles
+or frames on disk. Each texture directory is listed once and every pattern of
+this directory is matched against the listing, instead of checking the tiles
+one by one on the network.
+"""
+
+import collections
+import os
+import re
+
+from p3dPipeline.timing import account
+
+
+# Token to the regular expression of its values.
+TOKEN_EXPRESSIONS = collections.OrderedDict([
+    ("<UDIM>",      r"1\d{3}"),
+    ("<UVTILE>",    r"u-?\d+_v-?\d+"),
+    ("<U>",         r"-?\d+"),
+    ("<V>",         r"-?\d+"),
+    ("<F>",         r"-?\d+"),
+    ("<FRAME>",     r"-?\d+"),
+])
+
+# Frame padding written as #### or %04d.
+PADDING_REGEX = re.compile(r"(#+|%0?(\d*)d)")
+
+TOKEN_REGEX = re.compile(
+    "(%s)" % "|".join(re.escape(token) for token in TOKEN_EXPRESSIONS),
+    re.IGNORECASE
+)
+
+
+def hasTokens(path):
+    """ Check if a path holds a tile or frame token.
+
+    Args:
+        path (str) : The path to check.
+
+    Returns:
+        bool : True if the path stands for several files.
+    """
+    fileName = os.path.basename(path)
+    return bool(TOKEN_REGEX.search(fileName) or PADDING_REGEX.search(fileName))
+
+
+def patternRegex(fileName):
+    """ Build the regular expression matching the files of a pattern.
+
+    Args:
+        fileName (str) : The file name holding the tokens.
+
+    Returns:
+        re.Pattern : The expression matching the file names of the pattern.
+    """
+    expression = ""
+    position = 0
+    tokens = sorted(
+        list(TOKEN_REGEX.finditer(fileName)) + list(PADDING_REGEX.finditer(fileName)),
+        key=lambda match: match.start()
+    )
+    for match in tokens:
+        if match.start() < position:
+            continue
+        expression += re.escape(fileName[position:match.start()])
+        token = match.group(0)
+        if token.upper() in TOKEN_EXPRESSIONS:
+            expression += TOKEN_EXPRESSIONS[token.upper()]
+        elif token.startswith("#"):
+            expression += r"-?\d{%d,}" % len(token)
+        else:
+            expression += r"-?\d{%s,}" % (match.group(2) or "1")
+        position = match.end()
+    expression += re.escape(fileName[position:])
+
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    return re.compile("^%s$" % expression, flags)
+
+
+def expandDependencies(paths):
+    """ Expand the tile and frame tokens of dependency paths.
+
+    The paths without token are kept as they are. The directories of the
+    paths with tokens are each listed once.
+
+    Args:
+        paths (list) : The dependency paths.
+
+    Returns:
+        tuple : (expanded, unmatched). expanded is the sorted list of the
+                paths without duplicates. unmatched is the list of the
+                patterns without file on disk.
+    """
+    expanded    = {}
+    unmatched   = []
+    patterns    = collections.OrderedDict()
+
+    for path in paths:
+        if not path:
+            continue
+        if hasTokens(path):
+            directory, fileName = os.path.split(os.path.normpath(path))
+            patterns.setdefault(directory, []).append((path, fileName))
+        else:
+            expanded.setdefault(_pathKey(path), path)
+
+    for directory, directoryPatterns in patterns.items():
+        names = _listDirectory(directory)
+        for path, fileName in directoryPatterns:
+            regex = patternRegex(fileName)
+            matches = [name for name in names if regex.match(name)]
+            if not matches:
+                unmatched.append(path)
+                continue
+            for name in matches:
+                filePath = os.path.join(directory, name)
+                expanded.setdefault(_pathKey(filePath), filePath)
+
+    return sorted(expanded.values()), unmatched
+
+
+def _pathKey(path):
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _listDirectory(directory):
+    try:
+        with account("fs"), os.scandir(directory) as entries:
+            return [entry.name for entry in entries]
+    except OSError:
+        return []
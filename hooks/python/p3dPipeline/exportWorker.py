@@ -0,0 +1,99 @@
+"""
+Headless Alembic export worker, run with mayapy by the export worker pool.
+
+    mayapy -m p3dPipeline.exportWorker <job file>
+
+The worker opens the temporary scene of the job, runs its AbcExport jobs in
+a single call and records the result in the job file, with the SHA-1 of the
+written files, so the Maya session does not hash them. The job file is only
+written by the worker while it runs. The scene is removed
+once exported, unless other jobs share it. The module only imports Maya in
+main, so the pool can share its job file helpers.
+"""
+
+import json
+import os
+import sys
+import time
+import traceback
+
+
+QUEUED  = "queued"
+RUNNING = "running"
+DONE    = "done"
+FAILED  = "failed"
+
+
+def readJob(path):
+    """ Read a job file.
+    """
+    with open(path, "r") as jobFile:
+        return json.load(jobFile)
+
+
+def writeJob(path, job):
+    """ Write a job file atomically.
+    """
+    tempPath = "%s.%d.tmp" % (path, os.getpid())
+    with open(tempPath, "w") as jobFile:
+        json.dump(job, jobFile, indent=2, sort_keys=True)
+    os.replace(tempPath, path)
+
+
+def runJob(job):
+    """ Open the scene of a job and export its Alembic jobs.
+
+    Args:
+        job (dict) : The job, as recorded in the job file.
+    """
+    import maya.cmds as cmds
+
+    if not cmds.pluginInfo("AbcExport", query=True, loaded=True):
+        cmds.loadPlugin("AbcExport", quiet=True)
+
+    cmds.file(job["scene"], open=True, force=True)
+
+    for path in job.get("paths", []):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    cmds.AbcExport(j=job["jobs"], **job.get("flags", {}))
+
+    from p3dPipeline.cacheMetadata import fileHash
+    job["contentHashes"] = dict(
+        (path, fileHash(path)) for path in job.get("paths", []) if os.path.isfile(path)
+    )
+
+
+def main(jobPath):
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+
+    job = readJob(jobPath)
+    job["pid"] = os.getpid()
+    job["started"] = job["updated"] = time.time()
+    writeJob(jobPath, job)
+    try:
+        runJob(job)
+    except Exception:
+        job["state"] = FAILED
+        job["error"] = traceback.format_exc()
+    else:
+        job["state"] = DONE
+        job["error"] = None
+        if job.get("removeScene", True):
+            try:
+                os.remove(job["scene"])
+            except OSError:
+                pass
+
+    job["finished"] = job["updated"] = time.time()
+    writeJob(jobPath, job)
+
+    maya.standalone.uninitialize()
+    return 0 if job["state"] == DONE else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1]))
@@ -0,0 +1,483 @@
+"""
+Background Alembic export in headless mayapy processes.
+
+The exports of the asset LODs and of the session geometry used to run in the
+artist's Maya session and block it until the files were written. With the
+background export, the scene is saved to a temporary file and the export
+jobs are sent to a local pool of mayapy workers. The PublishedFiles of the
+exported items are registered when their worker reports success, so the
+artist can keep working while the files are written.
+
+Each job is recorded as a JSON file in the jobs directory, with its state
+(queued, running, done or failed), so the exports can be followed on disk.
+The pool writes the job file until the worker is started, the worker owns
+it until it exits. The pool only records the failure of a worker that
+exited without recording its end. The publishes of a job are registered by
+the session claiming it first, with a claim file created atomically.
+The job file also holds the queued PublishedFiles of its items and the
+geometry fingerprints of its outputs, and the paths whose version the items
+reserved, released once the job is over. The exports finished after their
+Maya session was closed are registered by recoverBackgroundExports in the
+next session.
+
+Set P3D_BACKGROUND_EXPORT=1 to enable the background export,
+P3D_EXPORT_WORKERS to change the number of concurrent workers and
+P3D_EXPORT_JOBS_DIR to change the jobs directory.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import maya.cmds as cmds
+import maya.utils
+
+from p3dPipeline.alembicReader import validateAlembic
+from p3dPipeline.cacheMetadata import writeAlembicSidecar
+from p3dPipeline.exportWorker import DONE
+from p3dPipeline.exportWorker import FAILED
+from p3dPipeline.exportWorker import QUEUED
+from p3dPipeline.exportWorker import RUNNING
+from p3dPipeline.exportWorker import readJob
+from p3dPipeline.exportWorker import writeJob
+from p3dPipeline.frameRange import sceneFps
+from p3dPipeline.publishRegistry import PublishRegistrationQueue
+from p3dPipeline.publishRegistry import getRegistrationQueue
+from p3dPipeline.publishSidecar import updateSidecar
+from p3dPipeline.timing import account
+from p3dPipeline.versioning import releasePath
+from p3dPipeline.versioning import reservedPaths
+
+
+ENV_ENABLED     = "P3D_BACKGROUND_EXPORT"
+ENV_WORKERS     = "P3D_EXPORT_WORKERS"
+ENV_JOBS_DIR    = "P3D_EXPORT_JOBS_DIR"
+
+DEFAULT_WORKERS = 2
+
+# Item property holding the id of the background job of the item.
+JOB_PROPERTY = "backgroundExportJob"
+
+# Sidecar key of the geometry fingerprint.
+GEOMETRY_HASH_KEY = "geometryHash"
+
+
+def isBackgroundExportEnabled():
+    """ Check if the exports are sent to the background workers.
+    """
+    return os.environ.get(ENV_ENABLED, "0") == "1"
+
+
+class ExportJobStore(object):
+    """ The JSON state files of the export jobs.
+
+    Args:
+        directory (str) : The directory of the job files.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def jobPath(self, jobId):
+        return os.path.join(self.directory, "%s.json" % jobId)
+
+    def scenePath(self, jobId):
+        return os.path.join(self.directory, "%s.mb" % jobId)
+
+    def claimPath(self, jobId):
+        return os.path.join(self.directory, "%s.claim" % jobId)
+
+    def read(self, jobId):
+        return readJob(self.jobPath(jobId))
+
+    def write(self, job):
+        writeJob(self.jobPath(job["id"]), job)
+
+    def update(self, jobId, **values):
+        job = self.read(jobId)
+        job.update(values)
+        job["updated"] = time.time()
+        self.write(job)
+        return job
+
+    def claim(self, jobId):
+        """ Claim the registration of a job, so a single session registers
+        its publishes.
+
+        Args:
+            jobId (str) : The job id.
+
+        Returns:
+            bool : True if the job is claimed, False if another session, or
+                   another callback of this one, claimed it first.
+        """
+        try:
+            fd = os.open(self.claimPath(jobId), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as claimFile:
+            claimFile.write("%s:%d" % (socket.gethostname(), os.getpid()))
+        return True
+
+    def unclaim(self, jobId):
+        """ Remove the claim of a job whose registration failed.
+        """
+        try:
+            os.remove(self.claimPath(jobId))
+        except OSError:
+            pass
+
+    def listJobs(self, state=None):
+        """ List the recorded jobs, most recent first.
+
+        Args:
+            state (str) : Only list the jobs in this state.
+
+        Returns:
+            list : The job dictionaries.
+        """
+        jobs = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return jobs
+
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                job = self.read(name[:-len(".json")])
+            except (IOError, OSError, ValueError):
+                continue
+            if state is None or job.get("state") == state:
+                jobs.append(job)
+        jobs.sort(key=lambda job: job.get("created", 0), reverse=True)
+        return jobs
+
+
+class ExportWorkerPool(object):
+    """ Run the export jobs in mayapy processes, a few at a time.
+
+    Args:
+        store       (ExportJobStore)    : The state files of the jobs.
+        maxWorkers  (int)               : Maximum number of concurrent workers.
+        mayapy      (str)               : The mayapy executable. Default to
+                                          the one of the running Maya.
+    """
+
+    def __init__(self, store, maxWorkers=DEFAULT_WORKERS, mayapy=None):
+        self.store          = store
+        self.maxWorkers     = max(1, maxWorkers)
+        self.mayapy         = mayapy or _mayapyPath()
+        self._queued        = []
+        self._running       = {}
+        self._callbacks     = {}
+        self._submitted     = set()
+        self._lock          = threading.Lock()
+
+    def submit(self, scenePath, jobArgs, flags=None, callback=None, paths=None, jobId=None, **values):
+        """ Queue an export job.
+
+        Args:
+            scenePath   (str)       : The scene to open in the worker.
+            jobArgs     (list)      : The AbcExport -j job strings.
+            flags       (dict)      : The AbcExport flags other than -j.
+            callback    (callable)  : Called in the Maya main thread with the
+                                      job dictionary once the job is over.
+            paths       (list)      : The output paths of the jobs.
+            jobId       (str)       : The job id. Default to the scene name,
+                                      the worker then removes the scene once
+                                      exported. The jobs sharing a scene
+                                      need their own id.
+            values      (dict)      : Other values stored in the job file.
+
+        Returns:
+            str : The job id.
+        """
+        removeScene = jobId is None
+        if jobId is None:
+            jobId = os.path.splitext(os.path.basename(scenePath))[0]
+        now = time.time()
+        job = dict(values)
+        job.update({
+            "id"          : jobId,
+            "state"       : QUEUED,
+            "scene"       : scenePath,
+            "removeScene" : removeScene,
+            "jobs"        : list(jobArgs),
+            "flags"       : dict(flags or {}),
+            "paths"       : list(paths or []),
+            "created"     : now,
+            "updated"     : now,
+            "pid"         : None,
+            "error"       : None,
+        })
+        self.store.write(job)
+
+        with self._lock:
+            self._submitted.add(jobId)
+            self._queued.append(jobId)
+            if callback:
+                self._callbacks[jobId] = callback
+        self._startWorkers()
+        return jobId
+
+    @property
+    def runningJobs(self):
+        with self._lock:
+            return list(self._running)
+
+    @property
+    def queuedJobs(self):
+        with self._lock:
+            return list(self._queued)
+
+    def isSubmitted(self, jobId):
+        """ Check if a job was submitted by this session.
+        """
+        with self._lock:
+            return jobId in self._submitted
+
+    def _startWorkers(self):
+        with self._lock:
+            while self._queued and len(self._running) < self.maxWorkers:
+                jobId = self._queued.pop(0)
+                # The job file is owned by the worker once started, it
+                # records its own pid.
+                self.store.update(jobId, state=RUNNING)
+                process = subprocess.Popen(
+                    [self.mayapy, "-m", "p3dPipeline.exportWorker", self.store.jobPath(jobId)],
+                    env=_workerEnvironment(),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                self._running[jobId] = process
+
+                watcher = threading.Thread(target=self._watch, args=(jobId, process))
+                watcher.daemon = True
+                watcher.start()
+
+    def _watch(self, jobId, process):
+        returnCode = process.wait()
+
+        try:
+            job = self.store.read(jobId)
+        except (IOError, OSError, ValueError):
+            job = {"id": jobId, "state": FAILED, "error": "The job file is missing."}
+
+        # The worker exited, the state it recorded is kept. A worker killed
+        # before recording its end is failed.
+        if returnCode != 0 and job.get("state") not in (DONE, FAILED):
+            job = self.store.update(
+                jobId, state=FAILED, error="mayapy exited with code %d." % returnCode
+            )
+
+        with self._lock:
+            self._running.pop(jobId, None)
+            callback = self._callbacks.pop(jobId, None)
+
+        if callback:
+            maya.utils.executeDeferred(callback, job)
+
+        self._startWorkers()
+
+
+def submitBackgroundExport(jobs, logger=None):
+    """ Export Alembic jobs in the background and register their publishes
+    once exported.
+
+    The current scene is saved to a temporary file for the worker. The
+    queued PublishedFiles of the items of the jobs are taken out of the
+    registration of the run and registered when the worker succeeds. They
+    are saved in the job file with the fingerprints of the jobs, written in
+    the sidecars once the outputs are validated.
+
+    Args:
+        jobs    (list)      : The AlembicJob of the export, sharing the same
+                              AbcExport flags.
+        logger  (Logger)    : Logger reporting the end of the job.
+
+    Returns:
+        str : The job id.
+    """
+    pool = getExportWorkerPool()
+    jobId = newJobId()
+    scenePath = saveWorkerScene(pool.store.scenePath(jobId))
+
+    items = [job.item for job in jobs if job.item is not None]
+    registration = getRegistrationQueue().detach(items)
+    for item in items:
+        item.properties[JOB_PROPERTY] = jobId
+
+    def onJobOver(job):
+        finishBackgroundExport(job, registration, logger)
+
+    flags = jobs[0].flags if jobs else {}
+    return pool.submit(
+        scenePath,
+        [job.jobArgs for job in jobs],
+        flags,
+        onJobOver,
+        [job.path for job in jobs if job.path],
+        registration=registration.payloads(),
+        fingerprints=dict((job.path, job.fingerprint) for job in jobs if job.path and job.fingerprint),
+        registered=False,
+        reserved=reservedPaths(items),
+        fps=sceneFps(),
+    )
+
+
+def finishBackgroundExport(job, registration, logger=None):
+    """ Validate the outputs of a background job, write their sidecars and
+    register their publishes.
+
+    Args:
+        job             (dict)                      : The job, as recorded in
+                                                      the job file.
+        registration    (PublishRegistrationQueue)  : The publishes of the job.
+        logger          (Logger)                    : Logger reporting the
+                                                      end of the job.
+
+    Returns:
+        bool : True if the publishes were registered, False if the job
+               failed or was claimed by another session.
+    """
+    store = getExportWorkerPool().store
+    try:
+        if job.get("state") != DONE:
+            if logger:
+                logger.error("Background export %s failed: %s" % (job["id"], job.get("error")))
+            return False
+
+        problems = [
+            problem for path in job.get("paths", []) for problem in validateAlembic(path, fps=job.get("fps"))
+        ]
+        if problems:
+            if logger:
+                logger.error("Background export %s is invalid: %s" % (job["id"], " ".join(problems)))
+            return False
+
+        # The recovery of another session, or the callback of this one, may
+        # register the same job.
+        if not store.claim(job["id"]):
+            return False
+
+        try:
+            fingerprints = job.get("fingerprints") or {}
+            contentHashes = job.get("contentHashes") or {}
+            for path in job.get("paths", []):
+                writeAlembicSidecar(path, job.get("fps"), contentHashes.get(path))
+                if fingerprints.get(path):
+                    updateSidecar(path, {GEOMETRY_HASH_KEY: fingerprints[path]})
+
+            registration.flush()
+        except Exception:
+            store.unclaim(job["id"])
+            raise
+        store.update(job["id"], registered=True)
+        if logger:
+            logger.info("Background export %s done: %s" % (job["id"], ", ".join(job["jobs"])))
+        return True
+    finally:
+        # The result of the export is known, the reserved versions are free.
+        for path in job.get("reserved", []):
+            releasePath(path)
+
+
+def recoverBackgroundExports(logger=None):
+    """ Register the publishes of the background jobs done after their Maya
+    session was closed, the chunked exports included.
+
+    Args:
+        logger (Logger) : Logger reporting the recovered jobs.
+
+    Returns:
+        list : The ids of the recovered jobs.
+    """
+    # The chunked export imports this module.
+    from p3dPipeline.chunkedExport import recoverChunkedExports
+
+    pool = getExportWorkerPool()
+    recovered = []
+    for job in pool.store.listJobs(DONE):
+        if job.get("registered", True) or pool.isSubmitted(job["id"]):
+            continue
+        registration = PublishRegistrationQueue()
+        registration.load(job.get("registration", []))
+        if finishBackgroundExport(job, registration, logger):
+            recovered.append(job["id"])
+    return recovered + recoverChunkedExports(logger)
+
+
+def newJobId():
+    """ A unique id for a new job, sorted by creation time.
+    """
+    return "%s_%s" % (time.strftime("%Y%m%d_%H%M%S"), uuid.uuid4().hex[:8])
+
+
+def saveWorkerScene(scenePath):
+    """ Save the current scene for the workers. The current scene name is
+    kept.
+
+    Args:
+        scenePath (str) : The temporary scene path.
+
+    Returns:
+        str : The saved scene path.
+    """
+    with account("maya"):
+        cmds.file(
+            scenePath,
+            exportAll=True,
+            preserveReferences=True,
+            type="mayaBinary",
+            force=True
+        )
+    return scenePath
+
+
+def _mayapyPath():
+    binDirectory = os.path.dirname(sys.executable)
+    name = "mayapy.exe" if os.name == "nt" else "mayapy"
+    return os.path.join(binDirectory, name)
+
+
+def _workerEnvironment():
+    environment = dict(os.environ)
+    # The worker imports p3dPipeline from the same location.
+    packageRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [packageRoot] + [path for path in environment.get("PYTHONPATH", "").split(os.pathsep) if path]
+    )
+    # The worker must not send itself jobs.
+    environment[ENV_ENABLED] = "0"
+    return environment
+
+
+_pool = None
+
+
+def getExportWorkerPool():
+    """ Return the shared worker pool.
+
+    Returns:
+        ExportWorkerPool : The pool of the Maya session.
+    """
+    global _pool
+    if _pool is None:
+        directory = os.environ.get(ENV_JOBS_DIR) or os.path.join(
+            tempfile.gettempdir(), "p3dExportJobs"
+        )
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        try:
+            maxWorkers = int(os.environ.get(ENV_WORKERS, DEFAULT_WORKERS))
+        except ValueError:
+            maxWorkers = DEFAULT_WORKERS
+        _pool = ExportWorkerPool(ExportJobStore(directory), maxWorkers)
+    return _pool
@@ -0,0 +1,82 @@
+"""
+Single pass file discovery for the collectors.
+
+The project folders live on the network, so each directory is listed once
+with os.scandir. The stat results of the listing are kept with the files, so
+the filters and the collectors do not need to stat them again.
+"""
+
+import collections
+import os
+import time
+
+from p3dPipeline.timing import account
+
+
+DiscoveredFile = collections.namedtuple(
+    "DiscoveredFile",
+    ["path", "name", "extension", "itemType", "mtime", "size"]
+)
+
+
+def scanDirectory(directory, extensionTypes, maxAge=None, limit=None):
+    """ List a directory once and classify its files by extension.
+
+    Args:
+        directory       (str)   : The directory to scan.
+        extensionTypes  (dict)  : Lower case extension, without the dot, to
+                                  the item type of the files to keep.
+        maxAge          (float) : Only keep the files modified in the last
+                                  maxAge seconds. None or 0 to keep them all.
+        limit           (int)   : Only keep the limit most recent files of
+                                  each item type. None or 0 to keep them all.
+
+    Returns:
+        dict : Item type to the list of DiscoveredFile, most recent first.
+               Empty if the directory does not exist.
+    """
+    filesByType = {}
+
+    try:
+        entries = os.scandir(directory)
+    except (FileNotFoundError, NotADirectoryError):
+        return filesByType
+
+    minTime = (time.time() - maxAge) if maxAge else None
+
+    with entries, account("fs"):
+        for entry in entries:
+            extension = os.path.splitext(entry.name)[1][1:].lower()
+            itemType = extensionTypes.get(extension)
+            if itemType is None:
+                continue
+
+            try:
+                if not entry.is_file():
+                    continue
+                # The stat is cached on the entry. On Windows it comes with
+                # the directory listing itself.
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            if minTime is not None and stat.st_mtime < minTime:
+                continue
+
+            filesByType.setdefault(itemType, []).append(
+                DiscoveredFile(
+                    entry.path,
+                    entry.name,
+                    extension,
+                    itemType,
+                    stat.st_mtime,
+                    stat.st_size
+                )
+            )
+
+    for itemType, files in filesByType.items():
+        files.sort(key=lambda discovered: discovered.mtime, reverse=True)
+        if limit:
+            del files[limit:]
+
+    return filesByType
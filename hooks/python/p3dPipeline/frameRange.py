@@ -0,0 +1,159 @@
+"""
+Frame range of the Alembic exports, resolved per export root.
+
+The session geometry export looked for any animation curve in the scene and
+exported the whole timeline as soon as one existed, even when the exported
+geometry was static. The range is now resolved from the history of the
+exported nodes: a root is animated when a time dependent node (animation
+curve, expression, cache, simulation) is upstream of its transforms or of
+its shapes, which also covers the deformers driven by animated nodes.
+
+A static root is exported as a single frame. An animated root is exported
+over the cut of the shot, read from the ShotGrid context snapshot, or over
+the playback range when the context has no cut.
+"""
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+
+from p3dPipeline.geometryHash import FRAME_RANGE_REGEX
+from p3dPipeline.geometryHash import ROOT_REGEX
+from p3dPipeline.shotgridContext import getContextSnapshot
+from p3dPipeline.timing import account
+
+
+# Node types making the nodes downstream of them change over time.
+TIME_DEPENDENT_TYPES = [
+    "animCurveTA",
+    "animCurveTL",
+    "animCurveTT",
+    "animCurveTU",
+    "time",
+    "expression",
+    "motionPath",
+    "cacheFile",
+    "AlembicNode",
+    "nucleus",
+]
+
+
+def isAnimated(roots):
+    """ Check if the nodes exported under roots change over time.
+
+    Args:
+        roots (list) : The export root nodes.
+
+    Returns:
+        bool : True if a time dependent node is upstream of a root, of its
+               parents or of the nodes under it.
+    """
+    if not roots:
+        return False
+
+    with account("maya"):
+        roots = cmds.ls(roots, long=True) or []
+        if not roots:
+            return False
+
+        # The transforms of the parents move the root as well.
+        transforms = set()
+        for root in roots:
+            parts = root.split("|")
+            transforms.update("|".join(parts[:index]) for index in range(2, len(parts) + 1))
+        descendants = cmds.listRelatives(roots, allDescendents=True, fullPath=True) or []
+        transforms.update(cmds.ls(descendants, type="transform", long=True) or [])
+        shapes = cmds.ls(descendants, shapes=True, noIntermediate=True, long=True) or []
+
+        # The inputs of the transforms and the history of the shapes, the
+        # history of the deformers reaches the animation of their drivers.
+        inputs = cmds.listConnections(list(transforms), source=True, destination=False) or []
+        history = []
+        if shapes or inputs:
+            history = cmds.listHistory(shapes + inputs) or []
+        return bool(cmds.ls(inputs + history, type=TIME_DEPENDENT_TYPES))
+
+
+def shotRange():
+    """ The frame range of the current shot.
+
+    Returns:
+        tuple : (start, end), the cut of the shot, or the playback range when
+                the context has no cut.
+    """
+    try:
+        cutRange = getContextSnapshot().cutRange
+    except Exception:
+        # No engine or no ShotGrid connection, fall back to the timeline.
+        cutRange = None
+    if cutRange:
+        return cutRange
+
+    with account("maya"):
+        return (
+            int(cmds.playbackOptions(q=True, min=True)),
+            int(cmds.playbackOptions(q=True, max=True)),
+        )
+
+
+def sceneFps():
+    """ The frame rate of the scene.
+
+    Returns:
+        float : The number of frames per second of the time unit.
+    """
+    return om.MTime(1.0, om.MTime.kSeconds).asUnits(om.MTime.uiUnit())
+
+
+def exportFrameRange(roots):
+    """ The frame range to export for roots.
+
+    Args:
+        roots (list) : The export root nodes.
+
+    Returns:
+        tuple : (start, end), a single frame when the roots are static.
+    """
+    start, end = shotRange()
+    if not isAnimated(roots):
+        return start, start
+    return start, end
+
+
+def sceneRoots(nodes):
+    """ The top level nodes holding nodes.
+
+    Args:
+        nodes (list) : DAG nodes of the scene.
+
+    Returns:
+        list : The full names of their assemblies.
+    """
+    with account("maya"):
+        names = cmds.ls(nodes, long=True) or []
+    return sorted(set("|" + name.split("|")[1] for name in names if name.startswith("|")))
+
+
+def resolveJobFrameRange(jobArgs):
+    """ Set the frame range of an AbcExport job string from its roots.
+
+    The job keeps its frame range when its roots are animated, a static job
+    is reduced to the first frame of its range.
+
+    Args:
+        jobArgs (str) : The job string.
+
+    Returns:
+        str : The job string to export.
+    """
+    frameRange = FRAME_RANGE_REGEX.search(jobArgs)
+    if not frameRange or float(frameRange.group(1)) == float(frameRange.group(2)):
+        return jobArgs
+
+    roots = [next(group for group in match.groups() if group) for match in ROOT_REGEX.finditer(jobArgs)]
+    if not roots or isAnimated(roots):
+        return jobArgs
+
+    start = frameRange.group(1)
+    return "%s-frameRange %s %s%s" % (
+        jobArgs[:frameRange.start()], start, start, jobArgs[frameRange.end():]
+    )
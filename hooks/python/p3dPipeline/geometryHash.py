@@ -0,0 +1,230 @@
+"""
+Content fingerprints of the geometry exported by the publishes.
+
+The fingerprint of a mesh is made from everything AbcExport can write for
+it: its point, topology and UV buffers, its normals, which hold the hard
+edges, its color sets and its face sets. The points and the normals are read
+in place from the raw buffers of the mesh. The other API arrays are copied
+by Maya into a script buffer, read in place too, so no Python loop walks the
+geometry. The fingerprint of an export root adds the transforms, the
+visibility and the names of its hierarchy, so an unchanged LOD can reuse the
+file of the previous version. A Maya not exposing the raw buffers gives no
+fingerprint, the job is then exported.
+"""
+
+import array
+import ctypes
+import hashlib
+import re
+
+import maya.OpenMaya as om1
+import maya.api.OpenMaya as om
+
+from p3dPipeline.timing import account
+
+
+# Roots and frame range of an AbcExport job string.
+ROOT_REGEX          = re.compile(r"""-(?:root|rt)\s+(?:"([^"]+)"|'([^']+)'|(\S+))""")
+FRAME_RANGE_REGEX   = re.compile(r"-(?:frameRange|fr)\s+(-?[\d.]+)\s+(-?[\d.]+)")
+FILE_REGEX          = re.compile(r"""-f(?:ile)?\s+(?:"[^"]+"|'[^']+'|\S+)""")
+
+
+def meshFingerprint(dagPath):
+    """ Hash the points, topology, UVs, normals, color sets and face sets of
+    a mesh.
+
+    Args:
+        dagPath (MDagPath) : The mesh shape.
+
+    Returns:
+        str : The hexadecimal fingerprint.
+
+    Raises:
+        ValueError : The raw buffers of the mesh are not exposed.
+    """
+    hasher  = hashlib.sha1()
+    meshFn  = om1.MFnMesh(_api1DagPath(dagPath.fullPathName()))
+
+    hasher.update(b"points")
+    hasher.update(_rawBuffer(meshFn.getRawPoints(), ctypes.c_float, meshFn.numVertices() * 3))
+
+    counts, connects = om1.MIntArray(), om1.MIntArray()
+    meshFn.getVertices(counts, connects)
+    hasher.update(b"topology")
+    hasher.update(_arrayBuffer(counts))
+    hasher.update(_arrayBuffer(connects))
+
+    uvSets = om1.MStringArray()
+    meshFn.getUVSetNames(uvSets)
+    for index in range(uvSets.length()):
+        us, vs = om1.MFloatArray(), om1.MFloatArray()
+        uvCounts, uvIds = om1.MIntArray(), om1.MIntArray()
+        meshFn.getUVs(us, vs, uvSets[index])
+        meshFn.getAssignedUVs(uvCounts, uvIds, uvSets[index])
+        hasher.update(uvSets[index].encode("utf-8"))
+        hasher.update(_arrayBuffer(us))
+        hasher.update(_arrayBuffer(vs))
+        hasher.update(_arrayBuffer(uvIds))
+
+    # The per face-vertex normals are split along the hard edges.
+    normalCounts, normalIds = om1.MIntArray(), om1.MIntArray()
+    meshFn.getNormalIds(normalCounts, normalIds)
+    hasher.update(b"normals")
+    hasher.update(_rawBuffer(meshFn.getRawNormals(), ctypes.c_float, meshFn.numNormals() * 3))
+    hasher.update(_arrayBuffer(normalIds))
+
+    colorSets = om1.MStringArray()
+    meshFn.getColorSetNames(colorSets)
+    for index in range(colorSets.length()):
+        colors = om1.MColorArray()
+        meshFn.getFaceVertexColors(colors, colorSets[index])
+        hasher.update(b"colors")
+        hasher.update(colorSets[index].encode("utf-8"))
+        hasher.update(_arrayBuffer(colors))
+
+    # The face sets are the shading group assignments of the faces.
+    shaders, faceShaders = om1.MObjectArray(), om1.MIntArray()
+    meshFn.getConnectedShaders(dagPath.instanceNumber(), shaders, faceShaders)
+    hasher.update(b"faceSets")
+    for index in range(shaders.length()):
+        hasher.update(om1.MFnDependencyNode(shaders[index]).name().encode("utf-8"))
+    hasher.update(_arrayBuffer(faceShaders))
+
+    return hasher.hexdigest()
+
+
+def hierarchyFingerprint(roots):
+    """ Hash the meshes, transforms, visibility and names under export roots.
+
+    Args:
+        roots (list) : The export root nodes.
+
+    Returns:
+        str : The hexadecimal fingerprint.
+    """
+    hasher = hashlib.sha1()
+    with account("maya"):
+        for root in sorted(roots):
+            selection = om.MSelectionList()
+            selection.add(root)
+            rootPath = selection.getDagPath(0)
+            rootName = rootPath.fullPathName()
+
+            iterator = om.MItDag(om.MItDag.kDepthFirst)
+            iterator.reset(rootPath)
+            while not iterator.isDone():
+                dagPath = iterator.getPath()
+                iterator.next()
+
+                # The paths are hashed relative to the root, the root can be
+                # in another group from one version to the other.
+                name = dagPath.fullPathName()[len(rootName):]
+                hasher.update(name.encode("utf-8"))
+
+                visible = om.MFnDagNode(dagPath).findPlug("visibility", False).asBool()
+                hasher.update(b"visible" if visible else b"hidden")
+
+                if dagPath.hasFn(om.MFn.kMesh):
+                    if om.MFnDagNode(dagPath).isIntermediateObject:
+                        continue
+                    hasher.update(meshFingerprint(dagPath).encode("ascii"))
+                elif dagPath.hasFn(om.MFn.kTransform):
+                    matrix = om.MFnTransform(dagPath).transformationMatrix()
+                    hasher.update(array.array("d", list(matrix)).tobytes())
+    return hasher.hexdigest()
+
+
+def jobFingerprint(jobArgs):
+    """ Hash the content exported by an AbcExport job.
+
+    Only the static exports get a fingerprint, the geometry of the current
+    frame does not describe an animated export.
+
+    Args:
+        jobArgs (str) : The job string.
+
+    Returns:
+        str : The hexadecimal fingerprint, None if the job exports a frame
+              range or has no root.
+    """
+    frameRange = FRAME_RANGE_REGEX.search(jobArgs)
+    if frameRange and float(frameRange.group(1)) != float(frameRange.group(2)):
+        return None
+
+    roots = [next(group for group in match.groups() if group) for match in ROOT_REGEX.finditer(jobArgs)]
+    if not roots:
+        return None
+
+    # The export options are part of the content, the output path is not.
+    options = FILE_REGEX.sub("", jobArgs)
+    options = " ".join(ROOT_REGEX.sub("", options).split())
+
+    try:
+        hierarchy = hierarchyFingerprint(roots)
+    except ValueError:
+        # The raw buffers are not exposed, the job is exported.
+        return None
+
+    hasher = hashlib.sha1(options.encode("utf-8"))
+    hasher.update(hierarchy.encode("ascii"))
+    return hasher.hexdigest()
+
+
+# Buffer item type, item width and MScriptUtil pointer of the API1 arrays.
+_ARRAY_BUFFERS = {
+    om1.MIntArray   : (ctypes.c_int, 1, "asIntPtr"),
+    om1.MFloatArray : (ctypes.c_float, 1, "asFloatPtr"),
+    om1.MColorArray : (ctypes.c_float, 4, "asFloat4Ptr"),
+}
+
+
+def _api1DagPath(name):
+    selection = om1.MSelectionList()
+    selection.add(name)
+    dagPath = om1.MDagPath()
+    selection.getDagPath(0, dagPath)
+    return dagPath
+
+
+def _rawBuffer(pointer, itemType, size):
+    """ Read a buffer of the API in place.
+
+    Args:
+        pointer     (SwigPyObject)  : The pointer returned by the API.
+        itemType    (type)          : The ctypes type of the items.
+        size        (int)           : The number of items.
+
+    Returns:
+        memoryview : The bytes of the buffer.
+
+    Raises:
+        ValueError : The pointer is not exposed by this Maya.
+    """
+    if not size:
+        return b""
+    try:
+        buffer = (itemType * size).from_address(int(pointer))
+    except TypeError:
+        raise ValueError("The raw buffers of the meshes are not exposed.")
+    return memoryview(buffer).cast("B")
+
+
+def _arrayBuffer(values):
+    """ The content of an API1 array, copied by Maya in a script buffer read
+    in place.
+
+    Args:
+        values (MIntArray, MFloatArray or MColorArray) : The array.
+
+    Returns:
+        memoryview : The bytes of the array.
+    """
+    itemType, width, pointerType = _ARRAY_BUFFERS[type(values)]
+    size = values.length() * width
+    if not size:
+        return b""
+    util = om1.MScriptUtil()
+    util.createFromList([0] * size, size)
+    pointer = getattr(util, pointerType)()
+    values.get(pointer)
+    return _rawBuffer(pointer, itemType, size)
@@ -0,0 +1,43 @@
+"""
+Lazy MayaAsset proxy for the collected items.
+
+Building a MayaAsset walks the asset hierarchy and resolves its ShotGrid
+name and instance. Most collected items are unchecked or never validated, so
+the collector stores this proxy instead, and the MayaAsset is only built when
+a publish plugin first reads one of its attributes.
+"""
+
+
+class LazyMayaAsset(object):
+    """ Proxy building the MayaAsset of a root on first attribute access.
+
+    Args:
+        root (str) : The asset root name.
+    """
+
+    def __init__(self, root):
+        self.rootName   = root
+        self._asset     = None
+
+    def isResolved(self):
+        return self._asset is not None
+
+    def resolve(self):
+        """ Build the MayaAsset if not already done.
+
+        Returns:
+            MayaAsset : The asset object.
+        """
+        if self._asset is None:
+            from pipelineFramework.maya.asset import MayaAsset
+            self._asset = MayaAsset(root=self.rootName)
+        return self._asset
+
+    def __getattr__(self, name):
+        # Only called for the attributes not defined on the proxy.
+        if name.startswith("__") or name == "_asset":
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        return "<LazyMayaAsset %s%s>" % (self.rootName, "" if self.isResolved() else " (unresolved)")
@@ -0,0 +1,340 @@
+"""
+One traversal MaterialX export of the LODs of an asset.
+
+The shading collector creates a LO, MI and HI MaterialX item per asset, and
+each item went through HookPublishMaterialX.materialXPublish on its own,
+walking the whole shading network of the asset three times. The export now
+runs once per asset: the first LOD item reaching publish exports the
+documents of all the LOD items of the asset, in a scope where the shading
+graph queries are answered from memory once made. The nodes, connections,
+attribute values and resolved texture paths walked for the first LOD are
+reused by the other ones. The other LOD items find their document written
+when they reach publish.
+
+The memory of the graph is dropped as soon as the scene may change in the
+scope, so a document never describes a stale graph: on any command other
+than the cached queries which is not run in query mode, on any mel.eval, and
+on the Maya messages of the edits made through the API, a node added,
+removed or renamed, a connection made or broken, or an attribute changed on
+a node whose values were read. The commands not editing the dependency
+graph, the selection, the UI and the log, keep the memory. The queries of
+the selection are not kept.
+"""
+
+import contextlib
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+import maya.mel as mel
+
+from p3dPipeline.timing import account
+
+
+# Item type of the MaterialX LOD items, followed by the LOD name.
+MATERIALX_ITEM_TYPE = "maya.asset.materialX"
+
+# Commands only reading the scene, their results are kept in the scope.
+QUERY_COMMANDS = (
+    "attributeQuery",
+    "getAttr",
+    "listAttr",
+    "listConnections",
+    "listHistory",
+    "listRelatives",
+    "ls",
+    "nodeType",
+    "objExists",
+    "objectType",
+    "referenceQuery",
+)
+
+# Commands reading the scene in query mode only, their query results are
+# kept in the scope.
+QUERYABLE_COMMANDS = (
+    "sets",
+)
+
+# Commands only reading the scene, or the application, without being cached.
+READ_COMMANDS = (
+    "about",
+    "exactWorldBoundingBox",
+    "polyEvaluate",
+)
+
+# Commands of the selection, the UI and the log. They do not edit the
+# dependency graph and keep the results.
+NON_DG_COMMANDS = (
+    "confirmDialog",
+    "headsUpMessage",
+    "hilite",
+    "inViewMessage",
+    "progressBar",
+    "progressWindow",
+    "refresh",
+    "select",
+    "undoInfo",
+    "waitCursor",
+    "warning",
+)
+
+# Flags of the queries answering from the selection, never kept.
+SELECTION_FLAGS = ("selection", "sl", "orderedSelection", "os", "hilite", "hl")
+
+# Attribute messages telling that the value or the layout of an attribute
+# changed.
+ATTRIBUTE_CHANGES = (
+    om.MNodeMessage.kAttributeSet
+    | om.MNodeMessage.kAttributeAdded
+    | om.MNodeMessage.kAttributeRemoved
+    | om.MNodeMessage.kAttributeRenamed
+    | om.MNodeMessage.kAttributeArrayAdded
+    | om.MNodeMessage.kAttributeArrayRemoved
+    | om.MNodeMessage.kConnectionMade
+    | om.MNodeMessage.kConnectionBroken
+)
+
+
+class ShadingGraphCache(object):
+    """ The results of the shading graph queries of an export scope.
+    """
+
+    def __init__(self):
+        self._results       = {}
+        self._watched       = {}
+        self._callbackIds   = []
+        self.hits           = 0
+        self.misses         = 0
+
+    def clear(self, *args):
+        self._results.clear()
+
+    def call(self, command, name, args, kwargs):
+        key = (name, _freeze(args), _freeze(kwargs))
+        try:
+            result = self._results[key]
+        except KeyError:
+            self.misses += 1
+            with account("maya"):
+                result = command(*args, **kwargs)
+            if name == "getAttr" and self._callbackIds:
+                self._watchNode(args)
+            self._results[key] = result
+        except TypeError:
+            # An argument can not be hashed, do not keep the result.
+            with account("maya"):
+                return command(*args, **kwargs)
+        else:
+            self.hits += 1
+
+        # The callers may change the lists they get.
+        return list(result) if isinstance(result, list) else result
+
+    @contextlib.contextmanager
+    def scope(self):
+        """ Answer the shading graph queries from memory while the scope is
+        open.
+
+        Any other command not run in query mode, and any mel.eval, may edit
+        the scene: they drop the results kept. The edits made through the API
+        drop them from the Maya messages.
+        """
+        originals = {}
+
+        def cached(name, command):
+            def cachedCommand(*args, **kwargs):
+                if any(kwargs.get(flag) for flag in SELECTION_FLAGS):
+                    with account("maya"):
+                        return command(*args, **kwargs)
+                return self.call(command, name, args, kwargs)
+            return cachedCommand
+
+        def queryCached(name, command):
+            def queryCachedCommand(*args, **kwargs):
+                if kwargs.get("query") or kwargs.get("q"):
+                    return self.call(command, name, args, kwargs)
+                return invalidating(command)(*args, **kwargs)
+            return queryCachedCommand
+
+        def invalidating(command):
+            def invalidatingCommand(*args, **kwargs):
+                if kwargs.get("query") or kwargs.get("q"):
+                    return command(*args, **kwargs)
+                self.clear()
+                try:
+                    return command(*args, **kwargs)
+                finally:
+                    self.clear()
+            return invalidatingCommand
+
+        for name in dir(cmds):
+            command = getattr(cmds, name)
+            if name.startswith("_") or name in READ_COMMANDS + NON_DG_COMMANDS or not callable(command):
+                continue
+            originals[name] = command
+            if name in QUERY_COMMANDS:
+                setattr(cmds, name, cached(name, command))
+            elif name in QUERYABLE_COMMANDS:
+                setattr(cmds, name, queryCached(name, command))
+            else:
+                setattr(cmds, name, invalidating(command))
+
+        originalEval = mel.eval
+        mel.eval = invalidating(originalEval)
+        self._registerCallbacks()
+
+        try:
+            yield self
+        finally:
+            self._removeCallbacks()
+            mel.eval = originalEval
+            for name, command in originals.items():
+                setattr(cmds, name, command)
+            self.clear()
+
+    def _registerCallbacks(self):
+        self._callbackIds.extend([
+            om.MDGMessage.addNodeAddedCallback(self.clear, "dependNode"),
+            om.MDGMessage.addNodeRemovedCallback(self.clear, "dependNode"),
+            om.MDGMessage.addConnectionCallback(self.clear),
+            om.MNodeMessage.addNameChangedCallback(om.MObject(), self.clear),
+        ])
+
+    def _watchNode(self, args):
+        """ Drop the results kept when an attribute of a node read by getAttr
+        changes.
+        """
+        if not args or not isinstance(args[0], str):
+            return
+        name = args[0].split(".", 1)[0]
+        if name in self._watched:
+            return
+        try:
+            node = om.MSelectionList().add(name).getDependNode(0)
+        except RuntimeError:
+            self._watched[name] = None
+            return
+
+        def attributeChanged(message, plug, otherPlug, clientData):
+            if message & ATTRIBUTE_CHANGES:
+                self.clear()
+
+        callbackId = om.MNodeMessage.addAttributeChangedCallback(node, attributeChanged)
+        self._watched[name] = callbackId
+        self._callbackIds.append(callbackId)
+
+    def _removeCallbacks(self):
+        if self._callbackIds:
+            om.MMessage.removeCallbacks(self._callbackIds)
+        del self._callbackIds[:]
+        self._watched.clear()
+
+
+class MaterialXLodExport(object):
+    """ Export the MaterialX documents of all the LODs of an asset at once.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._runRoot = None
+
+    def publish(self, item, exportLod, logger=None):
+        """ Export the document of a LOD item, exporting the ones of its
+        sibling LOD items with it.
+
+        Args:
+            item        (PublishItem)   : The LOD item to publish.
+            exportLod   (callable)      : Export the document of a LOD item,
+                                          called with the item.
+            logger      (Logger)        : Logger reporting the shared export.
+
+        Raises:
+            Exception : The error raised by the export of the item.
+        """
+        # A new publish tree means the previous run did not finish.
+        runRoot = _rootItem(item)
+        if runRoot is not self._runRoot:
+            self.clear()
+            self._runRoot = runRoot
+
+        key = id(item)
+        if key not in self._results:
+            self._exportAsset(item, exportLod, logger)
+
+        error = self._results.pop(key, None)
+        if error is not None:
+            raise error
+
+    def _exportAsset(self, item, exportLod, logger):
+        lodItems = lodSiblings(item)
+        cache = ShadingGraphCache()
+        with cache.scope():
+            for lodItem in lodItems:
+                try:
+                    exportLod(lodItem)
+                except Exception as e:
+                    self._results[id(lodItem)] = e
+                else:
+                    self._results[id(lodItem)] = None
+
+        if logger and len(lodItems) > 1:
+            logger.info(
+                "Exported %d MaterialX LODs in one traversal, %d shading queries reused."
+                % (len(lodItems), cache.hits)
+            )
+
+    def clear(self):
+        self._results.clear()
+        self._runRoot = None
+
+
+def lodSiblings(item):
+    """ The MaterialX LOD items of the asset of an item.
+
+    Args:
+        item (PublishItem) : A MaterialX LOD item.
+
+    Returns:
+        list : The checked LOD items of the asset, the item first.
+    """
+    siblings = [item]
+    if item.parent is None:
+        return siblings
+    for child in item.parent.children:
+        if child is item or not _itemType(child).startswith(MATERIALX_ITEM_TYPE):
+            continue
+        if getattr(child, "checked", True):
+            siblings.append(child)
+    return siblings
+
+
+def _rootItem(item):
+    while item.parent is not None:
+        item = item.parent
+    return item
+
+
+def _itemType(item):
+    return getattr(item, "type_spec", None) or getattr(item, "type", "") or ""
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(element) for element in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(element)) for key, element in value.items()))
+    return value
+
+
+_export = None
+
+
+def getMaterialXLodExport():
+    """ Return the shared MaterialX LOD export.
+
+    Returns:
+        MaterialXLodExport : The export shared by the MaterialX plugins.
+    """
+    global _export
+    if _export is None:
+        _export = MaterialXLodExport()
+    return _export
@@ -0,0 +1,231 @@
+"""
+Shading graph hashes of the MaterialX publishes.
+
+Every shading publish rewrote the MaterialX documents of all the LODs, even
+when no shader changed. Each material of the asset now gets a hash of its
+shading graph, made from the types, names, non default attribute values and
+connections of the nodes upstream of its shading engine, and from the files
+of its textures. The hashes are stored in the sidecar of the published
+document. When the materials and their assignments did not change since the
+previous version, its document is linked or copied instead of exported
+again.
+
+The hash is normalized: the nodes are hashed in name order, with their
+attribute values and connections sorted, so it does not depend on the order
+the graph is walked in.
+"""
+
+import hashlib
+import os
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+
+from p3dPipeline.alembicExport import linkOrCopy
+from p3dPipeline.publishSidecar import readSidecar
+from p3dPipeline.publishSidecar import updateSidecar
+from p3dPipeline.timing import account
+from p3dPipeline.versioning import previousVersionPaths
+
+
+# Changing the version invalidates the hashes of the previous publishes.
+HASH_VERSION = 1
+
+# Sidecar keys of the hashes.
+MATERIAL_HASHES_KEY     = "materialHashes"
+ASSIGNMENT_HASH_KEY     = "assignmentHash"
+
+# Number of previous versions looked at for a document to reuse.
+PREVIOUS_VERSIONS_CHECKED = 3
+
+# Attribute of the file nodes holding the texture path.
+TEXTURE_ATTRIBUTE = "fileTextureName"
+
+
+class MaterialHashes(object):
+    """ The hashes of the materials assigned under an asset root.
+
+    Args:
+        materials   (dict)  : The hash of each shading engine.
+        assignment  (str)   : The hash of the geometry of each shading engine.
+    """
+
+    def __init__(self, materials, assignment):
+        self.materials  = materials
+        self.assignment = assignment
+
+    def changedMaterials(self, sidecar):
+        """ The materials whose hash differs from a previous publish.
+
+        Args:
+            sidecar (dict) : The sidecar of the previous document.
+
+        Returns:
+            list : The names of the changed, added or removed materials.
+        """
+        previous = sidecar.get(MATERIAL_HASHES_KEY) or {}
+        names = set(previous) | set(self.materials)
+        return sorted(name for name in names if previous.get(name) != self.materials.get(name))
+
+    def matches(self, sidecar):
+        return (
+            sidecar.get(ASSIGNMENT_HASH_KEY) == self.assignment
+            and not self.changedMaterials(sidecar)
+        )
+
+    def sidecarData(self):
+        return {MATERIAL_HASHES_KEY: self.materials, ASSIGNMENT_HASH_KEY: self.assignment}
+
+
+def assetMaterialHashes(assetRoot):
+    """ Hash the materials assigned to the geometry of an asset.
+
+    Args:
+        assetRoot (str) : The root transform of the asset.
+
+    Returns:
+        MaterialHashes : The hashes of the materials.
+    """
+    assignment = hashlib.sha1(str(HASH_VERSION).encode("ascii"))
+    materials = {}
+    with account("maya"):
+        rootName = (cmds.ls(assetRoot, long=True) or [assetRoot])[0]
+        meshes = cmds.listRelatives(rootName, allDescendents=True, type="mesh", fullPath=True) or []
+        meshes = cmds.ls(meshes, noIntermediate=True, long=True) or []
+        if not meshes:
+            return MaterialHashes(materials, assignment.hexdigest())
+
+        meshSet = set(meshes)
+        shadingEngines = set(
+            cmds.listConnections(meshes, type="shadingEngine", source=False, destination=True) or []
+        )
+        for shadingEngine in sorted(shadingEngines):
+            materials[shadingEngine] = shadingGraphHash(shadingEngine)
+
+            # The members are meshes or faces of the meshes of the asset,
+            # hashed relative to the asset root.
+            members = cmds.ls(cmds.sets(shadingEngine, query=True) or [], long=True) or []
+            members = sorted(member for member in members if member.split(".")[0] in meshSet)
+            assignment.update(shadingEngine.encode("utf-8"))
+            for member in members:
+                assignment.update(member[len(rootName):].encode("utf-8"))
+
+    return MaterialHashes(materials, assignment.hexdigest())
+
+
+def shadingGraphHash(shadingEngine):
+    """ Hash the shading graph upstream of a shading engine.
+
+    Args:
+        shadingEngine (str) : The shading engine of the material.
+
+    Returns:
+        str : The hexadecimal hash.
+    """
+    selection = om.MSelectionList()
+    selection.add(shadingEngine)
+    root = selection.getDependNode(0)
+
+    nodes = {}
+    iterator = om.MItDependencyGraph(
+        root,
+        om.MFn.kInvalid,
+        om.MItDependencyGraph.kUpstream,
+        om.MItDependencyGraph.kDepthFirst,
+        om.MItDependencyGraph.kNodeLevel
+    )
+    while not iterator.isDone():
+        node = iterator.currentNode()
+        if node.hasFn(om.MFn.kDagNode):
+            # The geometry and its history are hashed by the assignment,
+            # not the material.
+            iterator.prune()
+        else:
+            nodes[om.MFnDependencyNode(node).name()] = node
+        iterator.next()
+
+    hasher = hashlib.sha1(str(HASH_VERSION).encode("ascii"))
+    for name in sorted(nodes):
+        hasher.update(_nodeDescription(name, nodes[name]).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def reusePreviousDocument(path, template, hashes):
+    """ Link or copy the previous document if its materials did not change.
+
+    Args:
+        path        (str)               : The document to publish.
+        template    (TemplatePath)      : The versioned template of the path.
+        hashes      (MaterialHashes)    : The hashes of the asset materials.
+
+    Returns:
+        str : The reused previous document, None if the materials changed.
+    """
+    if template is None:
+        return None
+
+    for previousPath in previousVersionPaths(template, path, PREVIOUS_VERSIONS_CHECKED):
+        # A material reverted to an older version reuses that version.
+        sidecar = readSidecar(previousPath)
+        if not hashes.matches(sidecar):
+            continue
+
+        linkOrCopy(previousPath, path)
+        sidecar.update(hashes.sidecarData())
+        sidecar["reusedFrom"] = previousPath
+        updateSidecar(path, sidecar)
+        return previousPath
+
+    return None
+
+
+def previousChangedMaterials(path, template, hashes):
+    """ The materials changed since the previous document.
+
+    Returns:
+        list : The changed material names, None if there is no previous
+               document with hashes.
+    """
+    if template is None:
+        return None
+    for previousPath in previousVersionPaths(template, path, 1):
+        sidecar = readSidecar(previousPath)
+        if MATERIAL_HASHES_KEY in sidecar:
+            return hashes.changedMaterials(sidecar)
+    return None
+
+
+def _nodeDescription(name, node):
+    nodeFn = om.MFnDependencyNode(node)
+    lines = [name, nodeFn.typeName]
+
+    for index in range(nodeFn.attributeCount()):
+        attribute = nodeFn.attribute(index)
+        if not om.MFnAttribute(attribute).parent.isNull():
+            # The children are written by their parent.
+            continue
+        plug = om.MPlug(node, attribute)
+        try:
+            lines.extend(plug.getSetAttrCmds(om.MPlug.kNonDefault, False))
+        except RuntimeError:
+            continue
+
+    # The sources of the connected inputs of the node.
+    for plug in nodeFn.getConnections():
+        source = plug.source()
+        if not source.isNull:
+            lines.append("%s>%s" % (
+                source.partialName(True, False, False, False, False, True),
+                plug.partialName(False, False, False, False, False, True)
+            ))
+
+    # The textures changed on disk change the material.
+    if nodeFn.hasAttribute(TEXTURE_ATTRIBUTE):
+        texturePath = nodeFn.findPlug(TEXTURE_ATTRIBUTE, False).asString()
+        try:
+            stat = os.stat(texturePath)
+            lines.append("%s:%d:%d" % (texturePath, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            lines.append(texturePath)
+
+    return "\n".join(lines[:2] + sorted(lines[2:]))
@@ -0,0 +1,128 @@
+"""
+Snapshot of the Maya scene queries shared by the collector and the plugins.
+
+The collector used to query the workspace, the selection and the geometry
+once per asset, and the publish plugins queried them again in validate. The
+snapshot runs each query once and keeps the result until a Maya callback
+reports a change of the scene, the selection or the workspace.
+"""
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from p3dPipeline.timing import account
+
+
+# Item property holding the snapshot.
+SNAPSHOT_PROPERTY = "sceneSnapshot"
+
+
+class MayaSceneSnapshot(object):
+    """ The scene values queried during a publish run.
+
+    Each value is queried the first time it is read, then kept until the
+    snapshot is invalidated by a scene change.
+    """
+
+    def __init__(self):
+        self._valid     = True
+        self._values    = {}
+
+    def isValid(self):
+        return self._valid
+
+    def invalidate(self):
+        self._valid = False
+        self._values.clear()
+
+    @property
+    def sceneName(self):
+        return self._query("sceneName", lambda: cmds.file(query=True, sn=True))
+
+    @property
+    def projectRoot(self):
+        return self._query("projectRoot", lambda: cmds.workspace(q=True, rootDirectory=True))
+
+    @property
+    def selectedTransforms(self):
+        return self._query("selectedTransforms", lambda: cmds.ls(sl=True, type="transform") or [])
+
+    @property
+    def geometry(self):
+        return self._query("geometry", lambda: cmds.ls(geometry=True, noIntermediate=True) or [])
+
+    @property
+    def renderLayers(self):
+        return self._query("renderLayers", lambda: cmds.ls(type="renderLayer") or [])
+
+    @property
+    def movieDirectoryName(self):
+        """ The movie file rule of the workspace, None if not defined.
+        """
+        def queryMovieRule():
+            if "movie" in (cmds.workspace(fileRuleList=True) or []):
+                return cmds.workspace(fileRuleEntry="movie")
+            return None
+        return self._query("movieDirectoryName", queryMovieRule)
+
+    def _query(self, name, query):
+        if name not in self._values:
+            with account("maya"):
+                self._values[name] = query()
+        return self._values[name]
+
+
+_snapshot       = None
+_callbackIds    = []
+
+
+def getSceneSnapshot(item=None):
+    """ Return a valid scene snapshot.
+
+    Args:
+        item (PublishItem) : Look for the snapshot stored in the properties of
+                             the item or of its parents first.
+
+    Returns:
+        MayaSceneSnapshot : The snapshot stored on the item if still valid,
+                            else the shared snapshot of the scene.
+    """
+    while item is not None:
+        snapshot = item.properties.get(SNAPSHOT_PROPERTY)
+        if snapshot is not None and snapshot.isValid():
+            return snapshot
+        item = item.parent
+
+    global _snapshot
+    if _snapshot is None or not _snapshot.isValid():
+        _registerCallbacks()
+        _snapshot = MayaSceneSnapshot()
+    return _snapshot
+
+
+def invalidateSceneSnapshot(*args):
+    """ Invalidate the shared snapshot. Used as Maya callback.
+    """
+    if _snapshot is not None:
+        _snapshot.invalidate()
+
+
+def _registerCallbacks():
+    if _callbackIds:
+        return
+
+    for message in (
+        om.MSceneMessage.kAfterNew,
+        om.MSceneMessage.kAfterOpen,
+        om.MSceneMessage.kAfterImport,
+        om.MSceneMessage.kAfterCreateReference,
+        om.MSceneMessage.kAfterRemoveReference,
+        om.MSceneMessage.kAfterSave,
+    ):
+        _callbackIds.append(om.MSceneMessage.addCallback(message, invalidateSceneSnapshot))
+
+    for event in ("SelectionChanged", "workspaceChanged", "Undo", "Redo"):
+        _callbackIds.append(om.MEventMessage.addEventCallback(event, invalidateSceneSnapshot))
+
+    _callbackIds.append(om.MDGMessage.addNodeAddedCallback(invalidateSceneSnapshot, "dagNode"))
+    _callbackIds.append(om.MDGMessage.addNodeRemovedCallback(invalidateSceneSnapshot, "dagNode"))
@@ -0,0 +1,361 @@
+"""
+Batched registration of the PublishedFiles of a publish run.
+
+The base publish_file plugin creates each PublishedFile with its own request,
+so a model publish of many assets makes hundreds of round-trips. The plugins
+only prepare the PublishedFile data during publish (register_publish in dry
+run), the registration queue collects it and creates all the PublishedFiles
+of the run with sg.batch in finalize. The dependencies are created once the
+ids are known.
+
+The items with children, like the rig master, are registered right away:
+the base plugin of their children reads the id of the parent publish.
+
+The queued publishes can be saved as JSON payloads and restored in another
+session, to register the publishes of background exports whose session was
+closed before they were written.
+
+The connection is injectable, so the queue can run against a mock ShotGrid:
+
+    queue = PublishRegistrationQueue(connection=mockgun.Shotgun(...))
+"""
+
+import os
+import posixpath
+
+import sgtk
+
+from p3dPipeline.timing import account
+
+
+# Maximum number of requests sent in one sg.batch call.
+BATCH_SIZE = 100
+
+# Fields of the dry run data not accepted by a create request.
+IGNORED_FIELDS = ("type", "id")
+
+
+class QueuedPublish(object):
+    """ A PublishedFile waiting for its registration.
+
+    Args:
+        item            (PublishItem)   : The published item.
+        data            (dict)          : The PublishedFile fields.
+        dependencyPaths (list)          : The paths the publish depends on.
+        dependencyIds   (list)          : The PublishedFile ids the publish
+                                          depends on.
+        thumbnailPath   (str)           : The thumbnail to upload.
+    """
+
+    def __init__(self, item, data, dependencyPaths=None, dependencyIds=None, thumbnailPath=None):
+        self.item               = item
+        self.data               = dict((key, value) for key, value in data.items() if key not in IGNORED_FIELDS)
+        self.dependencyPaths    = list(dependencyPaths or [])
+        self.dependencyIds      = list(dependencyIds or [])
+        self.thumbnailPath      = thumbnailPath
+        self.entity             = None
+
+    def payload(self):
+        """ The publish as a JSON serializable dictionary, without its item.
+
+        The publish of the parent item is kept as a dependency, by id if it
+        is registered, by path otherwise.
+
+        Returns:
+            dict : The payload, restored with fromPayload.
+        """
+        dependencyPaths = list(self.dependencyPaths)
+        dependencyIds   = list(self.dependencyIds)
+
+        parent = self.item.parent if self.item is not None else None
+        if parent is not None:
+            parentData = parent.properties.get("sg_publish_data") or {}
+            if parentData.get("id"):
+                dependencyIds.append(parentData["id"])
+            elif parent.properties.get("path"):
+                dependencyPaths.append(parent.properties["path"])
+
+        return {
+            "data"              : self.data,
+            "dependencyPaths"   : dependencyPaths,
+            "dependencyIds"     : dependencyIds,
+            "thumbnailPath"     : self.thumbnailPath,
+        }
+
+    @classmethod
+    def fromPayload(cls, payload):
+        """ Restore a publish saved with payload. It has no item.
+
+        Args:
+            payload (dict) : The saved publish.
+
+        Returns:
+            QueuedPublish : The publish to register.
+        """
+        return cls(
+            None,
+            payload["data"],
+            dependencyPaths=payload.get("dependencyPaths"),
+            dependencyIds=payload.get("dependencyIds"),
+            thumbnailPath=payload.get("thumbnailPath"),
+        )
+
+
+class PublishRegistrationQueue(object):
+    """ Collect the PublishedFiles of a run and create them in batches.
+
+    Args:
+        connection  (Shotgun)   : The ShotGrid connection. Default to the
+                                  connection of the current engine.
+        tk          (Sgtk)      : The toolkit API used to find the publishes
+                                  of the dependency paths. Default to the
+                                  one of the current engine.
+        batchSize   (int)       : Maximum number of requests per batch.
+    """
+
+    def __init__(self, connection=None, tk=None, batchSize=BATCH_SIZE):
+        self._connection    = connection
+        self._tk            = tk
+        self.batchSize      = batchSize
+        self._queued        = []
+        self._runRoot       = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = sgtk.platform.current_engine().shotgun
+        return self._connection
+
+    @property
+    def tk(self):
+        if self._tk is None:
+            self._tk = sgtk.platform.current_engine().sgtk
+        return self._tk
+
+    def __len__(self):
+        return len(self._queued)
+
+    def publishKwargs(self, kwargs=None, item=None):
+        """ The register_publish arguments preparing the PublishedFile data
+        without creating it.
+
+        Args:
+            kwargs  (dict)          : The arguments given by the base plugin.
+            item    (PublishItem)   : The published item. An item with
+                                      children is registered right away.
+
+        Returns:
+            dict : The arguments to use.
+        """
+        kwargs = dict(kwargs or {})
+        if item is not None and list(item.children):
+            return kwargs
+        kwargs["dry_run"] = True
+        return kwargs
+
+    def add(self, plugin, settings, item):
+        """ Queue the PublishedFile prepared by the base publish of an item.
+
+        Args:
+            plugin      (Hook)          : The publish plugin of the item.
+            settings    (dict)          : The settings of the plugin.
+            item        (PublishItem)   : The published item.
+
+        Returns:
+            QueuedPublish : The queued publish, None if the publish was
+                            already created by the base plugin.
+        """
+        data = item.properties.get("sg_publish_data")
+        if not data or data.get("id"):
+            # The base plugin ignored the dry run, nothing to register.
+            return None
+
+        # A new publish tree means the previous run did not finalize.
+        runRoot = _rootItem(item)
+        if runRoot is not self._runRoot:
+            self.clear()
+            self._runRoot = runRoot
+
+        queued = QueuedPublish(
+            item,
+            data,
+            dependencyPaths=plugin.get_publish_dependencies(settings, item),
+            dependencyIds=item.properties.get("publish_dependency_ids"),
+            thumbnailPath=item.get_thumbnail_as_path(),
+        )
+        self._queued.append(queued)
+        return queued
+
+    def detach(self, items):
+        """ Take the queued publishes of some items out of the run.
+
+        Args:
+            items (list) : The items whose publishes are registered later.
+
+        Returns:
+            PublishRegistrationQueue : A queue holding these publishes, to
+                                       flush once their files are written.
+        """
+        itemIds = set(id(item) for item in items)
+        detached = PublishRegistrationQueue(self._connection, self._tk, self.batchSize)
+        detached._queued = [publish for publish in self._queued if id(publish.item) in itemIds]
+        self._queued = [publish for publish in self._queued if id(publish.item) not in itemIds]
+        return detached
+
+    def splitPublish(self, item, paths):
+        """ Register the queued publish of an item as one PublishedFile per
+        file, like the chunks of a cache exported in frame chunks.
+
+        Args:
+            item    (PublishItem)   : The item whose publish is split.
+            paths   (list)          : The files registered instead of the
+                                      path of the publish.
+
+        Returns:
+            list : The queued publishes of the files, empty if the item has
+                   no queued publish.
+        """
+        for index, publish in enumerate(self._queued):
+            if publish.item is item:
+                break
+        else:
+            return []
+
+        split = []
+        for path in paths:
+            data = dict(publish.data)
+            data["code"] = os.path.basename(path)
+            data["path"] = {"local_path": path}
+            if data.get("path_cache"):
+                # The files are in the directory of the publish path.
+                data["path_cache"] = posixpath.join(
+                    posixpath.dirname(data["path_cache"]), os.path.basename(path)
+                )
+            split.append(QueuedPublish(
+                item,
+                data,
+                dependencyPaths=publish.dependencyPaths,
+                dependencyIds=publish.dependencyIds,
+                thumbnailPath=publish.thumbnailPath,
+            ))
+        self._queued[index:index + 1] = split
+        return split
+
+    def payloads(self):
+        """ The queued publishes as JSON serializable dictionaries.
+
+        Returns:
+            list : The payloads, restored with load.
+        """
+        return [publish.payload() for publish in self._queued]
+
+    def load(self, payloads):
+        """ Queue the publishes saved with payloads.
+
+        Args:
+            payloads (list) : The saved publishes.
+        """
+        self._queued.extend(QueuedPublish.fromPayload(payload) for payload in payloads)
+
+    def clear(self):
+        del self._queued[:]
+        self._runRoot = None
+
+    def flush(self):
+        """ Create the queued PublishedFiles, then their dependencies.
+
+        The created entities are stored in the sg_publish_data property of
+        the items, as the base plugin does. The restored publishes have no
+        item.
+
+        Returns:
+            list : The created PublishedFile entities.
+        """
+        queued = list(self._queued)
+        self.clear()
+        if not queued:
+            return []
+
+        requests = [
+            {"request_type": "create", "entity_type": "PublishedFile", "data": publish.data}
+            for publish in queued
+        ]
+        entities = self._batch(requests)
+        for publish, entity in zip(queued, entities):
+            publish.entity = entity
+            if publish.item is not None:
+                publish.item.properties["sg_publish_data"] = entity
+
+        self._batch(self._dependencyRequests(queued))
+        self._uploadThumbnails(queued)
+
+        return entities
+
+    def _batch(self, requests):
+        results = []
+        for start in range(0, len(requests), self.batchSize):
+            with account("shotgun"):
+                results.extend(self.connection.batch(requests[start:start + self.batchSize]))
+        return results
+
+    def _dependencyRequests(self, queued):
+        # One query for the publishes of all the dependency paths.
+        paths = sorted(set(path for publish in queued for path in publish.dependencyPaths))
+        publishesByPath = {}
+        if paths:
+            with account("shotgun"):
+                publishesByPath = sgtk.util.find_publish(self.tk, paths)
+
+        requests = []
+        for publish in queued:
+            dependencies = [publishesByPath[path] for path in publish.dependencyPaths if path in publishesByPath]
+            dependencies.extend({"type": "PublishedFile", "id": publishId} for publishId in publish.dependencyIds)
+
+            # The parent item publish is known only now.
+            parent = publish.item.parent if publish.item is not None else None
+            parentData = parent.properties.get("sg_publish_data") if parent else None
+            if parentData and parentData.get("id"):
+                dependencies.append({"type": "PublishedFile", "id": parentData["id"]})
+
+            seen = set()
+            for dependency in dependencies:
+                if dependency["id"] in seen or dependency["id"] == publish.entity["id"]:
+                    continue
+                seen.add(dependency["id"])
+                requests.append({
+                    "request_type"  : "create",
+                    "entity_type"   : "PublishedFileDependency",
+                    "data"          : {
+                        "published_file"            : {"type": "PublishedFile", "id": publish.entity["id"]},
+                        "dependent_published_file"  : {"type": "PublishedFile", "id": dependency["id"]},
+                    }
+                })
+        return requests
+
+    def _uploadThumbnails(self, queued):
+        for publish in queued:
+            if not publish.thumbnailPath:
+                continue
+            with account("shotgun"):
+                self.connection.upload_thumbnail("PublishedFile", publish.entity["id"], publish.thumbnailPath)
+
+
+def _rootItem(item):
+    while item.parent is not None:
+        item = item.parent
+    return item
+
+
+_queue = None
+
+
+def getRegistrationQueue():
+    """ Return the shared registration queue.
+
+    Returns:
+        PublishRegistrationQueue : The queue shared by the publish plugins.
+    """
+    global _queue
+    if _queue is None:
+        _queue = PublishRegistrationQueue()
+    return _queue
@@ -0,0 +1,83 @@
+"""
+JSON sidecar files of the published files.
+
+Each published file can have a <file>.json sidecar next to it, describing the
+content of the file for the later publishes and for the loader.
+
+The sidecar of a cache exported in frame chunks is its manifest: it lists the
+chunk files and their frame ranges, the cache itself is not written. The
+sidecar of each chunk also lists the chunks, so the whole cache is found from
+any of its chunk publishes.
+"""
+
+import json
+import os
+
+
+SIDECAR_EXTENSION = ".json"
+
+# Sidecar key of the chunk list of a cache exported in frame chunks.
+CHUNKS_KEY = "chunks"
+
+
+def sidecarPath(path):
+    """ The sidecar path of a published file.
+
+    Args:
+        path (str) : The published file.
+
+    Returns:
+        str : The path of its sidecar.
+    """
+    return path + SIDECAR_EXTENSION
+
+
+def readSidecar(path):
+    """ Read the sidecar of a published file.
+
+    Args:
+        path (str) : The published file.
+
+    Returns:
+        dict : The sidecar data, empty if there is no readable sidecar.
+    """
+    try:
+        with open(sidecarPath(path), "r") as sidecarFile:
+            return json.load(sidecarFile)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def updateSidecar(path, data):
+    """ Merge data into the sidecar of a published file.
+
+    Args:
+        path (str)  : The published file.
+        data (dict) : The values to set in the sidecar.
+
+    Returns:
+        dict : The sidecar data written.
+    """
+    sidecar = readSidecar(path)
+    sidecar.update(data)
+
+    target = sidecarPath(path)
+    tempPath = "%s.%d.tmp" % (target, os.getpid())
+    with open(tempPath, "w") as sidecarFile:
+        json.dump(sidecar, sidecarFile, indent=2, sort_keys=True)
+    os.replace(tempPath, target)
+    return sidecar
+
+
+def readChunks(path):
+    """ The chunks of a cache exported in frame chunks.
+
+    Args:
+        path (str) : The published cache, or one of its chunks.
+
+    Returns:
+        list : The chunk dictionaries, with their path, start and end frames,
+               sorted by start frame. Empty if the cache is a single file.
+    """
+    chunks = readSidecar(path).get(CHUNKS_KEY) or []
+    return sorted(chunks, key=lambda chunk: chunk["start"])
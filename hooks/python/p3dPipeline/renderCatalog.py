@@ -0,0 +1,115 @@
+"""
+Catalog of the render outputs on disk.
+
+Each render output directory is listed once, whatever the number of render
+layers writing in it. The files are grouped into frame sequences so the
+collector gets the first frame, the frame range and the missing frames
+without globbing the frames of every layer.
+"""
+
+import os
+import re
+
+from p3dPipeline.timing import account
+
+
+class FrameSequence(object):
+    """ A frame sequence found on disk.
+
+    Args:
+        directory   (str)   : The directory of the sequence.
+        frames      (dict)  : Frame number to file name.
+    """
+
+    def __init__(self, directory, frames):
+        self.directory  = directory
+        self.frames     = sorted(frames)
+        self._names     = frames
+
+    @property
+    def firstFrame(self):
+        return self.frames[0]
+
+    @property
+    def lastFrame(self):
+        return self.frames[-1]
+
+    @property
+    def frameRange(self):
+        return (self.firstFrame, self.lastFrame)
+
+    @property
+    def firstPath(self):
+        return os.path.join(self.directory, self._names[self.firstFrame])
+
+    @property
+    def paths(self):
+        return [os.path.join(self.directory, self._names[frame]) for frame in self.frames]
+
+    @property
+    def missingFrames(self):
+        """ The frames of the range without file on disk.
+        """
+        present = set(self.frames)
+        return [frame for frame in range(self.firstFrame, self.lastFrame + 1) if frame not in present]
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class RenderOutputCatalog(object):
+    """ Index the render output directories, each one is read only once.
+    """
+
+    def __init__(self):
+        self._listings = {}
+
+    def listDirectory(self, directory):
+        """ Return the file names of a directory, from the cache if already read.
+
+        Args:
+            directory (str) : The directory to list.
+
+        Returns:
+            list : The file names, empty if the directory does not exist.
+        """
+        directory = os.path.normpath(directory)
+        if directory not in self._listings:
+            try:
+                with account("fs"), os.scandir(directory) as entries:
+                    self._listings[directory] = [entry.name for entry in entries]
+            except (FileNotFoundError, NotADirectoryError):
+                self._listings[directory] = []
+        return self._listings[directory]
+
+    def findSequence(self, frameGlob):
+        """ Find the frame sequence matching a render output pattern.
+
+        Args:
+            frameGlob (str) : The output path with the frame number replaced
+                              by '*', as given by cmds.renderSettings.
+
+        Returns:
+            FrameSequence : The sequence found on disk, None if there is no file.
+        """
+        directory, pattern = os.path.split(os.path.normpath(frameGlob))
+        if "*" not in pattern:
+            return None
+
+        prefix, suffix = pattern.split("*", 1)
+        flags = re.IGNORECASE if os.name == "nt" else 0
+        frameRegex = re.compile(
+            "^%s(-?\\d+)%s$" % (re.escape(prefix), re.escape(suffix).replace("\\*", ".*")),
+            flags
+        )
+
+        frames = {}
+        for name in self.listDirectory(directory):
+            match = frameRegex.match(name)
+            if match:
+                frames.setdefault(int(match.group(1)), name)
+
+        if not frames:
+            return None
+
+        return FrameSequence(directory, frames)
@@ -0,0 +1,139 @@
+"""
+Batched scan of the dependencies of the Maya scene.
+
+The references and the file textures used to be queried with one command per
+node. The scanner gets the reference files in one call and reads the file
+textures in a single pass over the file nodes with the API. The result is
+kept as long as the saved scene does not change.
+"""
+
+import os
+import re
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from p3dPipeline.timing import account
+
+
+# Copy number added by Maya to the files referenced more than once.
+COPY_NUMBER_REGEX = re.compile(r"\{\d+\}$")
+
+
+class SceneDependencyScanner(object):
+    """ Scan the references and the file textures of the scene.
+
+    The result is cached against the state of the saved scene. A scene with
+    unsaved changes is always scanned again.
+    """
+
+    def __init__(self):
+        self._stateKey      = None
+        self._dependencies  = None
+
+    def invalidate(self):
+        self._stateKey      = None
+        self._dependencies  = None
+
+    def findDependencies(self):
+        """ Find the files the scene depends on.
+
+        Returns:
+            list : The reference and texture paths, with platform separators.
+        """
+        stateKey = _sceneStateKey()
+        if stateKey is None or stateKey != self._stateKey:
+            self._dependencies  = self.scan()
+            self._stateKey      = stateKey
+        return list(self._dependencies)
+
+    def scan(self):
+        """ Scan the scene, ignoring the cache.
+
+        Returns:
+            list : The reference and texture paths, with platform separators.
+        """
+        paths = set()
+        with account("maya"):
+            paths.update(findReferencePaths())
+            paths.update(findTexturePaths())
+        return sorted(paths)
+
+
+def findReferencePaths():
+    """ Get the files of all the references with a single call.
+
+    Returns:
+        set : The reference paths, without copy number.
+    """
+    paths = set()
+    for path in om.MFileIO.getReferences() or []:
+        path = COPY_NUMBER_REGEX.sub("", path)
+        if path:
+            paths.add(path.replace("/", os.path.sep))
+    return paths
+
+
+def findTexturePaths(includeReferenced=False):
+    """ Read the texture paths of the file nodes in one pass.
+
+    Args:
+        includeReferenced (bool) : Also read the file nodes coming from
+                                   references.
+
+    Returns:
+        set : The texture paths, with the tile and frame tokens of the tiled
+              and animated textures.
+    """
+    paths       = set()
+    nodeFn      = om.MFnDependencyNode()
+    iterator    = om.MItDependencyNodes(om.MFn.kFileTexture)
+    while not iterator.isDone():
+        nodeFn.setObject(iterator.thisNode())
+        iterator.next()
+
+        # The textures of the references are dependencies of the references.
+        if not includeReferenced and nodeFn.isFromReferencedFile:
+            continue
+
+        # The pattern holds the <UDIM> and <f> tokens of the tiled and
+        # animated textures, the plain name is used for the others.
+        path = nodeFn.findPlug("computedFileTextureNamePattern", False).asString()
+        if "<" not in path:
+            path = nodeFn.findPlug("fileTextureName", False).asString()
+        if path:
+            paths.add(path.replace("/", os.path.sep))
+    return paths
+
+
+def _sceneStateKey():
+    """ The key of the saved scene state, None if the scene has unsaved changes.
+    """
+    with account("maya"):
+        if cmds.file(query=True, modified=True):
+            return None
+        sceneName = cmds.file(query=True, sceneName=True)
+
+    if not sceneName:
+        return None
+
+    try:
+        stat = os.stat(sceneName)
+    except OSError:
+        return None
+    return (sceneName, stat.st_mtime_ns, stat.st_size)
+
+
+_scanner = None
+
+
+def getDependencyScanner():
+    """ Return the shared dependency scanner.
+
+    Returns:
+        SceneDependencyScanner : The scanner shared by the publish plugins.
+    """
+    global _scanner
+    if _scanner is None:
+        _scanner = SceneDependencyScanner()
+    return _scanner
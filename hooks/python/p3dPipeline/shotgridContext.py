@@ -0,0 +1,206 @@
+"""
+Cached snapshot of the ShotGrid context used by the publish hooks.
+
+The collector and the publish plugins all need the current entity, step and
+task. Building a pipelineFramework Shotgrid object in every hook means a new
+set of round-trips each time, so the snapshot resolves everything once with a
+single Task query and keeps it until the TTL expires or the toolkit context
+changes.
+"""
+
+import time
+
+import sgtk
+
+from p3dPipeline.timing import account
+
+
+# Seconds a snapshot stays valid. One publish run is well under that.
+DEFAULT_TTL = 120.0
+
+# Task fields resolved in the single query. The linked fields give us the
+# entity, the cut of the shot and the step without extra requests.
+TASK_FIELDS = [
+    "content",
+    "entity",
+    "entity.Shot.sg_cut_in",
+    "entity.Shot.sg_cut_out",
+    "step",
+    "step.Step.code",
+    "step.Step.short_name",
+]
+
+SHOT_CUT_FIELDS = ["sg_cut_in", "sg_cut_out"]
+
+
+class ContextSnapshot(object):
+    """ Snapshot of the current entity, step and task.
+
+    Exposes the same currentEntity, currentStep and currentTask dictionaries
+    as pipelineFramework.shotgrid.Shotgrid so it can be used in place of it.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl            = ttl
+        self._context       = None
+        self._timestamp     = None
+        self._entity        = None
+        self._step          = None
+        self._task          = None
+        self._cutRange      = None
+        self._namingTemplate = None
+
+    @property
+    def currentEntity(self):
+        self._ensureFresh()
+        return self._entity
+
+    @property
+    def currentStep(self):
+        self._ensureFresh()
+        return self._step
+
+    @property
+    def currentTask(self):
+        self._ensureFresh()
+        return self._task
+
+    @property
+    def cutRange(self):
+        """ The cut in and cut out of the current shot.
+
+        Returns:
+            tuple : (cutIn, cutOut), None if the context is not a shot or the
+                    cut is not set.
+        """
+        self._ensureFresh()
+        if self._cutRange is None:
+            self._cutRange = ()
+            if self._entity.get("type") == "Shot" and self._entity.get("id"):
+                with account("shotgun"):
+                    shot = _currentContext().sgtk.shotgun.find_one(
+                        "Shot",
+                        [["id", "is", self._entity["id"]]],
+                        SHOT_CUT_FIELDS
+                    )
+                if shot:
+                    self._cutRange = _cutRange(shot.get("sg_cut_in"), shot.get("sg_cut_out"))
+        return self._cutRange or None
+
+    @property
+    def taskNamingTemplate(self):
+        """ The task naming template resolved from the current task name.
+
+        Returns:
+            tuple : (taskTemplateName, taskTemplate, taskTagsValues) as
+                    returned by TemplateTools.getTaskNamingTemplate.
+        """
+        self._ensureFresh()
+        if self._namingTemplate is None:
+            self._namingTemplate = (None, None, {})
+            if self._task and self._task.get("name"):
+                from pipelineFramework.templates import TemplateTools
+                self._namingTemplate = TemplateTools().getTaskNamingTemplate(self._task["name"])
+        return self._namingTemplate
+
+    def invalidate(self):
+        """ Drop the cached values, the next access queries ShotGrid again.
+        """
+        self._context       = None
+        self._timestamp     = None
+        self._entity        = None
+        self._step          = None
+        self._task          = None
+        self._cutRange      = None
+        self._namingTemplate = None
+
+    def isValid(self, context=None):
+        """ Check if the cached values can still be used.
+
+        Args:
+            context (sgtk.Context) : The context to compare with. Default to
+                                     the current engine context.
+        """
+        if self._timestamp is None:
+            return False
+        if (time.time() - self._timestamp) > self.ttl:
+            return False
+        if context is None:
+            context = _currentContext()
+        return context == self._context
+
+    def _ensureFresh(self):
+        context = _currentContext()
+        if not self.isValid(context):
+            self._refresh(context)
+
+    def _refresh(self, context):
+        self.invalidate()
+
+        entity  = _entityDict(context.entity)
+        step    = _entityDict(context.step)
+        task    = _entityDict(context.task)
+
+        # One query gives the task, its entity and its step.
+        if context.task:
+            with account("shotgun"):
+                sgTask = context.sgtk.shotgun.find_one(
+                    "Task",
+                    [["id", "is", context.task["id"]]],
+                    TASK_FIELDS
+                )
+            if sgTask:
+                task["name"] = sgTask.get("content") or task.get("name")
+                if sgTask.get("entity"):
+                    entity = _entityDict(sgTask["entity"])
+                    if entity["type"] == "Shot":
+                        self._cutRange = _cutRange(
+                            sgTask.get("entity.Shot.sg_cut_in"),
+                            sgTask.get("entity.Shot.sg_cut_out")
+                        )
+                if sgTask.get("step"):
+                    step = _entityDict(sgTask["step"])
+                    step["code"]        = sgTask.get("step.Step.code")
+                    step["short_name"]  = sgTask.get("step.Step.short_name")
+
+        self._context   = context
+        self._entity    = entity
+        self._step      = step
+        self._task      = task
+        self._timestamp = time.time()
+
+
+def _currentContext():
+    engine = sgtk.platform.current_engine()
+    return engine.context
+
+
+def _cutRange(cutIn, cutOut):
+    if cutIn is None or cutOut is None:
+        return ()
+    return (int(cutIn), int(cutOut))
+
+
+def _entityDict(entity):
+    if not entity:
+        return {}
+    return {
+        "type"  : entity.get("type"),
+        "id"    : entity.get("id"),
+        "name"  : entity.get("name"),
+    }
+
+
+_snapshot = None
+
+
+def getContextSnapshot():
+    """ Return the shared context snapshot.
+
+    Returns:
+        ContextSnapshot : The snapshot shared by all the publish hooks.
+    """
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = ContextSnapshot()
+    return _snapshot
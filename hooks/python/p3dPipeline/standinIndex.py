@@ -0,0 +1,254 @@
+"""
+Index of the aiStandIn nodes of the scene by asset name.
+
+Applying a MaterialX look to the stand-ins of an asset made the shading
+loader look for them in the whole scene, once per look, which is slow in a
+set dressed shot with thousands of stand-ins. The stand-ins are now indexed
+by asset name, the index being built once from the scene and kept up to date
+by Maya node added and node removed callbacks. A stand-in whose asset or
+cache attribute is set is indexed again by an attribute changed callback.
+Opening, importing, referencing or undoing rebuilds it on the next lookup.
+
+The asset of a stand-in is read from the ASSET_ATTRIBUTE attribute set
+by the loader when it instances the stand-in, or from the asset root of the
+path of its cache for the stand-ins created by other tools.
+"""
+
+import contextlib
+import re
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+
+from p3dPipeline.timing import account
+
+
+STANDIN_TYPE = "aiStandIn"
+
+# String attribute of the stand-in shapes holding their asset name.
+ASSET_ATTRIBUTE = "p3dAsset"
+
+# Attribute of the stand-in shapes holding the cache path.
+CACHE_ATTRIBUTE = "dso"
+
+# The asset name in a publish path, as defined by the asset_root template.
+ASSET_PATH_REGEX = re.compile(r"[\\/]assets[\\/][^\\/]+[\\/]([^\\/]+)[\\/]")
+
+
+class StandInIndex(object):
+    """ The aiStandIn shapes of the scene, by asset name.
+    """
+
+    def __init__(self):
+        self._assets    = {}
+        self._nodes     = {}
+        self._pending   = {}
+        self._watched   = {}
+        self._built     = False
+
+    def standIns(self, asset):
+        """ The stand-ins of an asset.
+
+        Args:
+            asset (str) : The asset name.
+
+        Returns:
+            list : The full DAG paths of the aiStandIn shapes of the asset.
+        """
+        self._update()
+        paths = []
+        for key in list(self._assets.get(asset, ())):
+            handle = self._nodes[key][1]
+            if not handle.isValid():
+                self._remove(key)
+                continue
+            paths.extend(
+                dagPath.fullPathName() for dagPath in om.MDagPath.getAllPathsTo(handle.object())
+            )
+        return sorted(paths)
+
+    def tag(self, standIns, asset):
+        """ Store the asset of stand-ins created by the loader.
+
+        Args:
+            standIns    (list)  : The aiStandIn shapes.
+            asset       (str)   : The asset name.
+        """
+        for standIn in standIns:
+            if not cmds.attributeQuery(ASSET_ATTRIBUTE, node=standIn, exists=True):
+                cmds.addAttr(standIn, longName=ASSET_ATTRIBUTE, dataType="string")
+            cmds.setAttr("%s.%s" % (standIn, ASSET_ATTRIBUTE), asset, type="string")
+            self.add(_dependNode(standIn))
+
+    def add(self, node):
+        """ Index a new stand-in, or a stand-in whose attributes changed. Its
+        asset is read on the next lookup, once its attributes are set.
+        """
+        handle = om.MObjectHandle(node)
+        key = handle.hashCode()
+        self._remove(key)
+        self._pending[key] = handle
+        if key not in self._watched:
+            self._watched[key] = om.MNodeMessage.addAttributeChangedCallback(
+                node, _attributeChanged
+            )
+
+    def remove(self, node):
+        key = om.MObjectHandle(node).hashCode()
+        self._remove(key)
+        _removeCallback(self._watched.pop(key, None))
+
+    def clear(self, *args):
+        for callbackId in self._watched.values():
+            _removeCallback(callbackId)
+        self._watched.clear()
+        self._assets.clear()
+        self._nodes.clear()
+        self._pending.clear()
+        self._built = False
+
+    def _update(self):
+        if not self._built:
+            self.clear()
+            with account("maya"):
+                for standIn in cmds.ls(type=STANDIN_TYPE, long=True) or []:
+                    self.add(_dependNode(standIn))
+            self._built = True
+
+        pending, self._pending = self._pending, {}
+        with account("maya"):
+            for key, handle in pending.items():
+                if not handle.isValid():
+                    continue
+                asset = standInAsset(handle.object())
+                if asset:
+                    self._nodes[key] = (asset, handle)
+                    self._assets.setdefault(asset, set()).add(key)
+
+    def _remove(self, key):
+        self._pending.pop(key, None)
+        asset, _ = self._nodes.pop(key, (None, None))
+        if asset is not None:
+            self._assets[asset].discard(key)
+            if not self._assets[asset]:
+                del self._assets[asset]
+
+
+def standInAsset(node):
+    """ The asset of a stand-in.
+
+    Args:
+        node (MObject) : The aiStandIn shape.
+
+    Returns:
+        str : The asset name, None if it is not known.
+    """
+    nodeFn = om.MFnDependencyNode(node)
+    if nodeFn.hasAttribute(ASSET_ATTRIBUTE):
+        asset = nodeFn.findPlug(ASSET_ATTRIBUTE, False).asString()
+        if asset:
+            return asset
+    if nodeFn.hasAttribute(CACHE_ATTRIBUTE):
+        match = ASSET_PATH_REGEX.search(nodeFn.findPlug(CACHE_ATTRIBUTE, False).asString())
+        if match:
+            return match.group(1)
+    return None
+
+
+@contextlib.contextmanager
+def batchedEdit():
+    """ Apply scene edits in one batch, without recording them in the undo
+    queue nor refreshing the viewport.
+    """
+    undoState = cmds.undoInfo(query=True, stateWithoutFlush=True)
+    cmds.undoInfo(stateWithoutFlush=False)
+    cmds.refresh(suspend=True)
+    try:
+        yield
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(stateWithoutFlush=undoState)
+
+
+def _dependNode(name):
+    selection = om.MSelectionList()
+    selection.add(name)
+    return selection.getDependNode(0)
+
+
+_index          = None
+_callbackIds    = []
+
+
+def getStandInIndex():
+    """ Return the stand-in index of the session.
+
+    Returns:
+        StandInIndex : The index shared by the loader actions.
+    """
+    global _index
+    if _index is None:
+        _index = StandInIndex()
+        _registerCallbacks()
+    return _index
+
+
+def _nodeAdded(node, *args):
+    if _index is not None and _isStandIn(node):
+        _index.add(node)
+
+
+def _nodeRemoved(node, *args):
+    if _index is not None and _isStandIn(node):
+        _index.remove(node)
+
+
+def _attributeChanged(message, plug, otherPlug, *args):
+    # The asset of the stand-in is read again on the next lookup.
+    if _index is None or not message & om.MNodeMessage.kAttributeSet:
+        return
+    if om.MFnAttribute(plug.attribute()).name in (ASSET_ATTRIBUTE, CACHE_ATTRIBUTE):
+        _index.add(plug.node())
+
+
+def _removeCallback(callbackId):
+    if callbackId is None:
+        return
+    try:
+        om.MMessage.removeCallback(callbackId)
+    except RuntimeError:
+        # The callbacks of a deleted node are already removed.
+        pass
+
+
+def _isStandIn(node):
+    return om.MFnDependencyNode(node).typeName == STANDIN_TYPE
+
+
+def _registerCallbacks():
+    if _callbackIds:
+        return
+
+    for message in (
+        om.MSceneMessage.kAfterNew,
+        om.MSceneMessage.kAfterOpen,
+        om.MSceneMessage.kAfterImport,
+        om.MSceneMessage.kAfterCreateReference,
+        om.MSceneMessage.kAfterLoadReference,
+        om.MSceneMessage.kAfterRemoveReference,
+        om.MSceneMessage.kAfterUnloadReference,
+    ):
+        _callbackIds.append(om.MSceneMessage.addCallback(message, _clearIndex))
+
+    for event in ("Undo", "Redo"):
+        _callbackIds.append(om.MEventMessage.addEventCallback(event, _clearIndex))
+
+    # The stand-in type is only known once MtoA is loaded.
+    nodeType = STANDIN_TYPE if cmds.pluginInfo("mtoa", query=True, loaded=True) else "dagNode"
+    _callbackIds.append(om.MDGMessage.addNodeAddedCallback(_nodeAdded, nodeType))
+    _callbackIds.append(om.MDGMessage.addNodeRemovedCallback(_nodeRemoved, nodeType))
+
+
+def _clearIndex(*args):
+    if _index is not None:
+        _index.clear()
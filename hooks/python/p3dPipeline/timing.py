@@ -0,0 +1,360 @@
+"""
+Timing of the publish hooks.
+
+Every collect method of the collector and every accept, validate, publish and
+finalize of the publish plugins is recorded as a span. Spans are nested, keep
+the item and the plugin they ran for, and count the time spent in Maya
+commands and on the filesystem while they were open.
+
+Spans are appended to a local JSON-lines file as soon as their top level span
+ends. A summary of the slowest items is written at the end of each run. A run
+starts with the collection, or with the first validation after it. The log
+file is rotated when a session starts and it is larger than MAX_LOG_SIZE.
+
+The maya.cmds and maya.mel modules imported by the decorated hooks are
+wrapped by the decorators, so their calls are accounted in the spans.
+
+Set P3D_PUBLISH_TIMING=1 to enable the timing, and P3D_PUBLISH_TIMING_LOG to
+change the path of the log file.
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import types
+import uuid
+
+
+ENV_ENABLED     = "P3D_PUBLISH_TIMING"
+ENV_LOG_PATH    = "P3D_PUBLISH_TIMING_LOG"
+
+PLUGIN_METHODS      = ("accept", "validate", "publish", "finalize")
+COLLECTOR_METHODS   = ("process_current_session", "process_file")
+
+# Number of items listed in the run summary.
+SUMMARY_SIZE = 10
+
+# Size of the log file above which it is rotated, in bytes.
+MAX_LOG_SIZE = 10 * 1024 * 1024
+
+# Modules accounted in the spans of the decorated hooks, by module name.
+INSTRUMENTED_MODULES = {
+    "maya.cmds" : "maya",
+    "maya.mel"  : "maya",
+}
+
+
+class Span(object):
+    """ A timed call, with the time spent in Maya and on the filesystem.
+    """
+
+    def __init__(self, name, phase, parent, attributes):
+        self.id         = uuid.uuid4().hex[:12]
+        self.name       = name
+        self.phase      = phase
+        self.parent     = parent
+        self.attributes = attributes
+        self.start      = time.time()
+        self.duration   = None
+        self.accounted  = {}
+
+    def account(self, category, duration):
+        elapsed, calls = self.accounted.get(category, (0.0, 0))
+        self.accounted[category] = (elapsed + duration, calls + 1)
+
+    def toRecord(self, runId):
+        record = {
+            "type"      : "span",
+            "run"       : runId,
+            "id"        : self.id,
+            "parent"    : self.parent.id if self.parent else None,
+            "name"      : self.name,
+            "phase"     : self.phase,
+            "start"     : self.start,
+            "duration"  : self.duration,
+        }
+        record.update(self.attributes)
+        for category, (elapsed, calls) in self.accounted.items():
+            record["%sTime" % category]     = elapsed
+            record["%sCalls" % category]    = calls
+        return record
+
+
+class Tracer(object):
+    """ Record the spans of the publish runs in a JSON-lines file.
+
+    Args:
+        logPath (str) : The JSON-lines file the spans are appended to.
+    """
+
+    def __init__(self, logPath):
+        self.logPath        = logPath
+        self.runId          = None
+        self._local         = threading.local()
+        self._lock          = threading.Lock()
+        self._lastPhase     = None
+        self._itemTimes     = {}
+        self._runStart      = None
+
+    @property
+    def currentSpan(self):
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextlib.contextmanager
+    def span(self, name, phase=None, **attributes):
+        """ Time the code of the with block as a span.
+
+        Args:
+            name    (str) : Name of the span.
+            phase   (str) : Publish phase, collect, accept, validate, publish
+                            or finalize.
+        """
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        stack = self._local.stack
+
+        parent = stack[-1] if stack else None
+        if parent is None:
+            self._startPhase(phase)
+        elif phase is None:
+            phase = parent.phase
+
+        span = Span(name, phase, parent, attributes)
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            span.duration = time.time() - span.start
+            stack.pop()
+            self._spanEnded(span)
+
+    @contextlib.contextmanager
+    def account(self, category):
+        """ Add the time of the with block to the category of the current span.
+
+        Args:
+            category (str) : maya or fs.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            span = self.currentSpan
+            if span is not None:
+                span.account(category, time.time() - start)
+
+    def endRun(self):
+        """ Write the summary of the current run.
+        """
+        with self._lock:
+            if self.runId is None:
+                return
+            slowest = sorted(self._itemTimes.items(), key=lambda itemTime: itemTime[1], reverse=True)
+            self._write([{
+                "type"      : "summary",
+                "run"       : self.runId,
+                "start"     : self._runStart,
+                "duration"  : time.time() - self._runStart,
+                "slowestItems" : [
+                    {"item": item, "duration": duration}
+                    for item, duration in slowest[:SUMMARY_SIZE]
+                ],
+            }])
+            self.runId      = None
+            self._itemTimes = {}
+
+    def _startPhase(self, phase):
+        newRun = phase == "collect" or (phase == "validate" and self._lastPhase != "validate")
+        if newRun or self.runId is None:
+            self.endRun()
+            self.runId      = uuid.uuid4().hex[:12]
+            self._runStart  = time.time()
+        if phase is not None:
+            self._lastPhase = phase
+
+    def _spanEnded(self, span):
+        item = span.attributes.get("item")
+        if item is not None and span.parent is None:
+            self._itemTimes[item] = self._itemTimes.get(item, 0.0) + span.duration
+
+        # Keep the closed spans on their top level span, and write the whole
+        # tree once the top level span ends.
+        if span.parent is not None:
+            span.parent.attributes.setdefault("_children", []).append(span)
+            return
+
+        records = []
+        pending = [span]
+        while pending:
+            current = pending.pop()
+            pending.extend(current.attributes.pop("_children", []))
+            records.append(current.toRecord(self.runId))
+        with self._lock:
+            self._write(records)
+
+    def _write(self, records):
+        try:
+            with open(self.logPath, "a") as logFile:
+                for record in records:
+                    logFile.write(json.dumps(record, default=str) + "\n")
+        except (IOError, OSError):
+            pass
+
+
+class _NullTracer(object):
+    """ Tracer used when the timing is disabled.
+    """
+
+    currentSpan = None
+
+    @contextlib.contextmanager
+    def span(self, name, phase=None, **attributes):
+        yield None
+
+    @contextlib.contextmanager
+    def account(self, category):
+        yield
+
+    def endRun(self):
+        pass
+
+
+_tracer = None
+
+
+def getTracer():
+    """ Return the tracer shared by all the hooks.
+    """
+    global _tracer
+    if _tracer is None:
+        if os.environ.get(ENV_ENABLED, "0") != "1":
+            _tracer = _NullTracer()
+        else:
+            logPath = os.environ.get(ENV_LOG_PATH) or os.path.join(
+                tempfile.gettempdir(), "p3dPublishTiming.jsonl"
+            )
+            _rotateLog(logPath)
+            _tracer = Tracer(logPath)
+            atexit.register(_tracer.endRun)
+    return _tracer
+
+
+def _rotateLog(logPath):
+    try:
+        if os.path.getsize(logPath) > MAX_LOG_SIZE:
+            os.replace(logPath, logPath + ".1")
+    except OSError:
+        pass
+
+
+def account(category):
+    """ Add the time of a with block to the category of the current span.
+    """
+    return getTracer().account(category)
+
+
+def timedPlugin(cls):
+    """ Class decorator timing the accept, validate, publish and finalize of a
+    publish plugin hook.
+    """
+    _instrumentHookModule(cls)
+    for methodName in PLUGIN_METHODS:
+        method = getattr(cls, methodName, None)
+        if method is not None:
+            setattr(cls, methodName, _timedPluginMethod(cls.__name__, methodName, method))
+    return cls
+
+
+def timedCollector(cls):
+    """ Class decorator timing the process and collect methods of a collector
+    hook.
+    """
+    _instrumentHookModule(cls)
+    for methodName in dir(cls):
+        if methodName in COLLECTOR_METHODS or methodName.startswith("collect_"):
+            method = getattr(cls, methodName)
+            if callable(method):
+                setattr(cls, methodName, _timedCollectorMethod(cls.__name__, methodName, method))
+    return cls
+
+
+def _timedPluginMethod(className, phase, method):
+    @functools.wraps(method)
+    def wrapper(self, settings, item, *args, **kwargs):
+        with getTracer().span(
+            "%s.%s" % (className, phase),
+            phase=phase,
+            plugin=className,
+            item=getattr(item, "name", None),
+            itemType=getattr(item, "type_spec", None),
+        ):
+            return method(self, settings, item, *args, **kwargs)
+    return wrapper
+
+
+def _timedCollectorMethod(className, methodName, method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        targets = [arg for arg in args if isinstance(arg, str)]
+        with getTracer().span(
+            "%s.%s" % (className, methodName),
+            phase="collect",
+            target=targets[0] if targets else None,
+        ):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class _InstrumentedModule(object):
+
+    def __init__(self, module, category):
+        self._module    = module
+        self._category  = category
+
+    def __getattr__(self, name):
+        attribute = getattr(self._module, name)
+        if not callable(attribute):
+            return attribute
+
+        category = self._category
+
+        @functools.wraps(attribute)
+        def wrapper(*args, **kwargs):
+            with account(category):
+                return attribute(*args, **kwargs)
+
+        # Keep the wrapper, the next calls do not go through __getattr__.
+        setattr(self, name, wrapper)
+        return wrapper
+
+
+def _instrumentHookModule(cls):
+    # The module of the hook is the globals of its methods.
+    for attribute in vars(cls).values():
+        hookGlobals = getattr(attribute, "__globals__", None)
+        if hookGlobals is not None:
+            break
+    else:
+        return
+
+    for name, value in list(hookGlobals.items()):
+        if isinstance(value, types.ModuleType) and value.__name__ in INSTRUMENTED_MODULES:
+            hookGlobals[name] = instrumentModule(value, INSTRUMENTED_MODULES[value.__name__])
+
+
+def instrumentModule(module, category):
+    """ Wrap a module so the time of its calls is accounted in the current span.
+
+    Args:
+        module      (module)    : maya.cmds or maya.mel.
+        category    (str)       : The category the calls are accounted in.
+    """
+    if isinstance(getTracer(), _NullTracer):
+        return module
+    return _InstrumentedModule(module, category)
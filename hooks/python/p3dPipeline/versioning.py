@@ -0,0 +1,484 @@
+"""
+Version resolution from one directory listing, with on-disk reservation.
+
+The next free version used to be found by checking the versions one by one,
+one network stat each. The resolver lists the directory holding the version
+once and takes the highest {version} matching the template. The chosen
+version is then reserved with a file created atomically next to the target,
+so two artists publishing the same asset can not take the same number.
+
+The reservations of the current process are ignored by the listings, so
+validating again does not skip a version. They are released once the file is
+written or its export failed, or when the process exits. The directories
+created for a reservation are removed with it when they stay empty, so a
+failed publish does not leave a version directory behind.
+"""
+
+import atexit
+import getpass
+import os
+import re
+import socket
+import time
+
+from p3dPipeline.timing import account
+
+
+VERSION_KEY = "version"
+
+# Version applied to find where the version appears in a path.
+SENTINEL_VERSION = 987654321
+
+# Suffix of the reservation files. They are hidden next to the target path.
+RESERVATION_SUFFIX = ".reserved"
+
+# Seconds after which a reservation left by a crashed publish is ignored.
+RESERVATION_TTL = 6 * 3600
+
+# Item property holding the reservation of the publish plugins.
+RESERVATION_PROPERTY = "versionReservation"
+
+
+class VersionReservationError(Exception):
+    """ The version is already reserved by another publish.
+    """
+
+
+class Reservation(object):
+    """ A version reserved on disk.
+
+    Args:
+        path                (str)   : The path of the reserved version.
+        version             (int)   : The reserved version.
+        lockPath            (str)   : The reservation file.
+        createdDirectory    (str)   : The topmost directory created for the
+                                      reservation, None if the directory of
+                                      the reservation file existed.
+    """
+
+    def __init__(self, path, version, lockPath, createdDirectory=None):
+        self.path               = path
+        self.version            = version
+        self.lockPath           = lockPath
+        self.createdDirectory   = createdDirectory
+        _heldReservations[lockPath] = self
+
+    def release(self):
+        """ Remove the reservation file, once the version is written or its
+        export failed. The directories created for the reservation are
+        removed if nothing was written in them.
+        """
+        if _heldReservations.pop(self.lockPath, None) is None:
+            return
+        try:
+            os.remove(self.lockPath)
+        except OSError:
+            pass
+        _removeEmptyDirectories(os.path.dirname(self.lockPath), self.createdDirectory)
+
+
+class VersionResolver(object):
+    """ Find and reserve the versions of the paths of a template.
+    """
+
+    def listVersions(self, template, fields):
+        """ List the versions used on disk with a single directory listing.
+
+        Args:
+            template    (TemplatePath)  : The versioned template.
+            fields      (dict)          : The fields of the template. The
+                                          version field is ignored.
+
+        Returns:
+            set : The versions found on disk, published or reserved by
+                  another process.
+        """
+        directory, regex = _versionLocation(template, fields)
+
+        versions = set()
+        try:
+            with account("fs"), os.scandir(directory) as entries:
+                names = [entry.name for entry in entries]
+        except OSError:
+            return versions
+
+        owner = _owner()
+        for name in names:
+            if name.startswith(".") and name.endswith(RESERVATION_SUFFIX):
+                # Only the reservations of the other publishes are taken.
+                lockPath = os.path.join(directory, name)
+                if lockPath in _heldReservations or _isStale(lockPath):
+                    continue
+                if _readOwner(lockPath) == owner:
+                    continue
+                name = name[1:-len(RESERVATION_SUFFIX)]
+            match = regex.match(name)
+            if match:
+                versions.add(int(match.group(1)))
+        return versions
+
+    def maxVersion(self, template, fields, otherTemplates=()):
+        """ The highest version on disk, 0 if there is none.
+
+        Args:
+            template        (TemplatePath)  : The versioned template.
+            fields          (dict)          : The fields of the templates.
+            otherTemplates  (list)          : Other templates sharing the
+                                              version, like the publish
+                                              template of a work file. Their
+                                              directory is listed too.
+        """
+        versions = self.listVersions(template, fields)
+        for otherTemplate in otherTemplates:
+            if otherTemplate is None:
+                continue
+            missing = set(otherTemplate.missing_keys(fields, skip_defaults=True))
+            if missing - set([VERSION_KEY]):
+                continue
+            versions.update(self.listVersions(otherTemplate, fields))
+        return max(versions or [0])
+
+    def nextVersion(self, template, fields, otherTemplates=()):
+        """ The version following the highest version on disk.
+        """
+        return self.maxVersion(template, fields, otherTemplates) + 1
+
+    def reserve(self, template, fields, version=None):
+        """ Reserve a version atomically on disk.
+
+        Args:
+            template    (TemplatePath)  : The versioned template.
+            fields      (dict)          : The fields of the template.
+            version     (int)           : The version to reserve. None to
+                                          reserve the next free version.
+
+        Returns:
+            Reservation : The reserved version.
+
+        Raises:
+            VersionReservationError : The given version exists or is reserved
+                                      by another publish.
+        """
+        fields = dict(fields)
+        if version is None:
+            candidate = self.nextVersion(template, fields)
+        else:
+            candidate = int(version)
+
+        while True:
+            fields[VERSION_KEY] = candidate
+            path = template.apply_fields(fields)
+            reservation = reservePath(path, candidate)
+            if reservation is not None:
+                return reservation
+
+            if version is not None:
+                if os.path.exists(path):
+                    raise VersionReservationError(
+                        "The version %s of %s already exists." % (candidate, path)
+                    )
+                raise VersionReservationError(
+                    "The version %s of %s is reserved by another publish (%s)."
+                    % (candidate, path, _readOwner(_lockPath(path)))
+                )
+
+            # Somebody reserved it since the listing, try the next one.
+            candidate += 1
+
+
+def reservePath(path, version=None):
+    """ Create the reservation file of a path.
+
+    A reservation of the same user and process is taken over, so validating
+    again does not fail on the reservation of the previous validation.
+
+    Args:
+        path    (str) : The path to reserve.
+        version (int) : The version of the path.
+
+    Returns:
+        Reservation : The reservation, None if the path is reserved by
+                      another publish or if it already exists.
+    """
+    if os.path.exists(path):
+        return None
+
+    lockPath = _lockPath(path)
+    directory = os.path.dirname(lockPath)
+    createdDirectory = _makeDirectories(directory)
+
+    owner = _owner()
+    for attempt in range(2):
+        try:
+            fd = os.open(lockPath, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if _readOwner(lockPath) == owner:
+                # The directories are owned by the reservation taken over.
+                held = _heldReservations.get(lockPath)
+                if held is not None:
+                    createdDirectory = held.createdDirectory
+                return Reservation(path, version, lockPath, createdDirectory)
+            if attempt == 0 and _isStale(lockPath):
+                try:
+                    os.remove(lockPath)
+                except OSError:
+                    pass
+                continue
+            break
+
+        with os.fdopen(fd, "w") as lockFile:
+            lockFile.write(owner)
+        return Reservation(path, version, lockPath, createdDirectory)
+
+    _removeEmptyDirectories(directory, createdDirectory)
+    return None
+
+
+def releasePath(path):
+    """ Release the reservation of a path, once its file is written or its
+    export failed.
+
+    The reservation of a background export finished after its Maya session
+    was closed is not held by the process. Its reservation file is removed
+    if the file was written.
+
+    Args:
+        path (str) : The reserved path.
+    """
+    lockPath = _lockPath(path)
+    reservation = _heldReservations.get(lockPath)
+    if reservation is not None:
+        reservation.release()
+        return
+    if os.path.exists(path):
+        try:
+            os.remove(lockPath)
+        except OSError:
+            pass
+
+
+def reserveItemVersion(item, template, logger=None):
+    """ Reserve the version of the publish path of an item.
+
+    The reservation is stored on the item, releaseItemVersion removes it
+    once the file is published. An existing publish path is left to the
+    validation of the plugin.
+
+    Args:
+        item        (PublishItem)   : The item, with its publish path in
+                                      the path property.
+        template    (TemplatePath)  : The publish template of the item.
+        logger      (Logger)        : Logger reporting a reserved version.
+
+    Returns:
+        Reservation : The reservation, None if there is nothing to reserve.
+
+    Raises:
+        VersionReservationError : The version is reserved by another publish.
+    """
+    path = item.properties.get("path")
+    if not path or template is None or not template.validate(path):
+        return None
+
+    fields = template.get_fields(path)
+    if fields.get(VERSION_KEY) is None or os.path.exists(path):
+        return None
+
+    try:
+        reservation = getVersionResolver().reserve(template, fields, fields[VERSION_KEY])
+    except VersionReservationError as e:
+        if logger:
+            logger.error(str(e))
+        raise
+
+    item.properties[RESERVATION_PROPERTY] = reservation
+    return reservation
+
+
+def releaseItemVersion(item):
+    """ Release the version reserved by reserveItemVersion.
+
+    Args:
+        item (PublishItem) : The published item.
+    """
+    reservation = item.properties.get(RESERVATION_PROPERTY)
+    if reservation is not None:
+        reservation.release()
+        item.properties[RESERVATION_PROPERTY] = None
+
+
+def reservedPaths(items):
+    """ The paths reserved by reserveItemVersion for items.
+
+    Args:
+        items (list) : The PublishItems.
+
+    Returns:
+        list : The reserved paths, to release with releasePath.
+    """
+    reservations = [item.properties.get(RESERVATION_PROPERTY) for item in items]
+    return [reservation.path for reservation in reservations if reservation is not None]
+
+
+def validateReservedItem(item, validate):
+    """ Run the validation of an item holding a reservation, releasing the
+    reservation if the validation fails.
+
+    Args:
+        item        (PublishItem)   : The validated item.
+        validate    (callable)      : The validation, returning True if the
+                                      item is valid.
+
+    Returns:
+        bool : The result of the validation.
+    """
+    try:
+        valid = validate()
+    except Exception:
+        releaseItemVersion(item)
+        raise
+    if not valid:
+        releaseItemVersion(item)
+    return valid
+
+
+def previousVersionPaths(template, path, limit=None):
+    """ The existing files of the versions before the one of a path.
+
+    Args:
+        template    (TemplatePath)  : The versioned template of the path.
+        path        (str)           : The path of the new version.
+        limit       (int)           : Maximum number of versions looked at.
+
+    Returns:
+        list : The previous version paths found on disk, the latest first.
+    """
+    if not template.validate(path):
+        return []
+    fields = template.get_fields(path)
+    version = fields.get(VERSION_KEY)
+    if version is None:
+        return []
+
+    versions = getVersionResolver().listVersions(template, fields)
+    previousVersions = sorted((v for v in versions if v < version), reverse=True)
+
+    paths = []
+    for previousVersion in previousVersions[:limit]:
+        fields[VERSION_KEY] = previousVersion
+        previousPath = template.apply_fields(fields)
+        if os.path.isfile(previousPath):
+            paths.append(previousPath)
+    return paths
+
+
+def _lockPath(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, ".%s%s" % (name, RESERVATION_SUFFIX))
+
+
+def _owner():
+    return "%s@%s:%d" % (getpass.getuser(), socket.gethostname(), os.getpid())
+
+
+def _readOwner(lockPath):
+    try:
+        with open(lockPath, "r") as lockFile:
+            return lockFile.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _makeDirectories(directory):
+    """ Create a directory and its missing parents.
+
+    Returns:
+        str : The topmost directory created, None if it existed.
+    """
+    created = None
+    parent = directory
+    while parent and not os.path.isdir(parent):
+        created = parent
+        nextParent = os.path.dirname(parent)
+        if nextParent == parent:
+            break
+        parent = nextParent
+    if created is not None:
+        os.makedirs(directory, exist_ok=True)
+    return created
+
+
+def _removeEmptyDirectories(directory, createdDirectory):
+    """ Remove a directory and its parents up to createdDirectory, as long as
+    they are empty.
+    """
+    if createdDirectory is None:
+        return
+    while True:
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        if directory == createdDirectory:
+            return
+        directory = os.path.dirname(directory)
+
+
+def _isStale(lockPath):
+    try:
+        return (time.time() - os.path.getmtime(lockPath)) > RESERVATION_TTL
+    except OSError:
+        return False
+
+
+def _versionLocation(template, fields):
+    """ Find the directory listing the versions of a template.
+
+    Returns:
+        tuple : (directory, regex). The directory holds the first path
+                component with the version, the regex matches this component
+                and captures the version.
+    """
+    fields = dict(fields)
+    fields[VERSION_KEY] = SENTINEL_VERSION
+    path = os.path.normpath(template.apply_fields(fields))
+
+    sentinel = str(SENTINEL_VERSION)
+    components = path.split(os.sep)
+    for index, component in enumerate(components):
+        if sentinel in component:
+            break
+    else:
+        raise ValueError("The template %s has no version key." % template)
+
+    directory = os.sep.join(components[:index]) or os.sep
+    pattern = re.escape(component).replace(sentinel, r"(\d+)", 1)
+    pattern = pattern.replace(sentinel, r"\d+")
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    return directory, re.compile("^%s$" % pattern, flags)
+
+
+# The reservations of the process, by reservation file.
+_heldReservations = {}
+
+
+@atexit.register
+def _releaseHeldReservations():
+    # A publisher closed after the validation leaves its reservations.
+    for reservation in list(_heldReservations.values()):
+        reservation.release()
+
+
+_resolver = None
+
+
+def getVersionResolver():
+    """ Return the shared version resolver.
+
+    Returns:
+        VersionResolver : The resolver shared by the publish plugins.
+    """
+    global _resolver
+    if _resolver is None:
+        _resolver = VersionResolver()
+    return _resolver
@@ -99,6 +99,9 @@ class BeforeAppLaunch(tank.Hook):
             #self.addToEnvironmentEnd("PYTHONPATH", "Z:\\P3DTools\\productionPackages\\pipelineFramework\\0.1.0")
             self.addToEnvironmentEnd("PYTHONPATH", "C:\\Users\\guillaume.baratte\\Documents\\DEV\\PipelineFramework")
 
+            # Add the config publish helpers.
+            self.addToEnvironmentEnd("PYTHONPATH", os.path.normpath(os.path.join(self.disk_location, os.pardir, "python")))
+
             # Add Studio Library.
             self.addToEnvironmentEnd("PYTHONPATH", "Z:\\P3DTools\\productionPackages\\studiolibrary\\2.9.6.b3\\src")
 
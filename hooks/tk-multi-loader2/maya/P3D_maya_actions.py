@@ -21,11 +21,19 @@ import sgtk
 
 from tank_vendor import six
 
+from p3dPipeline.alembicReader import readSummary
+from p3dPipeline.publishSidecar import readChunks
+from p3dPipeline.publishSidecar import readSidecar
+from p3dPipeline.standinIndex import batchedEdit
+from p3dPipeline.standinIndex import getStandInIndex
+
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
 from pipelineFramework.maya.loaders     import LoaderAsset
-from pipelineFramework.maya.loaders     import LoaderShading
+
+# Arnold operator applying the looks of a MaterialX document to a stand-in.
+MATERIALX_OPERATOR = "aiMaterialx"
 
 
 class MayaActions(HookBaseClass):
@@ -196,6 +204,12 @@ class MayaActions(HookBaseClass):
                 }
             )
 
+        # describe the content of the caches in the tooltips
+        details = self._get_cache_details(sg_publish_data)
+        if details:
+            for action_instance in action_instances:
+                action_instance["description"] += details
+
         return action_instances
 
     def execute_multiple_actions(self, actions):
@@ -250,7 +264,23 @@ class MayaActions(HookBaseClass):
         # so convert the path to ensure filenames containing complex characters are supported
         path = six.ensure_str(self.get_publish_path(sg_publish_data))
 
+        # a cache exported in frame chunks is loaded chunk by chunk
+        chunks = readChunks(path)
+        if chunks:
+            self._execute_chunked_action(name, params, chunks, sg_publish_data)
+            return
+
+        self._execute_path_action(name, params, path, sg_publish_data)
 
+    def _execute_path_action(self, name, params, path, sg_publish_data):
+        """
+        Execute a given action on a file.
+
+        :param name: Action name string representing one of the items returned by generate_actions.
+        :param params: Params data, as specified by generate_actions.
+        :param path: Path of the file to load.
+        :param sg_publish_data: Shotgun data dictionary with all the standard publish fields.
+        """
         if( name == "importWithoutNamespace"):
             self._importWithoutNamespace(
                 path, 
@@ -301,6 +331,126 @@ class MayaActions(HookBaseClass):
     ##############################################################################################################
     # helper methods which can be subclassed in custom hooks to fine tune the behaviour of things
 
+    def _get_cache_details(self, sg_publish_data):
+        """
+        Describe the content of an Alembic or MaterialX publish, read from its
+        metadata sidecar without loading it. The Alembic caches published
+        without sidecar are described from their headers.
+
+        :param sg_publish_data: Shotgun data dictionary with all the standard publish fields.
+        :returns: The description, empty if the publish is not a described cache.
+        """
+        path = six.ensure_str(self.get_publish_path(sg_publish_data) or "")
+        if not path.lower().endswith((".abc", ".mtlx")):
+            return ""
+
+        metadata = readSidecar(path)
+        chunks = readChunks(path)
+        if not metadata.get("objects") and path.lower().endswith(".abc"):
+            metadata = readSummary(chunks[0]["path"] if chunks else path) or {}
+        if chunks:
+            metadata["frameRange"] = (chunks[0]["start"], chunks[-1]["end"])
+        if not metadata:
+            return ""
+
+        details = ["%d objects" % len(metadata.get("objects") or [])]
+        if metadata.get("materials"):
+            details.append("%d materials" % len(metadata["materials"]))
+        if metadata.get("frameRange"):
+            details.insert(0, "frames %d-%d" % tuple(metadata["frameRange"]))
+        if metadata.get("polyCount"):
+            details.append("%d faces" % metadata["polyCount"])
+        if metadata.get("bounds"):
+            bounds = metadata["bounds"]
+            details.append(
+                "size %.1f x %.1f x %.1f"
+                % tuple(bounds[axis + 3] - bounds[axis] for axis in range(3))
+            )
+        return "\n%s." % ", ".join(details)
+
+    def _apply_standin_bounds(self, standins, path):
+        """
+        Display new stand-ins as the bounding box stored in the metadata
+        sidecar of their cache, so the viewport does not load the cache to
+        place them.
+
+        :param standins: The aiStandIn shapes created.
+        :param path: Path of the published cache.
+        """
+        bounds = readSidecar(path).get("bounds")
+        if not bounds:
+            return
+        for standin in standins:
+            cmds.setAttr("%s.MinBoundingBox" % standin, *bounds[:3], type="float3")
+            cmds.setAttr("%s.MaxBoundingBox" % standin, *bounds[3:], type="float3")
+            # bounding box display mode
+            cmds.setAttr("%s.mode" % standin, 0)
+
+    def _execute_chunked_action(self, name, params, chunks, sg_publish_data):
+        """
+        Execute a given action on every chunk of a cache exported in frame
+        chunks. Maya can not join Alembic time chunks, so each chunk is loaded
+        on its own and the nodes it creates are only visible over its frames.
+
+        :param name: Action name string representing one of the items returned by generate_actions.
+        :param params: Params data, as specified by generate_actions.
+        :param chunks: The chunks of the cache, sorted by start frame.
+        :param sg_publish_data: Shotgun data dictionary with all the standard publish fields.
+        """
+        self.parent.log_info(
+            "Loading the %d chunks of the cache (%s)."
+            % (len(chunks), ", ".join("%d-%d" % (chunk["start"], chunk["end"]) for chunk in chunks))
+        )
+
+        for index, chunk in enumerate(chunks):
+            existing = set(cmds.ls(type="transform", long=True) or [])
+            self._execute_path_action(name, params, chunk["path"], sg_publish_data)
+            created = [
+                node for node in cmds.ls(type="transform", long=True) or []
+                if node not in existing
+            ]
+
+            # the first chunk is visible before the cache range and the last
+            # one after it. the frame shared by two chunks is shown from the
+            # next chunk.
+            self._gate_chunk_visibility(
+                created,
+                chunk["start"] if index > 0 else None,
+                chunks[index + 1]["start"] if index < len(chunks) - 1 else None,
+            )
+
+    def _gate_chunk_visibility(self, nodes, start, end):
+        """
+        Key the visibility of the top nodes loaded from a chunk, so they are
+        only visible over the frames of the chunk.
+
+        :param nodes: The transforms created by the chunk.
+        :param start: First visible frame, None to be visible before the chunk.
+        :param end: First frame of the next chunk, the chunk is hidden from
+            it. None to be visible after the chunk.
+        """
+        created = set(nodes)
+        keys = []
+        if start is not None:
+            keys.extend([(start - 1, 0), (start, 1)])
+        if end is not None:
+            keys.extend([(end - 1, 1), (end, 0)])
+        if not keys:
+            return
+
+        for node in nodes:
+            # the children of a created node follow its visibility
+            if node.rsplit("|", 1)[0] in created:
+                continue
+            for time, value in keys:
+                cmds.setKeyframe(
+                    node,
+                    attribute="visibility",
+                    time=time,
+                    value=value,
+                    outTangentType="step",
+                )
+
     def _replaceSelectedInstanceReference(self, 
             path:str, 
             sg_publish_data:dict):
@@ -338,33 +488,119 @@ class MayaActions(HookBaseClass):
             path:str, 
             sg_publish_data:dict):
         
+        existing = set(cmds.ls(type="aiStandIn", long=True) or [])
+
         loader = LoaderAsset()
         loader.loadAssetAsStandin(
             sg_publish_data.get("entity").get("name"),
             path
         )
+
+        # place the stand-ins from the sidecar, the cache is only loaded
+        # when rendered
+        standins = [
+            standin for standin in cmds.ls(type="aiStandIn", long=True) or []
+            if standin not in existing
+        ]
+        self._apply_standin_bounds(standins, path)
+        getStandInIndex().tag(standins, sg_publish_data.get("entity").get("name"))
     
     def _importMaterialXAllStandIn(self,
             path:str,
             sg_publish_data:dict):
 
-        loader = LoaderShading()
-        loader.loadAssetMaterialX(
-            sg_publish_data.get("entity").get("name"),
+        asset = sg_publish_data.get("entity").get("name")
+        self._assign_materialX(
+            asset,
             path,
-            selectedOnly=False
+            getStandInIndex().standIns(asset)
         )
 
     def _importMaterialXSelectedStandIn(self,
             path:str,
             sg_publish_data:dict):
 
-        loader = LoaderShading()
-        loader.loadAssetMaterialX(
-            sg_publish_data.get("entity").get("name"),
-            path,
-            selectedOnly=True
-        )       
+        # the stand-ins of the asset selected or under the selection
+        selection = set(cmds.ls(selection=True, long=True) or [])
+        asset = sg_publish_data.get("entity").get("name")
+        standins = []
+        for standin in getStandInIndex().standIns(asset):
+            names = standin.split("|")
+            if any("|".join(names[:index]) in selection for index in range(2, len(names) + 1)):
+                standins.append(standin)
+
+        self._assign_materialX(asset, path, standins)
+
+    def _assign_materialX(self, asset, path, standins):
+        """
+        Assign a MaterialX look to stand-ins in one batch. A single MaterialX
+        operator reading the document is connected to the stand-ins found by
+        the stand-in index, replacing their previous MaterialX operator, so
+        neither the selection nor the scene is searched. The assignment is
+        not recorded in the undo queue and the viewport is refreshed once at
+        the end.
+
+        :param asset: Name of the asset of the look.
+        :param path: Path of the MaterialX document.
+        :param standins: The aiStandIn shapes to assign.
+        """
+        if not standins:
+            self.parent.log_warning("No stand-in of %s to assign %s to." % (asset, path))
+            return
+
+        with batchedEdit():
+            operator = self._materialX_operator(asset, path)
+            for standin in standins:
+                self._connect_operator(standin, operator)
+
+        self.parent.log_info(
+            "Assigned %s to %d stand-ins of %s." % (path, len(standins), asset)
+        )
+
+    def _materialX_operator(self, asset, path):
+        """
+        Find the MaterialX operator reading a document, or create it.
+
+        :param asset: Name of the asset of the look.
+        :param path: Path of the MaterialX document.
+        :returns: The MaterialX operator node.
+        """
+        normalized = path.replace("\\", "/")
+        for operator in cmds.ls(type=MATERIALX_OPERATOR) or []:
+            filename = cmds.getAttr("%s.filename" % operator) or ""
+            if filename.replace("\\", "/") == normalized:
+                return operator
+
+        operator = cmds.createNode(
+            MATERIALX_OPERATOR, name="%s_materialX" % asset, skipSelect=True
+        )
+        cmds.setAttr("%s.filename" % operator, normalized, type="string")
+        return operator
+
+    def _connect_operator(self, standin, operator):
+        """
+        Connect a MaterialX operator to a stand-in, in place of the MaterialX
+        operator it had.
+
+        :param standin: The aiStandIn shape.
+        :param operator: The MaterialX operator node.
+        """
+        indices = cmds.getAttr("%s.operators" % standin, multiIndices=True) or []
+        target = None
+        for index in indices:
+            plug = "%s.operators[%d]" % (standin, index)
+            sources = cmds.listConnections(plug, source=True, destination=False, plugs=True) or []
+            for source in sources:
+                node = source.split(".", 1)[0]
+                if cmds.nodeType(node) != MATERIALX_OPERATOR:
+                    continue
+                if node == operator:
+                    return
+                cmds.disconnectAttr(source, plug)
+                target = plug
+        if target is None:
+            target = "%s.operators[%d]" % (standin, max(indices) + 1 if indices else 0)
+        cmds.connectAttr("%s.out" % operator, target)
 
     def _create_reference(self, path, sg_publish_data):
         """
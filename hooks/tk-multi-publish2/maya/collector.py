@@ -8,7 +8,7 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
-import glob
+import importlib
 import os
 import maya.cmds as cmds
 import maya.mel as mel
@@ -16,14 +16,65 @@ import sgtk
 
 HookBaseClass = sgtk.get_hook_baseclass()
 
-from pipelineFramework.shotgrid         import Shotgrid
-from pipelineFramework.maya.asset       import MayaAsset
+from p3dPipeline.assetCache             import getAssetCollectionCache
+from p3dPipeline.assetInstances         import groupAssetInstances
+from p3dPipeline.assetInstances         import resolveAssetEntities
+from p3dPipeline.exportWorkers          import isBackgroundExportEnabled
+from p3dPipeline.exportWorkers          import recoverBackgroundExports
+from p3dPipeline.fileDiscovery          import scanDirectory
+from p3dPipeline.lazyAsset              import LazyMayaAsset
+from p3dPipeline.mayaScene              import SNAPSHOT_PROPERTY
+from p3dPipeline.mayaScene              import getSceneSnapshot
+from p3dPipeline.renderCatalog          import RenderOutputCatalog
+from p3dPipeline.shotgridContext        import getContextSnapshot
+from p3dPipeline.timing                 import timedCollector
+
+
+# Collector used for each (entity type, step name). A dotted name is a
+# pipelineFramework collector class, imported the first time its step is
+# collected. Any other name is a collect method of this hook.
+# Steps without an entry collect the maya session.
+STEP_COLLECTORS = {
+    ("Asset", "Model")              : "pipelineFramework.maya.collectors.MayaCollectorModeling",
+    ("Asset", "UV")                 : "pipelineFramework.maya.collectors.MayaCollectorModeling",
+    ("Asset", "Rig")                : "pipelineFramework.maya.collectors.MayaCollectorRig",
+    ("Asset", "Shading")            : "pipelineFramework.maya.collectors.MayaCollectorShading",
+    ("Asset", "Set Dress Asset")    : "collect_for_set_dress_publish",
+    ("Shot", "Animation")           : "collect_for_layout_publish",
+    ("Shot", "Layout")              : "collect_for_layout_publish",
+    ("Shot", "Set Dressing")        : "collect_for_set_dress_publish",
+    ("Shot", "Lighting")            : "collect_for_lighting_publish",
+    ("Shot", "Rendering")           : "collect_for_lighting_publish",
+}
+
+def _create_maya_asset(assetRoot):
+    """
+    Build the asset object of an asset root. The hierarchy is walked when the
+    asset is first read by a publish plugin.
+
+    :param str assetRoot: The asset root name.
+    """
+    return LazyMayaAsset(assetRoot)
+
+
+# Collector classes already imported, by dotted name.
+_collector_classes = {}
+
+
+def _get_collector_class(dottedName):
+    """
+    Import and return a collector class from its dotted name.
 
-from pipelineFramework.maya.collectors  import MayaCollectorModeling
-from pipelineFramework.maya.collectors  import MayaCollectorRig
-from pipelineFramework.maya.collectors  import MayaCollectorShading
+    :param str dottedName: module path and class name of the collector.
+    """
+    if dottedName not in _collector_classes:
+        moduleName, className = dottedName.rsplit(".", 1)
+        module = importlib.import_module(moduleName)
+        _collector_classes[dottedName] = getattr(module, className)
+    return _collector_classes[dottedName]
 
 
+@timedCollector
 class MayaSessionCollector(HookBaseClass):
     """
     Collector that operates on the maya session. Should inherit from the basic
@@ -59,6 +110,26 @@ class MayaSessionCollector(HookBaseClass):
                 "to publish plugins via the collected item's "
                 "properties. ",
             },
+            "Incremental Collection": {
+                "type": "bool",
+                "default": True,
+                "description": "Reuse the assets collected by the previous "
+                "collection when their root did not change in the scene.",
+            },
+            "Project Files Max Age": {
+                "type": "int",
+                "default": 0,
+                "description": "Only collect the playblasts and alembic caches "
+                "of the maya project modified in the last number of days. "
+                "0 to collect them all.",
+            },
+            "Project Files Limit": {
+                "type": "int",
+                "default": 0,
+                "description": "Maximum number of playblasts and of alembic "
+                "caches collected from the maya project, most recent first. "
+                "0 to collect them all.",
+            },
         }
 
     def process_current_session(self, settings, parent_item):
@@ -71,145 +142,197 @@ class MayaSessionCollector(HookBaseClass):
 
         """
 
-        # Get shotgrid api from pipelineFramework.
-        sg = Shotgrid()
+        # Get the cached shotgrid context shared with the publish plugins.
+        sg = getContextSnapshot()
 
-        # Check the current entity type.
-        if(sg.currentEntity["type"] == "Asset"):
-            collector = None
-            # Set the P3D publish pipeline.
-            if(sg.currentStep["name"] == "Model" or
-                sg.currentStep["name"] == "UV"):
-                collector = MayaCollectorModeling(self)
+        # Query the scene once for the whole collection. The snapshot is
+        # dropped by the maya callbacks when the scene changes.
+        getSceneSnapshot()
 
-            elif(sg.currentStep["name"] == "Rig"):
-                # Collect the data for a Rig Publish.
-                collector = MayaCollectorRig(self)
+        # Register the background exports finished after their session closed.
+        if isBackgroundExportEnabled():
+            recoverBackgroundExports(self.logger)
 
-            elif(sg.currentStep["name"] == "Shading"):
-                # Collect the data for the shading publish.
-                collector = MayaCollectorShading(self)
+        # Find the collector registered for the current entity type and step.
+        collectorName = STEP_COLLECTORS.get(
+            (sg.currentEntity.get("type"), sg.currentStep.get("name"))
+        )
 
-            elif(sg.currentStep["name"] == "Set Dress Asset"):
-                # Collect the data for the set dress publish.
-                collector.collect_asset_sceneDescription(settings, parent_item)
+        if collectorName is None:
+            # No pipeline step collector, collect the maya session.
+            self.collect_maya_session(settings, parent_item)
 
+        elif "." in collectorName:
+            # Set the P3D publish pipeline.
+            collector = _get_collector_class(collectorName)(self)
             collector.collect(settings, parent_item)
 
+        else:
+            getattr(self, collectorName)(settings, parent_item)
 
-        elif(sg.currentEntity["type"] == "Shot"):
+    def collect_maya_session(self, settings, parent_item):
+        """
+        Create the items for the maya session, the rendered images and the
+        project files.
 
-            if(sg.currentStep["name"] == "Animation"):
-                collector.collect_shot_animation_datas(settings, parent_item)
-                collector.collect_shot_sceneDescription(settings, parent_item)
-                collector.collect_shot_camera(settings, parent_item)
+        :param dict settings: Configured settings for this collector
+        :param parent_item: Root item instance
+        """
+        # create an item representing the current maya session
+        item = self.collect_current_maya_session(settings, parent_item)
+        project_root = item.properties["project_root"]
+
+        # look at the render layers to find rendered images on disk
+        self.collect_rendered_images(item)
+
+        # if we can determine a project root, collect other files to publish
+        if project_root:
+
+            self.logger.info(
+                "Current Maya project is: %s." % (project_root,),
+                extra={
+                    "action_button": {
+                        "label": "Change Project",
+                        "tooltip": "Change to a different Maya project",
+                        "callback": lambda: mel.eval('setProject ""'),
+                    }
+                },
+            )
 
-            elif(sg.currentStep["name"] == "Layout"):
-                collector.collect_shot_sceneDescription(settings, parent_item)
-                collector.collect_shot_camera(settings, parent_item)
+            self.collect_playblasts(item, project_root, settings)
+            self.collect_alembic_caches(item, project_root, settings)
+        else:
 
-            elif(sg.currentStep["name"] == "Set Dressing"):
-                collector.collect_shot_sceneDescription(settings, parent_item)
-                
-            elif(sg.currentStep["name"] == "Lighting"):
-                pass
+            self.logger.info(
+                "Could not determine the current Maya project.",
+                extra={
+                    "action_button": {
+                        "label": "Set Project",
+                        "tooltip": "Set the Maya project",
+                        "callback": lambda: mel.eval('setProject ""'),
+                    }
+                },
+            )
 
-            elif(sg.currentStep["name"] == "Rendering"):
-                pass
-        else:
+        if getSceneSnapshot().geometry:
+            self._collect_session_geometry(item)
 
-            # create an item representing the current maya session
-            item = self.collect_current_maya_session(settings, parent_item)
-            project_root = item.properties["project_root"]
-
-            # look at the render layers to find rendered images on disk
-            self.collect_rendered_images(item)
-
-            # if we can determine a project root, collect other files to publish
-            if project_root:
-
-                self.logger.info(
-                    "Current Maya project is: %s." % (project_root,),
-                    extra={
-                        "action_button": {
-                            "label": "Change Project",
-                            "tooltip": "Change to a different Maya project",
-                            "callback": lambda: mel.eval('setProject ""'),
-                        }
-                    },
-                )
+    def collect_for_set_dress_publish(self, settings, parent_item):
+        """
+        Create the items for the set dressing publish. The set dressing is
+        published as the maya session.
 
-                self.collect_playblasts(item, project_root)
-                self.collect_alembic_caches(item, project_root)
-            else:
-
-                self.logger.info(
-                    "Could not determine the current Maya project.",
-                    extra={
-                        "action_button": {
-                            "label": "Set Project",
-                            "tooltip": "Set the Maya project",
-                            "callback": lambda: mel.eval('setProject ""'),
-                        }
-                    },
-                )
+        :param dict settings: Configured settings for this collector
+        :param parent_item: Root item instance
+        """
+        self.collect_current_maya_session(settings, parent_item)
+
+    def collect_for_layout_publish(self, settings, parent_item):
+        """
+        Create the items for the layout and animation publish, the maya
+        session describing the shot and the selected asset instances.
+
+        :param dict settings: Configured settings for this collector
+        :param parent_item: Root item instance
+        """
+        self.collect_current_maya_session(settings, parent_item)
+        self.collect_for_shot_animation_publish(settings, parent_item)
 
-            if cmds.ls(geometry=True, noIntermediate=True):
-                self._collect_session_geometry(item)
+    def collect_for_lighting_publish(self, settings, parent_item):
+        """
+        Create the items for the lighting and rendering publish, the maya
+        session and the rendered images of the render layers.
 
-            #self.collect_selected_asset(item)
+        :param dict settings: Configured settings for this collector
+        :param parent_item: Root item instance
+        """
+        item = self.collect_current_maya_session(settings, parent_item)
+        self.collect_rendered_images(item)
 
     def collect_for_shot_animation_publish(self, settings, parent_item):
         ''' Create the items to publish animation alembic.
 
+        The asset names and instances come from the instance names, and all
+        the assets are resolved in ShotGrid with a single query. The instances
+        whose asset is not found are resolved by the publish plugin from the
+        asset object.
+
         Args:
             setting         (dict)      : Configured settings for this collector
             parent_item     (sgItemUI)  : Root item instance
         '''
         publisher = self.parent
+        scene = getSceneSnapshot()
 
         # Get the current maya selection.
-        mSelection = cmds.ls(sl=True, type="transform")
+        mSelection = scene.selectedTransforms
 
         # Check if the current selection is not empty.
-        if(len(mSelection) > 0):
+        if not mSelection:
+            return
 
-            # Create an item for each selected asset.
-            for sel in mSelection:
-                asset = MayaAsset(root=sel)
-
-                item        = parent_item.create_item("maya.shot.assetInstance.alembic", "Shot Asset Instance Alembic", asset.fullname)
-                abcIcon     = os.path.join(self.disk_location, os.pardir, "icons", "alembic.png")
-                item.set_icon_from_path(abcIcon)
-
-                # Add the asset project root to the item properties.
-                project_root = cmds.workspace(q=True, rootDirectory=True)
-                item.properties["project_root"] = project_root
-
-                # Create the asset object an add it to the item properties.
-                # That allow to share the MayaAsset Class with the publish plugin.
-                item.properties["assetObject"]      = asset
-                item.properties["assetName"]        = asset.sgEntityName
-                item.properties["assetInstance"]    = asset.instance
-
-                # if a work template is defined, add it to the item properties so
-                # that it can be used by attached publish plugins
-                work_template_setting = settings.get("Work Template")
-                if work_template_setting:
-
-                    work_template = publisher.engine.get_template_by_name(
-                        work_template_setting.value
-                    )
+        # Resolve everything shared by the instances once.
+        work_template   = self._get_work_template(settings)
+        abcIcon         = os.path.join(self.disk_location, os.pardir, "icons", "alembic.png")
+
+        groups, unresolved = groupAssetInstances(mSelection)
+        sgAssets = resolveAssetEntities(
+            publisher.shotgun,
+            publisher.context.project,
+            groups.keys()
+        )
+
+        def create_instance_item(item_parent, sel):
+            item = item_parent.create_item("maya.shot.assetInstance.alembic", "Shot Asset Instance Alembic", sel)
+            item.set_icon_from_path(abcIcon)
+
+            # Add the asset project root and the scene snapshot to the item properties.
+            item.properties["project_root"] = scene.projectRoot
+            item.properties[SNAPSHOT_PROPERTY] = scene
+
+            # Add the lazy asset object to the item properties.
+            # That allow to share the MayaAsset Class with the publish plugin.
+            item.properties["assetObject"] = self._get_maya_asset(settings, sel)
+
+            # store the template on the item for use by publish plugins. we
+            # can't evaluate the fields here because there's no guarantee the
+            # current session path won't change once the item has been created.
+            # the attached publish plugins will need to resolve the fields at
+            # execution time.
+            if work_template:
+                item.properties["work_template"] = work_template
+            return item
+
+        # Create an item for each instance of the assets found in ShotGrid.
+        for assetName, instances in groups.items():
+            if assetName not in sgAssets:
+                # The name only looks like an instance name.
+                unresolved.extend(sel for sel, _ in instances)
+                continue
 
-                    # store the template on the item for use by publish plugins. we
-                    # can't evaluate the fields here because there's no guarantee the
-                    # current session path won't change once the item has been created.
-                    # the attached publish plugins will need to resolve the fields at
-                    # execution time.
-                    item.properties["work_template"] = work_template
-                    self.logger.debug("Work template defined for Maya collection.")
+            for sel, instance in instances:
+                item = create_instance_item(parent_item, sel)
+                item.properties["assetName"]        = assetName
+                item.properties["assetInstance"]    = instance
+
+        # The instances not following the naming convention, or of an unknown
+        # asset, are resolved by the publish plugin from the asset object.
+        for sel in unresolved:
+            create_instance_item(parent_item, sel)
+
+    def _get_work_template(self, settings):
+        """
+        Get the work template defined in the collector settings.
 
+        :param dict settings: Configured settings for this collector
+        :returns: The work template or None if not defined.
+        """
+        work_template_setting = settings.get("Work Template")
+        if not work_template_setting:
+            return None
 
+        self.logger.debug("Work template defined for Maya collection.")
+        return self.parent.engine.get_template_by_name(work_template_setting.value)
 
     def collect_for_model_publish(self, settings, parent_item):
         """
@@ -229,7 +352,7 @@ class MayaSessionCollector(HookBaseClass):
             parent_item     (sgItemUI)  : Root item instance
         '''
         # Get the current maya selection.
-        mSelection = cmds.ls(sl=True, type="transform")
+        mSelection = getSceneSnapshot().selectedTransforms
 
         # Check if the current selection is not empty.
         if(len(mSelection) > 0):
@@ -264,7 +387,7 @@ class MayaSessionCollector(HookBaseClass):
             parent_item     (sgItemUI)  : Root item instance
         '''
         # Get the current maya selection.
-        mSelection = cmds.ls(sl=True, type="transform")
+        mSelection = getSceneSnapshot().selectedTransforms
 
         # Check if the current selection is not empty.
         if(len(mSelection) > 0):
@@ -310,13 +433,15 @@ class MayaSessionCollector(HookBaseClass):
         icon_path = os.path.join(self.disk_location, os.pardir, "icons", "maya.png")
         assetItem.set_icon_from_path(icon_path)
 
-        # Add the asset project root to the item properties.
-        project_root = cmds.workspace(q=True, rootDirectory=True)
-        assetItem.properties["project_root"] = project_root
+        # Add the asset project root and the scene snapshot to the item properties.
+        scene = getSceneSnapshot()
+        assetItem.properties["project_root"] = scene.projectRoot
+        assetItem.properties[SNAPSHOT_PROPERTY] = scene
 
-        # Create the asset object an add it to the item properties.
+        # Create the lazy asset object an add it to the item properties.
         # That allow to share the MayaAsset Class with the publish plugin.
-        mayaAsset = MayaAsset(root=assetRoot)
+        # The MayaAsset is only built when a publish plugin reads it.
+        mayaAsset = self._get_maya_asset(settings, assetRoot)
         assetItem.properties["assetObject"] = mayaAsset
 
         # if a work template is defined, add it to the item properties so
@@ -347,7 +472,7 @@ class MayaSessionCollector(HookBaseClass):
         print("SGTK | Collector | Collect the session's selected assets.")
 
         # Get the current maya selection.
-        mSelection = cmds.ls(sl=True, type="transform")
+        mSelection = getSceneSnapshot().selectedTransforms
 
         # Check if the current selection is not empty.
         if(len(mSelection) > 0):
@@ -377,13 +502,15 @@ class MayaSessionCollector(HookBaseClass):
         icon_path = os.path.join(self.disk_location, os.pardir, "icons", "maya.png")
         assetItem.set_icon_from_path(icon_path)
 
-        # Add the asset project root to the item properties.
-        project_root = cmds.workspace(q=True, rootDirectory=True)
-        assetItem.properties["project_root"] = project_root
+        # Add the asset project root and the scene snapshot to the item properties.
+        scene = getSceneSnapshot()
+        assetItem.properties["project_root"] = scene.projectRoot
+        assetItem.properties[SNAPSHOT_PROPERTY] = scene
 
-        # Create the asset object an add it to the item properties.
+        # Create the lazy asset object an add it to the item properties.
         # That allow to share the MayaAsset Class with the publish plugin.
-        mayaAsset = MayaAsset(root=assetRoot)
+        # The MayaAsset is only built when a publish plugin reads it.
+        mayaAsset = self._get_maya_asset(settings, assetRoot)
         assetItem.properties["assetObject"] = mayaAsset
 
         # if a work template is defined, add it to the item properties so
@@ -417,6 +544,25 @@ class MayaSessionCollector(HookBaseClass):
 
         return assetItem
 
+    def _get_maya_asset(self, settings, assetRoot):
+        """ Get the asset object of an asset root.
+
+        In incremental collection, the asset objects of the previous collection
+        are reused for the roots that did not change in the scene since.
+
+        Args:
+            settings    (dict) :    Configured settings for this collector.
+            assetRoot   (str):      The asset root name.
+
+        Returns:
+            LazyMayaAsset : The asset object, resolved on first access.
+        """
+        incremental_setting = settings.get("Incremental Collection")
+        if incremental_setting and incremental_setting.value:
+            return getAssetCollectionCache(_create_maya_asset).getAsset(assetRoot)
+
+        return _create_maya_asset(assetRoot)
+
     def collect_current_maya_session(self, settings, parent_item):
         """
         Creates an item that represents the current maya session.
@@ -430,8 +576,10 @@ class MayaSessionCollector(HookBaseClass):
 
         publisher = self.parent
 
+        scene = getSceneSnapshot()
+
         # get the path to the current file
-        path = cmds.file(query=True, sn=True)
+        path = scene.sceneName
 
         # determine the display name for the item
         if path:
@@ -451,8 +599,10 @@ class MayaSessionCollector(HookBaseClass):
 
         # discover the project root which helps in discovery of other
         # publishable items
-        project_root = cmds.workspace(q=True, rootDirectory=True)
-        session_item.properties["project_root"] = project_root
+        session_item.properties["project_root"] = scene.projectRoot
+
+        # share the scene queries with the publish plugins.
+        session_item.properties[SNAPSHOT_PROPERTY] = scene
 
         # if a work template is defined, add it to the item properties so
         # that it can be used by attached publish plugins
@@ -475,7 +625,7 @@ class MayaSessionCollector(HookBaseClass):
 
         return session_item
 
-    def collect_alembic_caches(self, parent_item, project_root):
+    def collect_alembic_caches(self, parent_item, project_root, settings=None):
         """
         Creates items for alembic caches
 
@@ -484,14 +634,22 @@ class MayaSessionCollector(HookBaseClass):
 
         :param parent_item: Parent Item instance
         :param str project_root: The maya project root to search for alembics
+        :param dict settings: Configured settings for this collector, used for
+            the project files discovery filters
         """
 
         print("SGTK | Collector | Collect the session's alembic.")
 
 
-        # ensure the alembic cache dir exists
         cache_dir = os.path.join(project_root, "cache", "alembic")
-        if not os.path.exists(cache_dir):
+
+        # list the cache folder once, keeping only the alembic files that pass
+        # the discovery filters. a missing folder gives no files.
+        max_age, limit = self._get_discovery_filters(settings)
+        discovered = scanDirectory(
+            cache_dir, self._get_extension_item_types(), max_age, limit
+        ).get("file.alembic")
+        if not discovered:
             return
 
         self.logger.info(
@@ -499,20 +657,8 @@ class MayaSessionCollector(HookBaseClass):
             extra={"action_show_folder": {"path": cache_dir}},
         )
 
-        # look for alembic files in the cache folder
-        for filename in os.listdir(cache_dir):
-            cache_path = os.path.join(cache_dir, filename)
-
-            # do some early pre-processing to ensure the file is of the right
-            # type. use the base class item info method to see what the item
-            # type would be.
-            item_info = self._get_item_info(filename)
-            if item_info["item_type"] != "file.alembic":
-                continue
-
-            # allow the base class to collect and create the item. it knows how
-            # to handle alembic files
-            super(MayaSessionCollector, self)._collect_file(parent_item, cache_path)
+        for cache_file in discovered:
+            self._collect_discovered_file(parent_item, cache_file)
 
     def _collect_session_geometry(self, parent_item):
         """
@@ -531,7 +677,7 @@ class MayaSessionCollector(HookBaseClass):
 
         geo_item.set_icon_from_path(icon_path)
 
-    def collect_playblasts(self, parent_item, project_root):
+    def collect_playblasts(self, parent_item, project_root, settings=None):
         """
         Creates items for quicktime playblasts.
 
@@ -540,26 +686,30 @@ class MayaSessionCollector(HookBaseClass):
 
         :param parent_item: Parent Item instance
         :param str project_root: The maya project root to search for playblasts
+        :param dict settings: Configured settings for this collector, used for
+            the project files discovery filters
         """
         print("SGTK | Collector | Collect the session's playblasts.")
 
 
-        movie_dir_name = None
-
         # try to query the file rule folder name for movies. This will give
         # us the directory name set for the project where movies will be
-        # written
-        if "movie" in cmds.workspace(fileRuleList=True):
-            # this could return an empty string
-            movie_dir_name = cmds.workspace(fileRuleEntry="movie")
+        # written. this could return an empty string
+        movie_dir_name = getSceneSnapshot().movieDirectoryName
 
         if not movie_dir_name:
             # fall back to the default
             movie_dir_name = "movies"
 
-        # ensure the movies dir exists
         movies_dir = os.path.join(project_root, movie_dir_name)
-        if not os.path.exists(movies_dir):
+
+        # list the movies folder once, keeping only the movie files that pass
+        # the discovery filters. a missing folder gives no files.
+        max_age, limit = self._get_discovery_filters(settings)
+        discovered = scanDirectory(
+            movies_dir, self._get_extension_item_types(), max_age, limit
+        ).get("file.video")
+        if not discovered:
             return
 
         self.logger.info(
@@ -567,28 +717,74 @@ class MayaSessionCollector(HookBaseClass):
             extra={"action_show_folder": {"path": movies_dir}},
         )
 
-        # look for movie files in the movies folder
-        for filename in os.listdir(movies_dir):
-
-            # do some early pre-processing to ensure the file is of the right
-            # type. use the base class item info method to see what the item
-            # type would be.
-            item_info = self._get_item_info(filename)
-            if item_info["item_type"] != "file.video":
-                continue
+        for movie_file in discovered:
 
-            movie_path = os.path.join(movies_dir, filename)
-
-            # allow the base class to collect and create the item. it knows how
-            # to handle movie files
-            item = super(MayaSessionCollector, self)._collect_file(
-                parent_item, movie_path
-            )
+            item = self._collect_discovered_file(parent_item, movie_file)
 
             # the item has been created. update the display name to include
             # the an indication of what it is and why it was collected
             item.name = "%s (%s)" % (item.name, "playblast")
 
+    def _collect_discovered_file(self, parent_item, discovered):
+        """
+        Create the item of a file found by the project files discovery. The
+        item is built from the directory listing, the file is not read or
+        stat again. The listing data is stored in the item properties.
+
+        :param parent_item: Parent Item instance
+        :param discovered: The DiscoveredFile of the file.
+        :returns: The created item.
+        """
+        publisher = self.parent
+
+        # the base class knows how to display each type of file
+        item_info = self._get_item_info(discovered.path)
+
+        file_item = parent_item.create_item(
+            discovered.itemType,
+            item_info["type_display"],
+            publisher.util.get_publish_name(discovered.path)
+        )
+        file_item.set_icon_from_path(item_info["icon_path"])
+
+        file_item.properties["path"] = discovered.path
+        file_item.properties["discovered_file"] = discovered
+
+        self.logger.info("Collected file: %s" % (discovered.path,))
+        return file_item
+
+    def _get_extension_item_types(self):
+        """
+        Map each file extension known by the base collector to its item type.
+
+        :returns: dict of lower case extension to item type
+        """
+        if not hasattr(self, "_extension_item_types"):
+            self._extension_item_types = {}
+            for file_info in self.common_file_info.values():
+                for extension in file_info["extensions"]:
+                    self._extension_item_types[extension.lower()] = file_info["item_type"]
+        return self._extension_item_types
+
+    def _get_discovery_filters(self, settings):
+        """
+        Read the project files discovery filters from the collector settings.
+
+        :param dict settings: Configured settings for this collector
+        :returns: tuple of the max age in seconds and the max number of files,
+            None when the filter is disabled.
+        """
+        max_age = None
+        limit = None
+        if settings:
+            max_age_setting = settings.get("Project Files Max Age")
+            if max_age_setting and max_age_setting.value:
+                max_age = max_age_setting.value * 24 * 60 * 60
+            limit_setting = settings.get("Project Files Limit")
+            if limit_setting and limit_setting.value:
+                limit = limit_setting.value
+        return max_age, limit
+
     def collect_rendered_images(self, parent_item):
         """
         Creates items for any rendered images that can be identified by
@@ -599,28 +795,49 @@ class MayaSessionCollector(HookBaseClass):
         """
         print("SGTK | Collector | Collect the session's rendered images.")
 
+        # the catalog reads each render output directory only once, even when
+        # several render layers write in the same place.
+        catalog = RenderOutputCatalog()
+
         # iterate over defined render layers and query the render settings for
         # information about a potential render
-        for layer in cmds.ls(type="renderLayer"):
+        for layer in getSceneSnapshot().renderLayers:
 
             self.logger.info("Processing render layer: %s" % (layer,))
 
             # use the render settings api to get a path where the frame number
-            # spec is replaced with a '*' which we can use to glob
+            # spec is replaced with a '*' which we can use to match the frames
             (frame_glob,) = cmds.renderSettings(
                 genericFrameImageName="*", fullPath=True, layer=layer
             )
 
-            # see if there are any files on disk that match this pattern
-            rendered_paths = glob.glob(frame_glob)
+            # see if there is a frame sequence on disk that match this pattern
+            sequence = catalog.findSequence(frame_glob)
 
-            if rendered_paths:
-                # we only need one path to publish, so take the first one and
+            if sequence:
+                # we only need one path to publish, so take the first frame and
                 # let the base class collector handle it
                 item = super(MayaSessionCollector, self)._collect_file(
-                    parent_item, rendered_paths[0], frame_sequence=True
+                    parent_item, sequence.firstPath, frame_sequence=True
                 )
 
                 # the item has been created. update the display name to include
                 # the an indication of what it is and why it was collected
                 item.name = "%s (Render Layer: %s)" % (item.name, layer)
+
+                # hand the frame range to the publish plugins.
+                item.properties["first_frame"] = sequence.firstFrame
+                item.properties["last_frame"] = sequence.lastFrame
+                item.properties["missing_frames"] = sequence.missingFrames
+
+                if item.properties["missing_frames"]:
+                    self.logger.warning(
+                        "Render layer %s is missing %d frame(s) between %d and %d."
+                        % (
+                            layer,
+                            len(item.properties["missing_frames"]),
+                            sequence.firstFrame,
+                            sequence.lastFrame,
+                        ),
+                        extra={"action_show_folder": {"path": sequence.directory}},
+                    )
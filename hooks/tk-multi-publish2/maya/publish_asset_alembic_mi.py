@@ -6,11 +6,19 @@ import sgtk
 
 from tank_vendor import six
 
+from p3dPipeline.alembicExport import getExportCoordinator
+from p3dPipeline.exportWorkers import JOB_PROPERTY
+from p3dPipeline.publishRegistry import getRegistrationQueue
+from p3dPipeline.timing import timedPlugin
+from p3dPipeline.versioning import reserveItemVersion
+from p3dPipeline.versioning import validateReservedItem
+
 from pipelineFramework.maya.hookPublishs    import HookPublishAlembic
 hooksPublish = HookPublishAlembic()
 
 HookBaseClass = sgtk.get_hook_baseclass()
 
+@timedPlugin
 class MayaAssetAlembicMIPublishPlugin(HookBaseClass):
 
     def accept(self, settings, item):
@@ -33,20 +41,72 @@ class MayaAssetAlembicMIPublishPlugin(HookBaseClass):
             isChild=True
         )
 
-        # run the base class validation
-        return super(MayaAssetAlembicMIPublishPlugin, self).validate(settings, item)
-
-    def publish(self, settings, item):
+        # reserve the publish version, a concurrent publish of the asset can
+        # not take the same number
+        reserveItemVersion(
+            item,
+            item.properties.get(self.propertiesPublishTemplate),
+            self.logger
+        )
 
-        hooksPublish.publishAlembicLOD(
-            self,
-            settings,
+        # run the base class validation, the reserved version is released if
+        # it fails
+        return validateReservedItem(
             item,
-            isChild=True
+            lambda: super(MayaAssetAlembicMIPublishPlugin, self).validate(settings, item)
         )
 
-        # let the base class register the publish
+    def publish(self, settings, item):
+
+        # the reserved version is released once the result of the export is
+        # known, in finalize or when the background worker is over. a failed
+        # capture drops the jobs of the item and releases it here.
+        try:
+            # the AbcExport job is exported with the other jobs of the run, or
+            # reuses the previous version if the geometry did not change
+            with getExportCoordinator().capture(
+                item,
+                item.properties.get(self.propertiesPublishTemplate)
+            ):
+                hooksPublish.publishAlembicLOD(
+                    self,
+                    settings,
+                    item,
+                    isChild=True
+                )
+        except Exception:
+            getExportCoordinator().discardItem(item)
+            raise
+
+        # let the base class prepare the publish, it is registered with the
+        # other publishes of the run in finalize
         super(MayaAssetAlembicMIPublishPlugin, self).publish(settings, item)
+        getRegistrationQueue().add(self, settings, item)
+
+    def finalize(self, settings, item):
+
+        # export all the alembic jobs of the run in a single pass
+        getExportCoordinator().finishItem(item, self.logger)
+
+        # register all the queued publishes of the run in batches
+        getRegistrationQueue().flush()
+
+        # the publish is registered once the background export is done
+        if item.properties.get(JOB_PROPERTY):
+            self.logger.info(
+                "Alembic exported in the background, job %s."
+                % item.properties[JOB_PROPERTY]
+            )
+            return
+
+        super(MayaAssetAlembicMIPublishPlugin, self).finalize(settings, item)
+
+    def get_publish_kwargs(self, settings, item):
+
+        return getRegistrationQueue().publishKwargs(
+            super(MayaAssetAlembicMIPublishPlugin, self).get_publish_kwargs(settings, item),
+            item
+        )
 
     @property
     def publishTemplate(self):
@@ -11,6 +11,15 @@ import inspect
 
 from tank_vendor import six
 
+from p3dPipeline.cacheMetadata import writeMaterialXSidecar
+from p3dPipeline.materialXExport import getMaterialXLodExport
+from p3dPipeline.materialXHash import assetMaterialHashes
+from p3dPipeline.materialXHash import previousChangedMaterials
+from p3dPipeline.materialXHash import reusePreviousDocument
+from p3dPipeline.publishSidecar import updateSidecar
+from p3dPipeline.publishRegistry import getRegistrationQueue
+from p3dPipeline.timing import timedPlugin
+
 from pipelineFramework.maya.hookPublishs        import HookPublishMaterialX
 hooksPublish = HookPublishMaterialX()
 
@@ -19,6 +28,7 @@ hooksPublish = HookPublishMaterialX()
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
+@timedPlugin
 class MayaAssetMaterialXHIPublishPlugin(HookBaseClass):
 
     def accept(self, settings, item):
@@ -45,16 +55,77 @@ class MayaAssetMaterialXHIPublishPlugin(HookBaseClass):
         return super(MayaAssetMaterialXHIPublishPlugin, self).validate(settings, item)
 
     def publish(self, settings, item):
-        
+
+        # the documents of all the LODs of the asset are exported with the
+        # first one, walking the shading graph once. The materials are hashed
+        # once for all the LODs.
+        hashes = []
+        getMaterialXLodExport().publish(
+            item,
+            lambda lodItem: self._export_materialX_lod(settings, lodItem, hashes),
+            self.logger
+        )
+
+        # describe the document and its geometry for the loader
+        writeMaterialXSidecar(self.get_publish_path(settings, item))
+
+        # let the base class prepare the publish, it is registered with the
+        # other publishes of the run in finalize
+        super(MayaAssetMaterialXHIPublishPlugin, self).publish(settings, item)
+        getRegistrationQueue().add(self, settings, item)
+
+    def finalize(self, settings, item):
+
+        # register all the queued publishes of the run in batches
+        getRegistrationQueue().flush()
+
+        super(MayaAssetMaterialXHIPublishPlugin, self).finalize(settings, item)
+
+    def get_publish_kwargs(self, settings, item):
+
+        return getRegistrationQueue().publishKwargs(
+            super(MayaAssetMaterialXHIPublishPlugin, self).get_publish_kwargs(settings, item),
+            item
+        )
+
+    def _export_materialX_lod(self, settings, item, hashes):
+        """
+        Export the MaterialX document of a LOD item, or reuse the document of
+        the previous version when the materials of the asset did not change.
+
+        :param settings: Dictionary of Settings.
+        :param item: The LOD item to export.
+        :param hashes: The material hashes of the asset, computed by the
+            first LOD exported.
+        """
+        if not hashes:
+            hashes.append(assetMaterialHashes(item.name))
+        materialHashes = hashes[0]
+
+        path = self.get_publish_path(settings, item)
+        template = item.properties.get(self.propertiesPublishTemplate)
+
+        previousPath = reusePreviousDocument(path, template, materialHashes)
+        if previousPath:
+            self.logger.info(
+                "The materials of %s did not change, reused %s." % (item.name, previousPath)
+            )
+            return
+
+        changed = previousChangedMaterials(path, template, materialHashes)
+        if changed is not None:
+            self.logger.info(
+                "%d of %d materials changed: %s"
+                % (len(changed), len(materialHashes.materials), ", ".join(changed))
+            )
+
         hooksPublish.materialXPublish(
             self,
             settings,
             item,
             isChild=True
         )
-
-        # let the base class register the publish
-        super(MayaAssetMaterialXHIPublishPlugin, self).publish(settings, item)
+        updateSidecar(path, materialHashes.sidecarData())
 
     @property
     def publishTemplate(self):
@@ -94,4 +165,4 @@ class MayaAssetMaterialXHIPublishPlugin(HookBaseClass):
 
     @property
     def item_filters(self):
-        return ["maya.asset.materialX"]
\ No newline at end of file
+        return ["maya.asset.materialX*"]
\ No newline at end of file
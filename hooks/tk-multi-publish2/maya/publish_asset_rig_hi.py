@@ -11,6 +11,12 @@ import inspect
 
 from tank_vendor import six
 
+from p3dPipeline.publishRegistry import getRegistrationQueue
+from p3dPipeline.timing import timedPlugin
+from p3dPipeline.versioning import releaseItemVersion
+from p3dPipeline.versioning import reserveItemVersion
+from p3dPipeline.versioning import validateReservedItem
+
 from pipelineFramework.maya.hookPublishs  import HookPublishRig
 
 hooksPublish = HookPublishRig()
@@ -20,6 +26,7 @@ hooksPublish = HookPublishRig()
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
+@timedPlugin
 class MayaAssetRigHIPublishPlugin(HookBaseClass):
 
     def accept(self, settings, item):
@@ -42,21 +49,54 @@ class MayaAssetRigHIPublishPlugin(HookBaseClass):
             isChild=True
         )
 
-        # run the base class validation
-        return super(MayaAssetRigHIPublishPlugin, self).validate(settings, item)
-
-
-    def publish(self, settings, item):
+        # reserve the publish version, a concurrent publish of the asset can
+        # not take the same number
+        reserveItemVersion(
+            item,
+            item.properties.get(self.propertiesPublishTemplate),
+            self.logger
+        )
 
-        hooksPublish.publishRigLOD(
-            self,
-            settings,
+        # run the base class validation, the reserved version is released if
+        # it fails
+        return validateReservedItem(
             item,
-            isChild=True
+            lambda: super(MayaAssetRigHIPublishPlugin, self).validate(settings, item)
         )
 
-        # let the base class register the publish
+
+    def publish(self, settings, item):
+
+        # the reserved version is released once exported, or if the export
+        # fails
+        try:
+            hooksPublish.publishRigLOD(
+                self,
+                settings,
+                item,
+                isChild=True
+            )
+        finally:
+            releaseItemVersion(item)
+
+        # let the base class prepare the publish, it is registered with the
+        # other publishes of the run in finalize
         super(MayaAssetRigHIPublishPlugin, self).publish(settings, item)
+        getRegistrationQueue().add(self, settings, item)
+
+    def finalize(self, settings, item):
+
+        # register all the queued publishes of the run in batches
+        getRegistrationQueue().flush()
+
+        super(MayaAssetRigHIPublishPlugin, self).finalize(settings, item)
+
+    def get_publish_kwargs(self, settings, item):
+
+        return getRegistrationQueue().publishKwargs(
+            super(MayaAssetRigHIPublishPlugin, self).get_publish_kwargs(settings, item),
+            item
+        )
 
     @property
     def publishTemplate(self):
@@ -11,6 +11,9 @@ import inspect
 
 from tank_vendor import six
 
+from p3dPipeline.publishRegistry import getRegistrationQueue
+from p3dPipeline.timing import timedPlugin
+
 from pipelineFramework.maya.hookPublishs    import HookPublishScene
 
 hooksPublish = HookPublishScene()
@@ -20,6 +23,7 @@ hooksPublish = HookPublishScene()
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
+@timedPlugin
 class MayaAssetRigMasterPublishPlugin(HookBaseClass):
 
     def accept(self, settings, item):
@@ -53,8 +57,25 @@ class MayaAssetRigMasterPublishPlugin(HookBaseClass):
             item
         )
 
-        # let the base class register the publish
+        # let the base class register the publish. the rig master has the LOD
+        # items as children, so it is registered right away: the LOD publishes
+        # depend on it.
         super(MayaAssetRigMasterPublishPlugin, self).publish(settings, item)
+        getRegistrationQueue().add(self, settings, item)
+
+    def finalize(self, settings, item):
+
+        # register all the queued publishes of the run in batches
+        getRegistrationQueue().flush()
+
+        super(MayaAssetRigMasterPublishPlugin, self).finalize(settings, item)
+
+    def get_publish_kwargs(self, settings, item):
+
+        return getRegistrationQueue().publishKwargs(
+            super(MayaAssetRigMasterPublishPlugin, self).get_publish_kwargs(settings, item),
+            item
+        )
 
     @property
     def publishTemplate(self):
@@ -13,18 +13,18 @@ import inspect
 from tank_vendor import six
 
 from pipelineFramework.maya.publishLoad     import PublishTools
-from pipelineFramework.shotgrid             import Shotgrid
-from pipelineFramework.templates            import TemplateTools
+
+from p3dPipeline.shotgridContext            import getContextSnapshot
+from p3dPipeline.timing                     import timedPlugin
 
 publihTools     = PublishTools()
-sg              = Shotgrid()
-templateTools   = TemplateTools()
 
 # Inherit from {self}/publish_file.py 
 # Check config.env.includes.settings.tk-multi-publish2.yml
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
+@timedPlugin
 class MayaAssetScenePublishPlugin(HookBaseClass):
 
     def accept(self, settings, item):
@@ -64,9 +64,8 @@ class MayaAssetScenePublishPlugin(HookBaseClass):
         # That allow us to reuse the datas for the publish.
         tagFields = {}
         # Check if the current task as variant.
-        taskName        = sg.currentTask["name"]
-        taskVariant     = None
-        taskTemplateName, taskTemplate, taskTagsValues = templateTools.getTaskNamingTemplate(taskName)
+        # The naming template is resolved once per publish run by the context snapshot.
+        taskTemplateName, taskTemplate, taskTagsValues = getContextSnapshot().taskNamingTemplate
         if(taskTemplateName):
             if("variant" in taskTagsValues):
                 tagFields["variant"] = taskTagsValues["variant"]
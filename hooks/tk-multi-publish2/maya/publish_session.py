@@ -16,6 +16,16 @@ from sgtk.util.filesystem import ensure_folder_exists
 from tank_vendor import six
 import inspect
 
+from p3dPipeline.dependencyExpansion import expandDependencies
+from p3dPipeline.mayaScene import getSceneSnapshot
+from p3dPipeline.sceneDependencies import getDependencyScanner
+from p3dPipeline.timing import timedPlugin
+from p3dPipeline.versioning import RESERVATION_PROPERTY
+from p3dPipeline.versioning import VersionReservationError
+from p3dPipeline.versioning import getVersionResolver
+from p3dPipeline.versioning import releaseItemVersion
+from p3dPipeline.versioning import validateReservedItem
+
 HookBaseClass = sgtk.get_hook_baseclass()
 
 print("MAYA SESSION")
@@ -23,6 +33,7 @@ print(dir(HookBaseClass))
 print(HookBaseClass.__bases__)
 print(inspect.getsource(HookBaseClass.validate))
 
+@timedPlugin
 class MayaSessionPublishPlugin(HookBaseClass):
     """
     Plugin for publishing an open maya session.
@@ -215,8 +226,9 @@ class MayaSessionPublishPlugin(HookBaseClass):
             self.logger.error(error_msg, extra=_get_save_as_action())
             raise Exception(error_msg)
 
-        # ensure we have an updated project root
-        project_root = cmds.workspace(q=True, rootDirectory=True)
+        # ensure we have an updated project root. the snapshot of the collector
+        # is reused unless the scene changed since.
+        project_root = getSceneSnapshot(item).projectRoot
         item.properties["project_root"] = project_root
 
         # log if no project root could be determined.
@@ -269,15 +281,46 @@ class MayaSessionPublishPlugin(HookBaseClass):
         # disk. if so, warn the user and provide the ability to jump to save
         # to that version now
         (next_version_path, version) = self._get_next_version_info(path, item)
-        if next_version_path and os.path.exists(next_version_path):
+        next_version_taken = False
+        if next_version_path and work_template and work_template.validate(path):
+
+            # reserve the next version so a concurrent publish can not save
+            # to it. the reservation of a previous validation is replaced.
+            releaseItemVersion(item)
+            resolver = getVersionResolver()
+            work_fields = work_template.get_fields(path)
+            try:
+                item.properties[RESERVATION_PROPERTY] = resolver.reserve(
+                    work_template, work_fields, version
+                )
+            except VersionReservationError:
+                # list the work and publish directories once to find the
+                # highest version.
+                next_version_taken = True
+                version = max(
+                    resolver.nextVersion(
+                        work_template,
+                        work_fields,
+                        [publisher.engine.get_template_by_name(
+                            settings.get("Publish Template").value
+                        )]
+                    ),
+                    version + 1
+                )
+                work_fields["version"] = version
+                next_version_path = work_template.apply_fields(work_fields)
+
+        elif next_version_path and os.path.exists(next_version_path):
 
             # determine the next available version_number. just keep asking for
             # the next one until we get one that doesn't exist.
+            next_version_taken = True
             while os.path.exists(next_version_path):
                 (next_version_path, version) = self._get_next_version_info(
                     next_version_path, item
                 )
 
+        if next_version_taken:
             error_msg = "The next version of this file already exists on disk."
             self.logger.error(
                 error_msg,
@@ -306,8 +349,12 @@ class MayaSessionPublishPlugin(HookBaseClass):
         # step. NOTE: this path could change prior to the publish phase.
         item.properties["path"] = path
 
-        # run the base class validation
-        return super(MayaSessionPublishPlugin, self).validate(settings, item)
+        # run the base class validation, the reserved version is released if
+        # it fails
+        return validateReservedItem(
+            item,
+            lambda: super(MayaSessionPublishPlugin, self).validate(settings, item)
+        )
 
     def publish(self, settings, item):
         """
@@ -319,6 +366,15 @@ class MayaSessionPublishPlugin(HookBaseClass):
         :param item: Item to process
         """
 
+        try:
+            self._publish_session(settings, item)
+        except Exception:
+            # the next version will not be saved, release its reservation
+            releaseItemVersion(item)
+            raise
+
+    def _publish_session(self, settings, item):
+
         # get the path in a normalized state. no trailing separator, separators
         # are appropriate for current os, no double separators, etc.
         path = sgtk.util.ShotgunPath.normalize(_session_path())
@@ -330,9 +386,12 @@ class MayaSessionPublishPlugin(HookBaseClass):
         item.properties["path"] = path
 
         # add dependencies for the base class to register when publishing
-        item.properties[
-            "publish_dependencies"
-        ] = _maya_find_additional_session_dependencies()
+        dependencies, unmatched = expandDependencies(
+            _maya_find_additional_session_dependencies()
+        )
+        for pattern in unmatched:
+            self.logger.warning("No file found for the texture %s" % pattern)
+        item.properties["publish_dependencies"] = dependencies
 
         # let the base class register the publish
         super(MayaSessionPublishPlugin, self).publish(settings, item)
@@ -351,8 +410,12 @@ class MayaSessionPublishPlugin(HookBaseClass):
         # do the base class finalization
         super(MayaSessionPublishPlugin, self).finalize(settings, item)
 
-        # bump the session file to the next version
-        self._save_to_next_version(item.properties["path"], item, _save_session)
+        # bump the session file to the next version, its reservation is no
+        # longer needed once saved
+        try:
+            self._save_to_next_version(item.properties["path"], item, _save_session)
+        finally:
+            releaseItemVersion(item)
 
 
 def _maya_find_additional_session_dependencies():
@@ -361,38 +424,9 @@ def _maya_find_additional_session_dependencies():
     """
 
     # default implementation looks for references and
-    # textures (file nodes) and returns any paths that
-    # match a template defined in the configuration
-    ref_paths = set()
-
-    # first let's look at maya references
-    ref_nodes = cmds.ls(references=True)
-    for ref_node in ref_nodes:
-        # get the path:
-        ref_path = cmds.referenceQuery(ref_node, filename=True)
-        # make it platform dependent
-        # (maya uses C:/style/paths)
-        ref_path = ref_path.replace("/", os.path.sep)
-        if ref_path:
-            ref_paths.add(ref_path)
-
-    # now look at file texture nodes
-    for file_node in cmds.ls(l=True, type="file"):
-        # ensure this is actually part of this session and not referenced
-        if cmds.referenceQuery(file_node, isNodeReferenced=True):
-            # this is embedded in another reference, so don't include it in
-            # the breakdown
-            continue
-
-        # get path and make it platform dependent
-        # (maya uses C:/style/paths)
-        texture_path = cmds.getAttr("%s.fileTextureName" % file_node).replace(
-            "/", os.path.sep
-        )
-        if texture_path:
-            ref_paths.add(texture_path)
-
-    return list(ref_paths)
+    # textures (file nodes) that are not part of a reference.
+    # the scan is batched and kept until the saved scene changes.
+    return getDependencyScanner().findDependencies()
 
 
 def _session_path():
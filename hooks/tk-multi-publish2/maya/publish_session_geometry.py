@@ -15,9 +15,18 @@ import sgtk
 
 from tank_vendor import six
 
+from p3dPipeline.alembicExport import getExportCoordinator
+from p3dPipeline.exportWorkers import JOB_PROPERTY
+from p3dPipeline.frameRange import exportFrameRange
+from p3dPipeline.frameRange import sceneRoots
+from p3dPipeline.mayaScene import getSceneSnapshot
+from p3dPipeline.publishRegistry import getRegistrationQueue
+from p3dPipeline.timing import timedPlugin
+
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
+@timedPlugin
 class MayaSessionGeometryPublishPlugin(HookBaseClass):
     """
     Plugin for publishing an open maya session.
@@ -191,8 +200,9 @@ class MayaSessionGeometryPublishPlugin(HookBaseClass):
         # get the normalized path
         path = sgtk.util.ShotgunPath.normalize(path)
 
-        # check that there is still geometry in the scene:
-        if not cmds.ls(geometry=True, noIntermediate=True):
+        # check that there is still geometry in the scene. the snapshot of the
+        # collector is reused unless the scene changed since.
+        if not getSceneSnapshot(item).geometry:
             error_msg = (
                 "Validation failed because there is no geometry in the scene "
                 "to be exported. You can uncheck this plugin or create "
@@ -266,7 +276,7 @@ class MayaSessionGeometryPublishPlugin(HookBaseClass):
         ]
 
         # find the animated frame range to use:
-        start_frame, end_frame = _find_scene_animation_range()
+        start_frame, end_frame = _find_scene_animation_range(item)
         if start_frame and end_frame:
             alembic_args.append("-fr %d %d" % (start_frame, end_frame))
 
@@ -274,41 +284,71 @@ class MayaSessionGeometryPublishPlugin(HookBaseClass):
         # Note: The AbcExport command expects forward slashes!
         alembic_args.append("-file '%s'" % publish_path.replace("\\", "/"))
 
-        # build the export command.  Note, use AbcExport -help in Maya for
-        # more detailed Alembic export help
-        abc_export_cmd = 'AbcExport -j "%s"' % " ".join(alembic_args)
+        # queue the export job. Note, use AbcExport -help in Maya for more
+        # detailed Alembic export help. The jobs of the run are exported in
+        # finalize, in the background workers if enabled.
+        job_args = " ".join(alembic_args)
+        self.parent.log_debug("Queuing AbcExport job: %s" % job_args)
+        getExportCoordinator().addJob(job_args, item)
+
+        # let the base class prepare the publish, it is registered with the
+        # other publishes of the run in finalize
+        super(MayaSessionGeometryPublishPlugin, self).publish(settings, item)
+        getRegistrationQueue().add(self, settings, item)
+
+    def finalize(self, settings, item):
+        """
+        Execute the finalization pass. This pass executes once all the publish
+        tasks have completed.
+
+        Exports the queued Alembic jobs and registers the queued publishes.
 
-        # ...and execute it:
+        :param settings: Dictionary of Settings. The keys are strings, matching
+            the keys returned in the settings property. The values are `Setting`
+            instances.
+        :param item: Item to process
+        """
         try:
-            self.parent.log_debug("Executing command: %s" % abc_export_cmd)
-            mel.eval(abc_export_cmd)
+            getExportCoordinator().finishItem(item, self.logger)
         except Exception as e:
             self.logger.error("Failed to export Geometry: %s" % e)
-            return
+            raise
 
-        # Now that the path has been generated, hand it off to the
-        super(MayaSessionGeometryPublishPlugin, self).publish(settings, item)
+        # register all the queued publishes of the run in batches
+        getRegistrationQueue().flush()
 
+        # the publish is registered once the background export is done
+        if item.properties.get(JOB_PROPERTY):
+            self.logger.info(
+                "Geometry exported in the background, job %s."
+                % item.properties[JOB_PROPERTY]
+            )
+            return
 
-def _find_scene_animation_range():
-    """
-    Find the animation range from the current scene.
-    """
-    # look for any animation in the scene:
-    animation_curves = cmds.ls(typ="animCurve")
+        super(MayaSessionGeometryPublishPlugin, self).finalize(settings, item)
 
-    # if there aren't any animation curves then just return
-    # a single frame:
-    if not animation_curves:
-        return 1, 1
+    def get_publish_kwargs(self, settings, item):
+        """
+        Prepare the publish without creating it, the registration queue
+        creates it in finalize.
+        """
+        return getRegistrationQueue().publishKwargs(
+            super(MayaSessionGeometryPublishPlugin, self).get_publish_kwargs(
+                settings, item
+            ),
+            item
+        )
 
-    # something in the scene is animated so return the
-    # current timeline.  This could be extended if needed
-    # to calculate the frame range of the animated curves.
-    start = int(cmds.playbackOptions(q=True, min=True))
-    end = int(cmds.playbackOptions(q=True, max=True))
 
-    return start, end
+def _find_scene_animation_range(item):
+    """
+    Find the animation range of the exported geometry.
+
+    The geometry is exported over the cut of the shot, or the timeline, when
+    anything upstream of its top level nodes is animated or deformed over
+    time. Static geometry is exported as a single frame.
+    """
+    return exportFrameRange(sceneRoots(getSceneSnapshot(item).geometry))
 
 
 def _session_path():
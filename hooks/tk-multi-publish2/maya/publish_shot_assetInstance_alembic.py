@@ -11,6 +11,11 @@ import inspect
 
 from tank_vendor import six
 
+from p3dPipeline.alembicExport import getExportCoordinator
+from p3dPipeline.exportWorkers import JOB_PROPERTY
+from p3dPipeline.publishRegistry import getRegistrationQueue
+from p3dPipeline.timing import timedPlugin
+
 from pipelineFramework.maya         import PublishTools
 
 publihTools = PublishTools()
@@ -20,6 +25,7 @@ publihTools = PublishTools()
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
+@timedPlugin
 class MayaShotAssetInstanceAlembicPublishPlugin(HookBaseClass):
 
     def accept(self, settings, item):
@@ -34,6 +40,13 @@ class MayaShotAssetInstanceAlembicPublishPlugin(HookBaseClass):
 
     def validate(self, settings, item):
 
+        # The collector resolves the asset name and instance from the instance
+        # name. Otherwise resolve them from the lazy asset object.
+        if "assetName" not in item.properties:
+            mayaAsset = item.properties["assetObject"]
+            item.properties["assetName"]        = mayaAsset.sgEntityName
+            item.properties["assetInstance"]    = mayaAsset.instance
+
         publihTools.hookPublishValidate(
             self,
             settings,
@@ -48,14 +61,49 @@ class MayaShotAssetInstanceAlembicPublishPlugin(HookBaseClass):
 
     def publish(self, settings, item):
 
-        publihTools.hookAlembicLODPublish(
-            self,
+        # the AbcExport job is exported with the jobs of the other
+        # instances of the run, a static instance as a single frame and a
+        # long one in frame chunks if enabled
+        with getExportCoordinator().capture(
             item,
-            "HI"
-        )
-
-        # let the base class register the publish
+            item.properties.get(self.propertiesPublishTemplate),
+            resolveFrameRange=True
+        ):
+            publihTools.hookAlembicLODPublish(
+                self,
+                item,
+                "HI"
+            )
+
+        # let the base class prepare the publish, it is registered with the
+        # other publishes of the run in finalize
         super(MayaShotAssetInstanceAlembicPublishPlugin, self).publish(settings, item)
+        getRegistrationQueue().add(self, settings, item)
+
+    def finalize(self, settings, item):
+
+        # export all the alembic jobs of the run in a single pass
+        getExportCoordinator().finishItem(item, self.logger)
+
+        # register all the queued publishes of the run in batches
+        getRegistrationQueue().flush()
+
+        # the publish is registered once the background export is done
+        if item.properties.get(JOB_PROPERTY):
+            self.logger.info(
+                "Alembic exported in the background, job %s."
+                % item.properties[JOB_PROPERTY]
+            )
+            return
+
+        super(MayaShotAssetInstanceAlembicPublishPlugin, self).finalize(settings, item)
+
+    def get_publish_kwargs(self, settings, item):
+
+        return getRegistrationQueue().publishKwargs(
+            super(MayaShotAssetInstanceAlembicPublishPlugin, self).get_publish_kwargs(settings, item),
+            item
+        )
 
     @property
     def publishTemplate(self):
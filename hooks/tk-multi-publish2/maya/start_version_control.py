@@ -14,9 +14,15 @@ import sgtk
 
 from tank_vendor import six
 
+from p3dPipeline.timing import timedPlugin
+from p3dPipeline.versioning import RESERVATION_PROPERTY
+from p3dPipeline.versioning import releaseItemVersion
+from p3dPipeline.versioning import reservePath
+
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
+@timedPlugin
 class MayaStartVersionControlPlugin(HookBaseClass):
     """
     Simple plugin to insert a version number into the maya file path if one
@@ -177,15 +183,18 @@ class MayaStartVersionControlPlugin(HookBaseClass):
         # field defined within it. Simply use the path info hook to inject a
         # version number into the current file path
 
-        # get the path to a versioned copy of the file.
+        # get the path to a versioned copy of the file and reserve it, so
+        # a concurrent publish of the same file can not take it.
         version_path = publisher.util.get_version_path(path, "v001")
-        if os.path.exists(version_path):
+        reservation = reservePath(version_path, 1)
+        if reservation is None:
             error_msg = (
                 "A file already exists with a version number. Please "
                 "choose another name."
             )
             self.logger.error(error_msg, extra=_get_save_as_action())
             raise Exception(error_msg)
+        item.properties[RESERVATION_PROPERTY] = reservation
 
         return True
 
@@ -205,14 +214,17 @@ class MayaStartVersionControlPlugin(HookBaseClass):
         # are appropriate for current os, no double separators, etc.
         path = sgtk.util.ShotgunPath.normalize(_session_path())
 
-        # ensure the session is saved in its current state
-        _save_session(path)
-
         # get the path to a versioned copy of the file.
         version_path = publisher.util.get_version_path(path, "v001")
 
-        # save to the new version path
-        _save_session(version_path)
+        # ensure the session is saved in its current state, then save to the
+        # new version path. the versioned file exists once saved, its
+        # reservation is released either way.
+        try:
+            _save_session(path)
+            _save_session(version_path)
+        finally:
+            releaseItemVersion(item)
         self.logger.info("A version number has been added to the Maya file...")
         self.logger.info("  Maya file path: %s" % (version_path,))
 
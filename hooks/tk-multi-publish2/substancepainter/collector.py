@@ -8,9 +8,13 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import hashlib
+import json
 import os
+import time
 
 import sgtk
+from sgtk.platform.qt import QtCore
 
 
 __author__ = "Diego Garcia Huerta"
@@ -22,6 +26,285 @@ HookBaseClass = sgtk.get_hook_baseclass()
 
 SESSION_PUBLISHED_TYPE = "Substance Painter Project File"
 
+# Item properties shared with the texture publish plugins.
+EXPORT_JOB_PROPERTY = "texture_export_job"
+TEXTURE_SET_PROPERTY = "texture_set"
+
+# Milliseconds between two checks of the exported files.
+EXPORT_POLL_INTERVAL = 1000
+
+# Suffix of the export state file, written next to the export path.
+EXPORT_STATE_SUFFIX = ".exportState.json"
+
+
+class TextureExportJob(object):
+    """
+    Export of the document maps running in the background of the publisher.
+
+    The export is started from the Qt event loop once the collection is
+    done, so the publisher shows the collected items right away. While
+    Substance Painter exports, the expected files of each texture set are
+    checked with one listing of their directories, and each texture set is
+    reported as soon as all its maps are on disk.
+
+    The publish plugins call wait() before using the exported files.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    def __init__(self, engine, export_path, map_export_info, logger):
+        self._engine = engine
+        self._logger = logger
+        self._finished_sets = set()
+
+        self.export_path = export_path
+        self.map_export_info = map_export_info or {}
+        self.state = self.PENDING
+        self.results = None
+        self._exported_files = None
+
+        # callables run once the export is done
+        self.finished_callbacks = []
+
+        # texture set name -> normalized paths of its maps
+        self._expected = {}
+        for texture_set_name, texture_set in self.map_export_info.items():
+            self._expected[texture_set_name] = set(
+                os.path.normcase(os.path.normpath(texture_file))
+                for texture_file in texture_set.values()
+            )
+
+        self._poll_timer = QtCore.QTimer()
+        self._poll_timer.setInterval(EXPORT_POLL_INTERVAL)
+        self._poll_timer.timeout.connect(self._poll)
+
+    @property
+    def texture_sets(self):
+        return sorted(self._expected)
+
+    def start(self):
+        """
+        Schedule the export on the Qt event loop.
+        """
+        if self.state == self.PENDING:
+            QtCore.QTimer.singleShot(0, self._run)
+
+    def cancel(self):
+        """
+        Stop waiting for the export. The items of the texture sets not
+        exported yet will fail to validate.
+
+        Substance Painter can not abort a running export, it goes on until
+        all the maps are written.
+        """
+        if self.state in (self.PENDING, self.RUNNING):
+            self.state = self.CANCELLED
+            self._poll_timer.stop()
+            self._logger.warning(
+                "Stopped waiting for the texture export. Substance Painter "
+                "finishes the export in the background."
+            )
+
+    def is_finished(self, texture_set_name=None):
+        """
+        :param str texture_set_name: Texture set to check, None to check the
+            whole export.
+
+        :returns: True if the maps are exported.
+        """
+        if texture_set_name is None or self.state == self.DONE:
+            return self.state == self.DONE
+        return texture_set_name in self._finished_sets
+
+    def is_exported(self, texture_file):
+        """
+        Check that a map of a finished export is on disk. The directories of
+        the maps are listed once, the first time a map is checked.
+
+        :param str texture_file: Path of the map.
+
+        :returns: True if the map was written by the export.
+        """
+        if self.state != self.DONE:
+            return False
+        if self._exported_files is None:
+            self._exported_files = _index_directories(
+                path for paths in self._expected.values() for path in paths
+            )
+        return os.path.normcase(os.path.normpath(texture_file)) in self._exported_files
+
+    def wait(self, texture_set_name=None):
+        """
+        Wait for the maps of a texture set, running the export now if it
+        did not start yet.
+
+        :param str texture_set_name: Texture set to wait for, None to wait
+            for the whole export.
+
+        :returns: True if the maps are exported, False if the export was
+            cancelled or failed.
+        """
+        if self.state == self.PENDING:
+            self._run()
+
+        while self.state == self.RUNNING and not self.is_finished(texture_set_name):
+            QtCore.QCoreApplication.processEvents()
+            time.sleep(0.05)
+
+        return self.is_finished(texture_set_name)
+
+    def _run(self):
+        if self.state != self.PENDING:
+            return
+
+        self.state = self.RUNNING
+        self._logger.info(
+            "Exporting %d texture set(s) to %s..."
+            % (len(self._expected), self.export_path),
+            extra={
+                "action_button": {
+                    "label": "Stop Waiting",
+                    "tooltip": "Stop waiting for the texture export. Substance "
+                    "Painter can not abort it and finishes the export in the "
+                    "background.",
+                    "callback": self.cancel,
+                }
+            },
+        )
+
+        # export_document_maps keeps the Qt events running until Substance
+        # Painter reports the end of the export, so the poll timer reports
+        # the texture sets while it exports.
+        self._poll_timer.start()
+        try:
+            self.results = self._engine.app.export_document_maps(self.export_path)
+        except Exception as e:
+            if self.state == self.RUNNING:
+                self.state = self.FAILED
+                self._logger.error("Texture export failed: %s" % e)
+            return
+        finally:
+            self._poll_timer.stop()
+
+        if self.state != self.RUNNING:
+            return
+
+        self._poll()
+        self._finished_sets.update(self._expected)
+        self.state = self.DONE
+        self._logger.info("Texture export finished.")
+
+        missing = [
+            path for paths in self._expected.values() for path in paths
+            if not self.is_exported(path)
+        ]
+        if missing:
+            self._logger.warning(
+                "%d map(s) were not written by the export: %s"
+                % (len(missing), ", ".join(sorted(missing)))
+            )
+
+        for callback in self.finished_callbacks:
+            callback(self)
+
+    def _poll(self):
+        remaining = [
+            name for name in self._expected if name not in self._finished_sets
+        ]
+        if not remaining:
+            return
+
+        exported = _index_directories(
+            path for name in remaining for path in self._expected[name]
+        )
+        for name in sorted(remaining):
+            if self._expected[name] <= exported:
+                self._finished_sets.add(name)
+                self._logger.info(
+                    "Texture set %s exported (%d/%d)."
+                    % (name, len(self._finished_sets), len(self._expected))
+                )
+
+
+def _texture_set_fingerprints(engine, map_export_info):
+    """
+    Compute the state fingerprint of each texture set.
+
+    The layer stacks are not exposed to the toolkit side, so the fingerprint
+    of a texture set combines the saved state of the project with the maps
+    the export preset gives for this texture set.
+
+    :returns: Texture set name to fingerprint. Empty if the project has
+        unsaved changes, in which case nothing can be reused.
+    """
+    need_saving = getattr(engine.app, "need_saving", None)
+    if need_saving is None or need_saving():
+        return {}
+
+    project_path = engine.app.get_current_project_path()
+    try:
+        project_stat = os.stat(project_path)
+    except (OSError, TypeError):
+        return {}
+
+    project_state = "%s|%d|%d" % (
+        os.path.normcase(project_path),
+        project_stat.st_mtime_ns,
+        project_stat.st_size,
+    )
+
+    fingerprints = {}
+    for texture_set_name, texture_set in map_export_info.items():
+        maps = sorted(
+            "%s=%s" % (texture_id, os.path.normcase(texture_file))
+            for texture_id, texture_file in texture_set.items()
+        )
+        fingerprints[texture_set_name] = hashlib.sha1(
+            "\n".join([project_state, texture_set_name] + maps).encode("utf-8")
+        ).hexdigest()
+    return fingerprints
+
+
+def _export_state_path(export_path):
+    return os.path.normpath(export_path) + EXPORT_STATE_SUFFIX
+
+
+def _read_export_state(export_path):
+    try:
+        with open(_export_state_path(export_path), "r") as state_file:
+            return json.load(state_file)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _write_export_state(export_path, fingerprints):
+    state_path = _export_state_path(export_path)
+    temp_path = "%s.%d.tmp" % (state_path, os.getpid())
+    with open(temp_path, "w") as state_file:
+        json.dump(fingerprints, state_file, indent=2, sort_keys=True)
+    os.replace(temp_path, state_path)
+
+
+def _index_directories(paths):
+    """
+    List once each directory of the given files.
+
+    :returns: The normalized paths of the files found in these directories.
+    """
+    index = set()
+    for directory in set(os.path.dirname(path) for path in paths):
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    index.add(os.path.normcase(os.path.join(directory, entry.name)))
+        except OSError:
+            continue
+    return index
+
 
 class SubstancePainterSessionCollector(HookBaseClass):
     """
@@ -144,80 +427,166 @@ class SubstancePainterSessionCollector(HookBaseClass):
 
             return export_path
 
-    def collect_textures_as_folder(self, settings, parent_item):
+    def start_texture_export(self, settings):
+        """
+        Create the background export job of the document maps.
+
+        The maps that will be exported are known before the export, so the
+        items are created right away and the export runs once the publisher
+        is displayed.
+
+        :returns: The started TextureExportJob, None if there is nothing to
+            export.
+        """
         publisher = self.parent
         engine = publisher.engine
 
-        self.logger.debug("Exporting textures as a folder...")
-
         export_path = self.get_export_path(settings)
         if not export_path:
             export_path = engine.app.get_project_export_path()
 
-        engine.show_busy(
-            "Exporting textures",
-            "Texture are being exported so they can " "be published.\n\nPlease wait...",
+        if not export_path:
+            return None
+
+        get_map_export_information = getattr(
+            engine.app, "get_map_export_information", None
         )
+        if get_map_export_information:
+            map_export_info = get_map_export_information()
+            job = TextureExportJob(engine, export_path, map_export_info, self.logger)
+
+            fingerprints = _texture_set_fingerprints(engine, job.map_export_info)
+            changed_sets = self._get_changed_texture_sets(job, fingerprints)
+            if changed_sets:
+                self.logger.debug(
+                    "Texture sets to export: %s" % ", ".join(sorted(changed_sets))
+                )
+                if fingerprints:
+                    job.finished_callbacks.append(
+                        lambda done_job: self._save_export_state(done_job, fingerprints)
+                    )
+                job.start()
+            else:
+                self.logger.info("Textures are up to date, reusing the exported maps.")
+                job.state = TextureExportJob.DONE
+        else:
+            # Older engines can not tell the exported maps before the export,
+            # so export them now.
+            engine.show_busy(
+                "Exporting textures",
+                "Texture are being exported so they can "
+                "be published.\n\nPlease wait...",
+            )
+            try:
+                map_export_info = engine.app.export_document_maps(export_path)
+            finally:
+                engine.clear_busy()
+            job = TextureExportJob(engine, export_path, map_export_info, self.logger)
+            job.state = TextureExportJob.DONE
 
-        map_export_info = engine.app.export_document_maps(export_path)
-        engine.clear_busy()
+        if not map_export_info:
+            return None
 
-        self.logger.debug("Collecting exported textures...")
+        return job
 
-        if export_path:
-            textures = os.listdir(export_path)
-            if textures:
-                textures_item = parent_item.create_item(
-                    "substancepainter.textures",
-                    "Textures",
-                    "Substance Painter Textures",
-                )
+    def _get_changed_texture_sets(self, job, fingerprints):
+        """
+        Find the texture sets changed since the last export.
 
-                icon_path = os.path.join(
-                    self.disk_location, os.pardir, "icons", "texture.png"
-                )
+        A texture set is unchanged if its fingerprint matches the export
+        state saved next to the export path and all its maps are on disk.
 
-                textures_item.set_icon_from_path(icon_path)
+        :returns: The names of the texture sets to export.
+        """
+        if not fingerprints:
+            return set(job.map_export_info)
+
+        exported_state = _read_export_state(job.export_path)
+        exported = _index_directories(
+            os.path.normcase(os.path.normpath(texture_file))
+            for texture_set in job.map_export_info.values()
+            for texture_file in texture_set.values()
+        )
 
-                textures_item.properties["path"] = export_path
-                textures_item.properties["publish_type"] = "Texture Folder"
+        changed_sets = set()
+        for texture_set_name, texture_set in job.map_export_info.items():
+            if exported_state.get(texture_set_name) != fingerprints.get(texture_set_name):
+                changed_sets.add(texture_set_name)
+                continue
+            for texture_file in texture_set.values():
+                if os.path.normcase(os.path.normpath(texture_file)) not in exported:
+                    changed_sets.add(texture_set_name)
+                    break
 
-    def collect_textures(self, settings, parent_item):
-        publisher = self.parent
-        engine = sgtk.platform.current_engine()
+        return changed_sets
 
-        self.logger.debug("Exporting textures...")
+    def _save_export_state(self, job, fingerprints):
+        try:
+            _write_export_state(job.export_path, fingerprints)
+        except (IOError, OSError) as e:
+            self.logger.warning("Could not save the texture export state: %s" % e)
 
-        export_path = self.get_export_path(settings)
-        if not export_path:
-            export_path = engine.app.get_project_export_path()
+    def collect_textures_as_folder(self, settings, parent_item):
+        self.logger.debug("Exporting textures as a folder...")
+
+        job = self.start_texture_export(settings)
+        if not job:
+            return
+
+        self.logger.debug("Collecting exported textures...")
 
-        engine.show_busy(
-            "Exporting textures",
-            "Texture are being exported so they can " "be published.\n\nPlease wait...",
+        textures_item = parent_item.create_item(
+            "substancepainter.textures", "Textures", "Substance Painter Textures",
         )
 
-        map_export_info = engine.app.export_document_maps(export_path)
-        engine.clear_busy()
+        icon_path = os.path.join(self.disk_location, os.pardir, "icons", "texture.png")
+
+        textures_item.set_icon_from_path(icon_path)
+
+        textures_item.properties["path"] = job.export_path
+        textures_item.properties["publish_type"] = "Texture Folder"
+        textures_item.properties[EXPORT_JOB_PROPERTY] = job
+
+    def collect_textures(self, settings, parent_item):
+        self.logger.debug("Exporting textures...")
+
+        job = self.start_texture_export(settings)
+        if not job:
+            return
 
         self.logger.debug("Collecting exported textures...")
 
         icon_path = os.path.join(self.disk_location, os.pardir, "icons", "texture.png")
 
-        for texture_set_name, texture_set in map_export_info.iteritems():
-            for texture_id, texture_file in texture_set.iteritems():
-                if os.path.exists(texture_file):
-                    _, filenamefile = os.path.split(texture_file)
-                    texture_name, _ = os.path.splitext(filenamefile)
+        # Once exported, only the maps found on disk are collected.
+        exported = None
+        if job.is_finished():
+            exported = _index_directories(
+                os.path.normcase(os.path.normpath(texture_file))
+                for texture_set in job.map_export_info.values()
+                for texture_file in texture_set.values()
+            )
 
-                    self.logger.debug("texture: %s" % texture_file)
-                    textures_item = parent_item.create_item(
-                        "substancepainter.texture", "Texture", texture_name
-                    )
-                    textures_item.set_icon_from_path(icon_path)
+        for texture_set_name, texture_set in job.map_export_info.items():
+            for texture_id, texture_file in texture_set.items():
+                if exported is not None and (
+                    os.path.normcase(os.path.normpath(texture_file)) not in exported
+                ):
+                    continue
+
+                _, filenamefile = os.path.split(texture_file)
+                texture_name, _ = os.path.splitext(filenamefile)
+
+                self.logger.debug("texture: %s" % texture_file)
+                textures_item = parent_item.create_item(
+                    "substancepainter.texture", "Texture", texture_name
+                )
+                textures_item.set_icon_from_path(icon_path)
 
-                    textures_item.properties["path"] = texture_file
-                    textures_item.properties["publish_type"] = "Texture"
+                textures_item.properties["path"] = texture_file
+                textures_item.properties["publish_type"] = "Texture"
+                textures_item.properties[EXPORT_JOB_PROPERTY] = job
+                textures_item.properties[TEXTURE_SET_PROPERTY] = texture_set_name
 
     def collect_current_substancepainter_session(self, settings, parent_item):
         """
@@ -0,0 +1,74 @@
+# Copyright (c) 2017 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import sgtk
+
+
+HookBaseClass = sgtk.get_hook_baseclass()
+
+
+# Item properties set by the collector.
+EXPORT_JOB_PROPERTY = "texture_export_job"
+TEXTURE_SET_PROPERTY = "texture_set"
+
+
+class SubstancePainterTextureExportPlugin(HookBaseClass):
+    """
+    Waits for the background texture export started by the collector before
+    the textures are validated and published. Should inherit from the
+    texture publish plugins of the engine.
+    """
+
+    def validate(self, settings, item):
+        """
+        Validates the given item to check that it is ok to publish.
+
+        Waits for the export of the maps of the item first.
+
+        :param settings: Dictionary of Settings. The keys are strings, matching
+            the keys returned in the settings property. The values are `Setting`
+            instances.
+        :param item: Item to process
+
+        :returns: True if item is valid, False otherwise.
+        """
+        job = item.properties.get(EXPORT_JOB_PROPERTY)
+        if job and not job.is_finished(item.properties.get(TEXTURE_SET_PROPERTY)):
+            engine = self.parent.engine
+            engine.show_busy(
+                "Exporting textures",
+                "Texture are being exported so they can "
+                "be published.\n\nPlease wait...",
+            )
+            try:
+                exported = job.wait(item.properties.get(TEXTURE_SET_PROPERTY))
+            finally:
+                engine.clear_busy()
+
+            if not exported:
+                self.logger.error(
+                    "The textures of %s were not exported (export %s)."
+                    % (item.name, job.state)
+                )
+                return False
+
+        # The maps of a texture set are collected before the export, check
+        # that the export wrote this one.
+        if job and item.properties.get(TEXTURE_SET_PROPERTY) is not None:
+            if not job.is_exported(item.properties["path"]):
+                self.logger.error(
+                    "The texture %s was not written by the export: %s"
+                    % (item.name, item.properties["path"])
+                )
+                return False
+
+        return super(SubstancePainterTextureExportPlugin, self).validate(
+            settings, item
+        )
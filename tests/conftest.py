@@ -0,0 +1,117 @@
+"""
+Shared fixtures of the p3dPipeline tests.
+
+The tests run outside of Maya and of the toolkit. When tk-core is not
+installed, the few sgtk symbols used by the tested modules are stubbed, the
+tests give them their behaviour. The mock ShotGrid comes from shotgun_api3,
+or from the copy vendored in tk-core.
+"""
+
+import os
+import pickle
+import sys
+import types
+
+import pytest
+
+
+TESTS_DIR   = os.path.dirname(os.path.abspath(__file__))
+FIXTURES    = os.path.join(TESTS_DIR, "fixtures")
+
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "hooks", "python"))
+
+try:
+    import sgtk
+except ImportError:
+    # The engine and the publish lookup are given by the tests.
+    sgtk = types.ModuleType("sgtk")
+    sgtk.platform   = types.SimpleNamespace(current_engine=lambda: None)
+    sgtk.util       = types.SimpleNamespace(find_publish=None)
+    sys.modules["sgtk"] = sgtk
+
+
+# The entities and fields the tests create in mockgun.
+SCHEMA = {
+    "EventLogEntry" : {
+        "event_type"    : "text",
+        "description"   : "text",
+    },
+    "Project" : {
+        "name"          : "text",
+    },
+    "Asset" : {
+        "code"          : "text",
+        "project"       : "entity",
+    },
+    "PublishedFile" : {
+        "code"              : "text",
+        "name"              : "text",
+        "version_number"    : "number",
+        "entity"            : "entity",
+        "project"           : "entity",
+        "path"              : "url",
+        "path_cache"        : "text",
+    },
+    "PublishedFileDependency" : {
+        "published_file"            : "entity",
+        "dependent_published_file"  : "entity",
+    },
+}
+
+
+def _fieldSchema(dataType):
+    return {
+        "data_type"     : {"value": dataType},
+        "properties"    : {
+            "default_value" : {"value": None},
+            "valid_types"   : {"value": []},
+        },
+    }
+
+
+@pytest.fixture
+def fixturePath():
+    """ Return the path of a file of the fixtures directory.
+    """
+    return lambda name: os.path.join(FIXTURES, name)
+
+
+@pytest.fixture
+def mockgun(tmp_path):
+    """ A mockgun connection with the schema of the tests, recording the
+    uploaded thumbnails.
+    """
+    try:
+        from shotgun_api3.lib import mockgun as mockgunModule
+    except ImportError:
+        mockgunModule = pytest.importorskip("tank_vendor.shotgun_api3.lib.mockgun")
+
+    schema = dict(
+        (entityType, dict((field, _fieldSchema(dataType)) for field, dataType in fields.items()))
+        for entityType, fields in SCHEMA.items()
+    )
+    schemaEntity = dict((entityType, {"name": {"value": entityType}}) for entityType in SCHEMA)
+
+    schemaPath = str(tmp_path / "schema.pickle")
+    schemaEntityPath = str(tmp_path / "schema_entity.pickle")
+    with open(schemaPath, "wb") as schemaFile:
+        pickle.dump(schema, schemaFile)
+    with open(schemaEntityPath, "wb") as schemaFile:
+        pickle.dump(schemaEntity, schemaFile)
+
+    class RecordingShotgun(mockgunModule.Shotgun):
+
+        def __init__(self, *args, **kwargs):
+            super(RecordingShotgun, self).__init__(*args, **kwargs)
+            self.batches    = []
+            self.thumbnails = []
+
+        def batch(self, requests):
+            self.batches.append(requests)
+            return super(RecordingShotgun, self).batch(requests)
+
+        def upload_thumbnail(self, entity_type, entity_id, path, **kwargs):
+            self.thumbnails.append((entity_type, entity_id, path))
+
+    RecordingShotgun.set_schema_paths(schemaPath, schemaEntityPath)
+    return RecordingShotgun("https://mockgun.test")
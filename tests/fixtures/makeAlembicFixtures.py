@@ -0,0 +1,93 @@
+"""
+Write the Alembic fixtures of the reader tests with a real Alembic writer.
+
+The fixtures are exported by the Alembic library of Blender, through its
+Python module, so the reader is checked against the layout of the library
+and not against a copy of its own assumptions. An asset transform holding a
+cube mesh moves over the frames 1001-1010 at 24 fps:
+
+    uniform.abc     one sample per frame
+    substeps.abc    two samples per frame, like AbcExport -step 0.5
+    unclosed.abc    uniform.abc, without the frozen flag set on close
+    truncated.abc   the first half of uniform.abc
+
+    pip install bpy
+    python tests/fixtures/makeAlembicFixtures.py
+"""
+
+import os
+
+import bpy
+
+
+FIXTURES = os.path.dirname(os.path.abspath(__file__))
+
+FPS         = 24
+START_FRAME = 1001
+END_FRAME   = 1010
+
+# Offset of the frozen flag in the Ogawa header.
+FROZEN_OFFSET = 5
+
+
+def buildScene():
+    """ An empty scene with an animated cube, named like an asset.
+    """
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    scene = bpy.context.scene
+    scene.render.fps = FPS
+    scene.frame_start = START_FRAME
+    scene.frame_end = END_FRAME
+
+    bpy.ops.mesh.primitive_cube_add(size=2)
+    cube = bpy.context.active_object
+    cube.name = "asset"
+    cube.data.name = "mesh"
+    cube.location = (0, 0, 0)
+    cube.keyframe_insert("location", frame=START_FRAME)
+    cube.location = (4, 0, 0)
+    cube.keyframe_insert("location", frame=END_FRAME)
+
+
+def export(name, samples=1):
+    """ Export the scene.
+
+    Args:
+        name    (str) : The fixture file name.
+        samples (int) : The number of samples per frame.
+
+    Returns:
+        str : The fixture path.
+    """
+    path = os.path.join(FIXTURES, name)
+    bpy.ops.wm.alembic_export(
+        filepath=path,
+        start=START_FRAME,
+        end=END_FRAME,
+        xsamples=samples,
+        gsamples=samples,
+        sh_open=0.0,
+        sh_close=1.0,
+    )
+    return path
+
+
+def main():
+    buildScene()
+    uniform = export("uniform.abc")
+    export("substeps.abc", samples=2)
+
+    with open(uniform, "rb") as fixture:
+        content = bytearray(fixture.read())
+
+    unclosed = bytearray(content)
+    unclosed[FROZEN_OFFSET] = 0
+    with open(os.path.join(FIXTURES, "unclosed.abc"), "wb") as fixture:
+        fixture.write(unclosed)
+
+    with open(os.path.join(FIXTURES, "truncated.abc"), "wb") as fixture:
+        fixture.write(content[:len(content) // 2])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Tests of the Ogawa header reader, against the fixtures written by the
+Alembic library with fixtures/makeAlembicFixtures.py.
+"""
+
+import pytest
+
+from p3dPipeline.alembicReader import AlembicArchive
+from p3dPipeline.alembicReader import OgawaError
+from p3dPipeline.alembicReader import readSummary
+from p3dPipeline.alembicReader import validateAlembic
+
+
+FPS = 24.0
+
+
+def test_archiveHeader(fixturePath):
+    with AlembicArchive(fixturePath("uniform.abc")) as archive:
+        assert archive.frozen
+        assert archive.ogawaVersion == 1
+        assert archive.version == 0
+        assert archive.libraryVersion == 10803
+        assert archive.metadata["_ai_Application"] == "Blender"
+        assert archive.metadata["FramesPerTimeUnit"] == "24.000000"
+
+
+def test_objects(fixturePath):
+    with AlembicArchive(fixturePath("uniform.abc")) as archive:
+        objects = list(archive.objects())
+
+    assert [header.fullName for header in objects] == ["/asset", "/asset/mesh"]
+    assert [header.schema for header in objects] == ["AbcGeom_Xform_v3", "AbcGeom_PolyMesh_v1"]
+
+
+def test_propertyHeaders(fixturePath):
+    with AlembicArchive(fixturePath("uniform.abc")) as archive:
+        archiveBounds, = archive.properties()
+        mesh = list(archive.objects())[1]
+        geometry = dict((header.name, header) for header in archive._geometryProperties(mesh))
+
+    # The bounds are 6 doubles, sampled on every frame.
+    assert archiveBounds.name == ".childBnds"
+    assert (archiveBounds.pod, archiveBounds.extent) == (11, 6)
+    assert archiveBounds.numSamples == 10
+    assert archiveBounds.timeSamplingIndex == 1
+
+    assert (geometry[".selfBnds"].pod, geometry[".selfBnds"].extent) == (11, 6)
+    assert (geometry["P"].pod, geometry["P"].extent) == (10, 3)
+    assert (geometry[".faceCounts"].pod, geometry[".faceCounts"].extent) == (6, 1)
+
+
+def test_timeSampling(fixturePath):
+    with AlembicArchive(fixturePath("uniform.abc")) as archive:
+        default, uniform = archive.timeSamplings
+        start, end = archive.timeRange()
+        frameRange = archive.frameRange()
+
+    assert not default.isAcyclic
+    assert uniform.isUniform
+    assert uniform.maxSamples == 10
+    assert uniform.timePerCycle == pytest.approx(1.0 / FPS)
+    assert start == pytest.approx(1001 / FPS)
+    assert end == pytest.approx(1010 / FPS)
+    assert frameRange == (1001, 1010)
+
+
+def test_substepsFrameRangeUsesTheSceneRate(fixturePath):
+    with AlembicArchive(fixturePath("substeps.abc")) as archive:
+        start, end = archive.timeRange()
+        assert archive.frameRange(FPS) == (1001, 1010)
+        # Two samples per cycle, the rate of the frames is not known.
+        assert archive.frameRange() is None
+
+    # The last sample is half a frame after the last frame.
+    assert start == pytest.approx(1001 / FPS)
+    assert end == pytest.approx(1010.5 / FPS)
+    assert validateAlembic(fixturePath("substeps.abc"), (1001, 1010), FPS) == []
+
+
+def test_bounds(fixturePath):
+    # The archive bounds are left empty by the writer, the self bounds of
+    # the mesh are used.
+    with AlembicArchive(fixturePath("uniform.abc")) as archive:
+        assert archive.bounds() == (-1, -1, -1, 1, 1, 1)
+
+
+def test_summary(fixturePath):
+    summary = readSummary(fixturePath("uniform.abc"), FPS)
+
+    assert summary["frameRange"] == (1001, 1010)
+    assert summary["objects"] == ["/asset", "/asset/mesh"]
+    assert summary["bounds"] == (-1, -1, -1, 1, 1, 1)
+    assert summary["polyCount"] == 6
+    assert summary["application"] == "Blender"
+
+
+def test_validFile(fixturePath):
+    assert validateAlembic(fixturePath("uniform.abc"), (1001, 1010), FPS) == []
+
+
+def test_wrongFrameRange(fixturePath):
+    problems = validateAlembic(fixturePath("uniform.abc"), (1001, 1020), FPS)
+
+    assert len(problems) == 1
+    assert "1001-1010 instead of 1001-1020" in problems[0]
+
+
+def test_unclosedFile(fixturePath):
+    problems = validateAlembic(fixturePath("unclosed.abc"))
+
+    assert len(problems) == 1
+    assert "was not closed" in problems[0]
+
+
+def test_truncatedFile(fixturePath):
+    path = fixturePath("truncated.abc")
+
+    with pytest.raises(OgawaError):
+        AlembicArchive(path)
+
+    problems = validateAlembic(path)
+    assert len(problems) == 1
+    assert "truncated" in problems[0]
+    assert readSummary(path) is None
+
+
+def test_missingAndForeignFiles(fixturePath, tmp_path):
+    foreign = tmp_path / "foreign.abc"
+    foreign.write_bytes(b"HDF5 is not supported" + b"\x00" * 16)
+
+    assert "was not written" in validateAlembic(str(tmp_path / "missing.abc"))[0]
+    assert "not an Ogawa archive" in validateAlembic(str(foreign))[0]
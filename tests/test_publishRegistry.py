@@ -0,0 +1,221 @@
+"""
+Tests of the batched registration of the PublishedFiles, against mockgun.
+"""
+
+import json
+
+import pytest
+
+from p3dPipeline import publishRegistry
+from p3dPipeline.publishRegistry import PublishRegistrationQueue
+
+
+class Item(object):
+    """ The part of a publisher item used by the registration queue.
+    """
+
+    def __init__(self, name, parent=None, thumbnail=None):
+        self.name       = name
+        self.parent     = parent
+        self.children   = []
+        self.properties = {}
+        self.thumbnail  = thumbnail
+        if parent is not None:
+            parent.children.append(self)
+
+    def get_thumbnail_as_path(self):
+        return self.thumbnail
+
+
+class Plugin(object):
+    """ The part of a publish plugin used by the registration queue.
+    """
+
+    def get_publish_dependencies(self, settings, item):
+        return item.properties.get("publish_dependencies", [])
+
+
+@pytest.fixture
+def project(mockgun):
+    return mockgun.create("Project", {"name": "test"})
+
+
+@pytest.fixture
+def queue(mockgun, monkeypatch):
+    # The publishes of the dependency paths are found by their path.
+    def findPublish(tk, paths):
+        publishes = mockgun.find("PublishedFile", [["path_cache", "in", list(paths)]], ["path_cache"])
+        return dict(
+            (publish["path_cache"], {"type": "PublishedFile", "id": publish["id"]})
+            for publish in publishes
+        )
+
+    monkeypatch.setattr(publishRegistry.sgtk.util, "find_publish", findPublish, raising=False)
+    return PublishRegistrationQueue(connection=mockgun, tk=object(), batchSize=2)
+
+
+def dryRunPublish(queue, item, project, version=1):
+    """ Prepare the PublishedFile of an item as the base plugin does with the
+    arguments of the queue.
+    """
+    kwargs = queue.publishKwargs({}, item)
+    data = {
+        "type"              : "PublishedFile",
+        "code"              : "%s.v%03d" % (item.name, version),
+        "name"              : item.name,
+        "version_number"    : version,
+        "project"           : project,
+        "path_cache"        : "/publish/%s.v%03d" % (item.name, version),
+    }
+    if not kwargs.get("dry_run"):
+        data.pop("type")
+        data = queue.connection.create("PublishedFile", data)
+
+    # The base plugin depends on the publish of the parent item.
+    parent = item.parent
+    if parent is not None and "sg_publish_data" in parent.properties:
+        item.properties.setdefault("publish_dependency_ids", []).append(
+            parent.properties["sg_publish_data"]["id"]
+        )
+
+    item.properties["sg_publish_data"] = data
+    return queue.add(Plugin(), {}, item)
+
+
+def dependencies(mockgun, publish):
+    return sorted(
+        dependency["dependent_published_file"]["id"]
+        for dependency in mockgun.find(
+            "PublishedFileDependency",
+            [["published_file", "is", {"type": "PublishedFile", "id": publish["id"]}]],
+            ["dependent_published_file"]
+        )
+    )
+
+
+def test_flushCreatesThePublishesInBatches(queue, mockgun, project):
+    root = Item("root")
+    items = [Item("lod%d" % index, root) for index in range(3)]
+    for item in items:
+        assert dryRunPublish(queue, item, project) is not None
+    assert len(queue) == 3
+
+    entities = queue.flush()
+
+    assert len(entities) == 3
+    assert len(queue) == 0
+    assert [len(requests) for requests in mockgun.batches] == [2, 1]
+    for item, entity in zip(items, entities):
+        assert item.properties["sg_publish_data"] is entity
+        assert entity["code"] == "%s.v001" % item.name
+    assert len(mockgun.find("PublishedFile", [])) == 3
+
+
+def test_flushCreatesTheDependencies(queue, mockgun, project):
+    texture = mockgun.create("PublishedFile", {"code": "texture", "path_cache": "/textures/wood.tx"})
+    other = mockgun.create("PublishedFile", {"code": "other"})
+
+    root = Item("root")
+    item = Item("model", root)
+    item.properties["publish_dependencies"] = ["/textures/wood.tx", "/textures/missing.tx"]
+    item.properties["publish_dependency_ids"] = [other["id"], other["id"]]
+    dryRunPublish(queue, item, project)
+
+    entity = queue.flush()[0]
+
+    assert dependencies(mockgun, entity) == sorted([texture["id"], other["id"]])
+
+
+def test_flushUploadsTheThumbnails(queue, mockgun, project):
+    root = Item("root")
+    withThumbnail = Item("model", root, thumbnail="/tmp/model.png")
+    withoutThumbnail = Item("rig", root)
+    dryRunPublish(queue, withThumbnail, project)
+    dryRunPublish(queue, withoutThumbnail, project)
+
+    queue.flush()
+
+    assert mockgun.thumbnails == [
+        ("PublishedFile", withThumbnail.properties["sg_publish_data"]["id"], "/tmp/model.png")
+    ]
+
+
+def test_detachedPublishesAreFlushedLater(queue, mockgun, project):
+    root = Item("root")
+    exported = Item("lo", root)
+    background = Item("hi", root)
+    dryRunPublish(queue, exported, project)
+    dryRunPublish(queue, background, project)
+
+    detached = queue.detach([background])
+    queue.flush()
+
+    assert "id" in exported.properties["sg_publish_data"]
+    assert "id" not in background.properties["sg_publish_data"]
+    assert len(detached) == 1
+
+    detached.flush()
+
+    assert "id" in background.properties["sg_publish_data"]
+    assert len(mockgun.find("PublishedFile", [])) == 2
+
+
+def test_parentPublishIsRegisteredBeforeItsChildren(queue, mockgun, project):
+    root = Item("root")
+    rigMaster = Item("rigMaster", root)
+    rigLods = [Item("rig%s" % lod, rigMaster) for lod in ("LO", "MI", "HI", "PROXY")]
+
+    # The parent has children: it is registered right away, not queued.
+    assert not queue.publishKwargs({}, rigMaster).get("dry_run")
+    assert dryRunPublish(queue, rigMaster, project) is None
+    masterPublish = rigMaster.properties["sg_publish_data"]
+    assert "id" in masterPublish
+
+    # The children read the id of the parent publish, and are queued.
+    for rigLod in rigLods:
+        assert queue.publishKwargs({}, rigLod)["dry_run"]
+        assert dryRunPublish(queue, rigLod, project) is not None
+    assert len(queue) == 4
+
+    queue.flush()
+
+    for rigLod in rigLods:
+        assert dependencies(mockgun, rigLod.properties["sg_publish_data"]) == [masterPublish["id"]]
+
+
+def test_restoredPublishesAreRegisteredWithoutTheirItems(queue, mockgun, project):
+    root = Item("root")
+    model = Item("model", root)
+    lods = [Item("model%s" % lod, model) for lod in ("LO", "HI")]
+    dryRunPublish(queue, model, project)
+    for lod in lods:
+        dryRunPublish(queue, lod, project)
+
+    # The session closed before the background export was registered.
+    payloads = queue.detach(lods).payloads()
+    payloads = json.loads(json.dumps(payloads))
+
+    restored = PublishRegistrationQueue(connection=mockgun, tk=object(), batchSize=2)
+    restored.load(payloads)
+    entities = restored.flush()
+
+    assert [entity["code"] for entity in entities] == ["modelLO.v001", "modelHI.v001"]
+    for entity in entities:
+        assert dependencies(mockgun, entity) == [model.properties["sg_publish_data"]["id"]]
+
+
+def test_splitPublishRegistersEveryChunk(queue, mockgun, project):
+    root = Item("root")
+    cache = Item("cache", root)
+    dryRunPublish(queue, cache, project)
+
+    chunks = ["/publish/cache.v001.c%03d.abc" % index for index in (1, 2)]
+    assert len(queue.splitPublish(cache, chunks)) == 2
+    assert queue.splitPublish(Item("other", root), chunks) == []
+
+    entities = queue.flush()
+
+    assert [entity["code"] for entity in entities] == ["cache.v001.c001.abc", "cache.v001.c002.abc"]
+    assert [entity["path_cache"] for entity in entities] == chunks
+    assert [entity["path"]["local_path"] for entity in entities] == chunks
+    assert all(entity["version_number"] == 1 for entity in entities)
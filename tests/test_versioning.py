@@ -0,0 +1,61 @@
+"""
+Tests of the version reservations and of the directories they create.
+"""
+
+import os
+
+from p3dPipeline import versioning
+from p3dPipeline.versioning import releasePath
+from p3dPipeline.versioning import reservePath
+
+
+def test_releaseRemovesTheEmptyVersionDirectory(tmp_path):
+    path = str(tmp_path / "asset" / "v003" / "asset.abc")
+
+    reservation = reservePath(path, 3)
+    assert os.path.isfile(reservation.lockPath)
+
+    # The export failed, nothing was written in the version directory.
+    reservation.release()
+    assert not os.path.exists(str(tmp_path / "asset"))
+    assert os.path.isdir(str(tmp_path))
+
+
+def test_releaseKeepsTheWrittenVersion(tmp_path):
+    path = str(tmp_path / "v003" / "asset.abc")
+
+    reservation = reservePath(path, 3)
+    with open(path, "w") as output:
+        output.write("abc")
+    releasePath(path)
+
+    assert not os.path.exists(reservation.lockPath)
+    assert os.path.isfile(path)
+
+
+def test_reservedByAnotherPublish(tmp_path, monkeypatch):
+    path = str(tmp_path / "v003" / "asset.abc")
+
+    reservation = reservePath(path, 3)
+    monkeypatch.setattr(versioning, "_owner", lambda: "someone@elsewhere:1")
+    assert reservePath(path, 3) is None
+    other = reservePath(str(tmp_path / "v004" / "asset.abc"), 4)
+    assert other is not None
+
+    monkeypatch.undo()
+    reservation.release()
+    other.release()
+    assert not os.path.exists(str(tmp_path / "v003"))
+
+
+def test_releasePathOfAClosedSession(tmp_path):
+    path = str(tmp_path / "v003" / "asset.abc")
+    reservation = reservePath(path, 3)
+    with open(path, "w") as output:
+        output.write("abc")
+
+    # The background export is recovered by another session.
+    versioning._heldReservations.pop(reservation.lockPath)
+    releasePath(path)
+
+    assert not os.path.exists(reservation.lockPath)